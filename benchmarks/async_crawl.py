@@ -0,0 +1,63 @@
+"""Benchmark the async crawl engine against a local PyPI stand-in.
+
+Run from the repo root with:
+
+    python -m benchmarks.async_crawl
+
+The stand-in runs in this process (one thread per connection), so it shares the GIL
+with the crawl. Above a concurrency of ~32 that's what limits the speedup here, not
+the crawler.
+"""
+
+import argparse
+import time
+
+import requests
+
+import crawler
+from benchmarks.standin import serve
+
+PAGE = (
+    "<html><body>"
+    + '<p class="package-description__summary">A Streamlit component</p>' * 200
+    + "</body></html>"
+).encode()
+
+
+def handle(method, path, headers, body):
+    return 200, {"Content-Type": "text/html"}, PAGE
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="in seconds")
+    args = parser.parse_args()
+
+    with serve(handle, latency=args.latency) as base_url:
+        urls = [f"{base_url}/project/st-package-{i}/" for i in range(args.pages)]
+
+        start = time.perf_counter()
+        for url in urls:
+            requests.get(url)
+        baseline = time.perf_counter() - start
+        print(f"{'sequential (requests)':>24}: {baseline:6.2f}s")
+
+        for concurrency in [1, 2, 4, 8, 16, 32, 64]:
+            received = []
+            start = time.perf_counter()
+            crawler.fetch_all(
+                urls,
+                concurrency=concurrency,
+                on_response=lambda url, status_code, text: received.append(url),
+            )
+            duration = time.perf_counter() - start
+            assert received == urls
+            print(
+                f"{f'concurrency={concurrency}':>24}: {duration:6.2f}s "
+                f"({baseline / duration:5.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
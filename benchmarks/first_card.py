@@ -0,0 +1,82 @@
+"""How long a visitor of a fresh app (no catalog yet) waits for the first cards.
+
+Simulates a cold crawl with the timings of its steps (forum tracker + PyPI index,
+PyPI projects, then Github per component) and a visitor that reruns every 100 ms.
+Before, the first build blocked until the crawl was done. Now the crawl runs in the
+background and passes each component to a `PartialCatalog`, which the app shows
+until the snapshot is there. Reports when the first card, the first page (60 cards)
+and the full catalog show up. Run from the repo root with:
+
+    python -m benchmarks.first_card
+"""
+
+import argparse
+import time
+
+from benchmarks.table import make_components
+from partial import PartialCatalog
+from snapshot import SnapshotStore
+
+PAGE = 60
+
+
+def fake_crawl(components, tracked, args, on_component=None):
+    # Steps 1 and 2: forum tracker and PyPI index.
+    time.sleep(args.index_time)
+    if on_component is not None:
+        for c in components[:tracked]:
+            on_component(c)
+    # Step 3: all PyPI projects, needed before the batched Github request.
+    time.sleep(args.pypi_time)
+    # Step 4: Github and downloads, one component after the other.
+    for c in components:
+        time.sleep(args.github_time / 1000)
+        if on_component is not None:
+            on_component(c)
+    return None, time.time(), components
+
+
+def visit(args, progressive):
+    """return seconds until (first card, first page, full catalog)"""
+    components = make_components(args.components)
+    tracked = args.components // 4
+    partial = PartialCatalog() if progressive else None
+    on_component = partial.add if progressive else None
+    store = SnapshotStore(lambda: fake_crawl(components, tracked, args, on_component))
+
+    start = time.perf_counter()
+    first_card = first_page = None
+    while True:
+        if progressive:
+            snapshot = store.current(block=False)
+            shown = snapshot or partial.snapshot()
+        else:
+            snapshot = shown = store.current()
+        now = time.perf_counter() - start
+        if shown is not None and first_card is None:
+            first_card = now
+        if shown is not None and len(shown) >= PAGE and first_page is None:
+            first_page = now
+        if snapshot is not None:
+            return first_card, first_page, now
+        time.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--components", type=int, default=600)
+    parser.add_argument("--index-time", type=float, default=1.0, help="in seconds")
+    parser.add_argument("--pypi-time", type=float, default=3.0, help="in seconds")
+    parser.add_argument(
+        "--github-time", type=float, default=5.0, help="per component, in ms"
+    )
+    args = parser.parse_args()
+
+    print(f"{'':>12} {'first card':>11} {'first page':>11} {'everything':>11}")
+    for label, progressive in [("blocking", False), ("progressive", True)]:
+        times = visit(args, progressive)
+        print(f"{label:>12}" + "".join(f" {t:>10.1f}s" for t in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare request counts of per-repo REST calls and batched GraphQL queries.
+
+Runs `github.fetch_repos` against a local GraphQL stand-in that returns canned
+responses (with some repos missing). Run from the repo root with:
+
+    python -m benchmarks.github_graphql
+"""
+
+import argparse
+import json
+import time
+
+import github
+from benchmarks.standin import serve
+
+requests_made = []
+
+
+def handle(method, path, headers, body):
+    requests_made.append(path)
+    variables = json.loads(body)["variables"]
+    data, errors = {}, []
+    for key, user in variables.items():
+        if not key.startswith("o"):
+            continue
+        i = key[1:]
+        repo = variables[f"n{i}"]
+        if repo.startswith("missing"):
+            data[f"r{i}"] = None
+            errors.append(
+                {
+                    "type": "NOT_FOUND",
+                    "path": [f"r{i}"],
+                    "message": f"Could not resolve to a Repository with the name '{user}/{repo}'.",
+                }
+            )
+        else:
+            data[f"r{i}"] = {
+                "stargazerCount": len(repo),
+                "description": f"Description of {repo}",
+                "createdAt": "2022-01-01T12:00:00Z",
+                "owner": {"avatarUrl": f"https://avatars.example.com/{user}"},
+            }
+    response = {"data": data}
+    if errors:
+        response["errors"] = errors
+    return 200, {"Content-Type": "application/json"}, json.dumps(response).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=1500)
+    parser.add_argument("--latency", type=float, default=0.05, help="in seconds")
+    args = parser.parse_args()
+
+    repos = [
+        (f"user{i}", f"missing-repo-{i}" if i % 10 == 0 else f"repo-{i}")
+        for i in range(args.repos)
+    ]
+    with serve(handle, latency=args.latency) as base_url:
+        start = time.perf_counter()
+        results = github.fetch_repos(repos, "token", url=f"{base_url}/graphql")
+        duration = time.perf_counter() - start
+
+    assert len(results) == len(repos)
+    for user, repo in repos:
+        if repo.startswith("missing"):
+            assert results[(user, repo)] is None
+        else:
+            assert results[(user, repo)][0] == len(repo)
+    missing = sum(r is None for r in results.values())
+    print(f"{len(repos)} repos ({missing} missing)")
+    print(f"{'REST':>8}: {len(repos)} requests")
+    print(f"{'GraphQL':>8}: {len(requests_made)} requests, {duration:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark the queries of a landing page rerun: newcomers, all-time favorites and
+a category page, for each sort key.
+
+Compares computing them on every rerun (like the memo calls did, which never hit
+for the newcomers because of `datetime.now()`), the LRU query cache of
+`SnapshotStore` and the views precomputed per snapshot (`LandingViews`). Also
+reports what the views cost per snapshot. Run from the repo root with:
+
+    python -m benchmarks.landing
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.table import CATEGORIES, make_components
+from snapshot import NEWCOMER_DAYS, LandingViews, SnapshotStore
+
+
+class NoViews:
+    def lookup(self, *args):
+        return None
+
+
+def landing_queries():
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    queries = []
+    for key in ["stars", "downloads", "date"]:
+        queries.append((key, None, today - timedelta(days=NEWCOMER_DAYS)))
+        queries.append((key, None, None))
+        queries.append((key, ["charts"], None))
+    return queries
+
+
+def rerun_uncached(table):
+    for key, categories, newer_than in landing_queries():
+        if newer_than is not None:
+            # `datetime.now()` instead of midnight, a different value every time.
+            newer_than = datetime.now() - timedelta(days=NEWCOMER_DAYS)
+        table.filter(table.sort(key), categories=categories, newer_than=newer_than)
+
+
+def rerun(store, snapshot):
+    for key, categories, newer_than in landing_queries():
+        store.query(snapshot, key, categories=categories, newer_than=newer_than)
+
+
+def timeit(fn, repeat):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    print(
+        f"{'components':>10} {'uncached':>10} {'lru cache':>10} {'views':>10} "
+        f"{'views build':>12} {'views size':>11}"
+    )
+    for n in [1_500, 10_000, 100_000]:
+        components = make_components(n)
+        store = SnapshotStore(lambda: (None, time.time(), components), CATEGORIES)
+        snapshot = store.current()
+        table = snapshot.table
+
+        uncached = timeit(lambda: rerun_uncached(table), args.repeat)
+        views = timeit(lambda: rerun(store, snapshot), args.repeat)
+        build = timeit(lambda: LandingViews(table), 3)
+        size = snapshot.views.nbytes()
+        snapshot.views = NoViews()
+        lru = timeit(lambda: rerun(store, snapshot), args.repeat)
+        print(
+            f"{n:>10} {uncached * 1e3:>8.2f}ms {lru * 1e3:>8.3f}ms "
+            f"{views * 1e3:>8.3f}ms {build * 1e3:>10.1f}ms {size / 1e6:>9.2f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Benchmark parsing the responses of a crawl in 0 (in-process), 1, 2, 4 and 8
+worker processes.
+
+Serves synthetic PyPI JSON responses, PyPI project pages, READMEs and the forum
+tracker post from a local stand-in (so there's no network time, as with a fully
+cached crawl) and fetches them through the validator cache with the same extract
+functions as the crawl. Reports the total time and the CPU time of the crawling
+thread, i.e. how much the crawl still competes with the server for the GIL. Run from
+the repo root with:
+
+    python -m benchmarks.parsing
+"""
+
+import argparse
+import functools
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import crawler
+import forum
+import parsing
+import pypi
+import readme
+from benchmarks.standin import serve
+from revalidate import ValidatorCache
+
+README = (
+    "# St Component\n\n"
+    "[![badge](https://img.shields.io/badge/x)](https://x.org)\n\n"
+    "A *Streamlit* component that does [things](https://example.com).\n\n"
+    "![demo](docs/demo.gif)\n\n"
+    + "## Usage\n\n```python\nimport streamlit as st\n```\n\nSome text. " * 100
+    + "\nSee https://share.streamlit.io/user/repo/main/app.py\n"
+)
+
+
+def pypi_json(i):
+    releases = {
+        f"0.{v}.0": [{"upload_time_iso_8601": f"2022-01-{v % 28 + 1:02}T00:00:00Z"}]
+        for v in range(40)
+    }
+    return json.dumps(
+        {
+            "info": {
+                "summary": "",
+                "description": README,
+                "home_page": f"https://github.com/user/st-package-{i}",
+                "project_urls": {"Docs": "https://example.com"},
+            },
+            "ownership": {"roles": [{"user": "user", "role": "Owner"}]},
+            "releases": releases,
+        }
+    )
+
+
+def project_page(i):
+    # Roughly like a real project page: lots of navigation and release history
+    # around the few parts we look at.
+    noise = "".join(
+        f'<div class="release"><a href="/project/x/{v}/"><p class="release__version">'
+        f"{v}</p><p>Jan 1, 2022</p></a></div>"
+        for v in range(300)
+    )
+    return (
+        "<html><head><title>x</title></head><body>"
+        + '<nav><ul><li><a href="/help/">Help</a></li></ul></nav>' * 20
+        + '<span class="sidebar-section__user-gravatar-text">user</span>'
+        + '<a class="vertical-tabs__tab vertical-tabs__tab--with-icon '
+        + f'vertical-tabs__tab--condensed" href="https://github.com/user/st-{i}">'
+        + '<i class="fas fa-home"></i>Homepage</a>'
+        + '<p class="package-description__summary">A component</p>'
+        + f'<div class="project-description"><p>Hello</p>{README}</div>'
+        + noise
+        + "</body></html>"
+    )
+
+
+def tracker_post():
+    # Cooked html of the first post, the components are the longest list.
+    intro = "<p>All the components!</p><ul><li>Rules</li><li>More rules</li></ul>"
+    entries = "".join(
+        f'<li><a href="https://github.com/user/st-{i}">Component {i}</a> – '
+        f'<a href="https://pypi.org/project/st-{i}/">pypi</a></li>'
+        for i in range(600)
+    )
+    return f"{intro}<ul>{entries}</ul>"
+
+
+PAGES = {}
+
+
+def handle(method, path, headers, body):
+    content_type = "application/json" if path.endswith("/json") else "text/html"
+    return 200, {"Content-Type": content_type}, PAGES[path]
+
+
+def crawl(base_url, n):
+    """fetch and parse everything once, like a crawl without network time"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ValidatorCache(Path(tmp) / "validators", max_age=0)
+        jobs = [
+            ([f"{base_url}/tracker"], forum.parse_cooked),
+            ([f"{base_url}/pypi/{i}/json" for i in range(n)], pypi.parse_json),
+            ([f"{base_url}/project/{i}/" for i in range(n)], pypi.parse_html),
+            (
+                [f"{base_url}/readme/{i}" for i in range(n)],
+                functools.partial(readme.parse, raw_base="https://github.com/x/y"),
+            ),
+        ]
+        results = []
+        for urls, extract in jobs:
+            crawler.fetch_all(
+                urls,
+                concurrency=16,
+                on_response=lambda url, status_code, value: results.append(value),
+                extract=extract,
+                cache=cache,
+            )
+        cache.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--packages", type=int, default=200)
+    args = parser.parse_args()
+
+    n = args.packages
+    PAGES["/tracker"] = tracker_post().encode()
+    for i in range(n):
+        PAGES[f"/pypi/{i}/json"] = pypi_json(i).encode()
+        PAGES[f"/project/{i}/"] = project_page(i).encode()
+        PAGES[f"/readme/{i}"] = README.encode()
+    size = sum(len(page) for page in PAGES.values())
+    print(f"{len(PAGES)} responses, {size / 1e6:.1f} MB\n")
+
+    with serve(handle) as base_url:
+        expected = None
+        print(f"{'workers':>8} {'total':>8} {'crawl thread cpu':>17}")
+        for workers in [0, 1, 2, 4, 8]:
+            parsing.set_workers(workers)
+            if workers:
+                # Start the workers, that's only done once per crawl.
+                parsing.parse(pypi.parse_json, b"{}")
+            start, start_cpu = time.perf_counter(), time.thread_time()
+            results = crawl(base_url, n)
+            duration = time.perf_counter() - start
+            cpu = time.thread_time() - start_cpu
+            parsing.shutdown()
+            if expected is None:
+                expected = results
+            assert results == expected
+            print(f"{workers:>8} {duration:>7.2f}s {cpu:>16.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark rerun time and message count of the component grid.
+
+Renders synthetic components (with card and avatar thumbnails) with
+`show_components` (separate elements per card) and `show_components_batched`
+(pre-rendered html), and counts the messages that a rerun sends to the browser and
+their size. Images served by the media file manager aren't part of the messages, the
+browser fetches them (once, they're cached). Runs the Streamlit commands outside of
+a server, with a script run context that only collects the messages. Run from the
+repo root with:
+
+    python -m benchmarks.rendering
+"""
+
+import argparse
+import io
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+from streamlit.runtime import Runtime, RuntimeConfig
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner import ScriptRunContext, add_script_run_ctx
+from streamlit.runtime.state import SafeSessionState, SessionState
+from streamlit.runtime.uploaded_file_manager import UploadedFileManager
+
+from benchmarks.table import CATEGORIES, make_components
+from cards import CardRenderer, show_components, show_components_batched
+from catalog import ComponentTable
+from thumbnails import AVATAR_SIZE, CARD_SIZE, ThumbnailStore
+
+
+def fake_image(rng):
+    """png bytes of a smooth random image, its thumbnail is ~16 kB like a screenshot."""
+    pixels = (rng.random((16, 24, 3)) * 255).astype("uint8")
+    image = Image.fromarray(pixels).resize((1200, 800), Image.BICUBIC)
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def add_thumbnails(components, directory, images=200):
+    store = ThumbnailStore(directory)
+    rng = np.random.default_rng(0)
+    cards, avatars = [], []
+    for _ in range(images):
+        data = fake_image(rng)
+        cards.append(store.add(data, CARD_SIZE))
+        avatars.append(store.add(data, AVATAR_SIZE))
+    for i, c in enumerate(components):
+        c.image_thumbnail = cards[i % images]
+        c.avatar_thumbnail = avatars[i % images]
+
+
+def rerun(render):
+    """run `render()` like a script rerun and return (seconds, messages, bytes)."""
+    messages = []
+    ctx = ScriptRunContext(
+        session_id="benchmark",
+        _enqueue=messages.append,
+        query_string="",
+        session_state=SafeSessionState(SessionState()),
+        uploaded_file_mgr=UploadedFileManager(),
+        page_script_hash="",
+        user_info={"email": "test@example.com"},
+    )
+    add_script_run_ctx(ctx=ctx)
+    start = time.perf_counter()
+    render()
+    duration = time.perf_counter() - start
+    return duration, len(messages), sum(m.ByteSize() for m in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Only for its media file manager, it's not started.
+    Runtime(RuntimeConfig("streamlit_app.py", None, MemoryMediaFileStorage("/media")))
+    components = make_components(1_000)
+    for c in components:
+        # mdlit looks up favicons for links without an icon, keep this offline.
+        c.github = None
+    add_thumbnails(components, tempfile.mkdtemp())
+    table = ComponentTable(components, CATEGORIES)
+    rows = table.sort("stars")
+
+    print(f"{'visible':>8} {'mode':>10} {'rerun':>9} {'messages':>9} {'bytes':>9}")
+    for n in [4, 20, 60, 100, 200]:
+        visible = rows[:n]
+        modes = {
+            "elements": lambda: show_components(table.take(visible)),
+            "batched": lambda: show_components_batched(renderer, visible),
+        }
+        renderer = CardRenderer(table.row)
+        # The first rerun builds the html of the cards, later ones reuse it.
+        first, _, _ = rerun(modes["batched"])
+        for mode, render in modes.items():
+            results = [rerun(render) for _ in range(args.repeat)]
+            duration = np.median([r[0] for r in results])
+            _, messages, size = results[0]
+            print(
+                f"{n:>8} {mode:>10} {duration * 1e3:>7.1f}ms {messages:>9} "
+                f"{size / 1e3:>7.0f}kB"
+            )
+        print(f"{n:>8} {'1st batch':>10} {first * 1e3:>7.1f}ms  (builds the html)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Simulate several app replicas starting at the same time without a catalog.
+
+Each replica has its own catalog file and calls `shared.load_catalog` with a fake
+crawl that just sleeps. Without a shared backend, every replica crawls; with one,
+a single replica crawls and the others wait for it to publish. Reports the number
+of crawls and how long until every replica has a catalog, for the SQLite backend
+and the Redis one (against a local stand-in). Run from the repo root with:
+
+    python -m benchmarks.replicas
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import catalog
+import shared
+from benchmarks.standin import serve_redis
+from benchmarks.table import make_components
+
+
+def start_replicas(backends, directory, crawl_time):
+    """start one replica per backend at once, returns (crawls, seconds)"""
+    components = make_components(500)
+    crawls = []
+
+    def crawl(path):
+        crawls.append(1)
+        time.sleep(crawl_time)
+        catalog.write_catalog(path, components, time.time())
+
+    def replica(i, backend):
+        path = Path(directory) / f"replica-{i}.jsonl"
+        version, _, loaded = shared.load_catalog(backend, crawl, path, max_age=3600)
+        assert len(loaded) == len(components)
+
+    threads = [
+        threading.Thread(target=replica, args=(i, backend))
+        for i, backend in enumerate(backends)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(crawls), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--crawl-time", type=float, default=2.0, help="in seconds")
+    args = parser.parse_args()
+    shared.WAIT_INTERVAL = 0.1
+
+    print(f"{'backend':>24} {'crawls':>7} {'all ready':>10}")
+    with tempfile.TemporaryDirectory() as tmp, serve_redis() as redis_url:
+        setups = {
+            "none (separate caches)": [
+                shared.from_url(f"sqlite:///{tmp}/alone-{i}.sqlite")
+                for i in range(args.replicas)
+            ],
+            "sqlite": [
+                shared.from_url(f"sqlite:///{tmp}/shared.sqlite")
+                for i in range(args.replicas)
+            ],
+            "redis (stand-in)": [
+                shared.from_url(redis_url) for i in range(args.replicas)
+            ],
+        }
+        for name, backends in setups.items():
+            directory = Path(tmp) / name
+            directory.mkdir()
+            crawls, duration = start_replicas(backends, directory, args.crawl_time)
+            print(f"{name:>24} {crawls:>7} {duration:>9.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark per-query latency of the search index against catalog size.
+
+Compares the old linear substring scan over `search_text` with `SearchIndex`, on
+synthetic catalogs from today's size up to 100k components. Run from the repo root
+with:
+
+    python -m benchmarks.search
+"""
+
+import argparse
+import random
+import string
+import time
+from types import SimpleNamespace
+
+from search_index import SearchIndex
+
+COMMON_WORDS = (
+    "streamlit component chart image video text map table graph editor code "
+    "auth login navigation menu sidebar theme layout card grid select slider "
+    "upload download plot canvas draw webcam audio player markdown latex pdf "
+    "calendar date time timeline tree json diff folium plotly echarts aggrid"
+).split()
+QUERIES = ["chart", "Image", "card", "map", "ag", "drawable canvas", "qwertz"]
+
+
+def make_vocabulary(n):
+    # Word frequencies in real text follow Zipf's law: a few words are everywhere,
+    # most are rare.
+    random.seed(1)
+    words = COMMON_WORDS + [
+        "".join(random.choices(string.ascii_lowercase, k=random.randint(4, 10)))
+        for _ in range(n)
+    ]
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+
+def make_components(n):
+    words, weights = make_vocabulary(20_000)
+    random.seed(0)
+    components = []
+    for i in range(n):
+        name_words = random.choices(words, weights, k=2)
+        components.append(
+            SimpleNamespace(
+                name=" ".join(name_words).title(),
+                package=f"streamlit-{'-'.join(name_words)}-{i}",
+                github_description=" ".join(
+                    random.choices(words, weights, k=12)
+                ).capitalize(),
+                pypi_description=" ".join(random.choices(words, weights, k=8)),
+                github_author=f"User{i % 5000}",
+                pypi_author=f"user{i % 5000}",
+            )
+        )
+    return components
+
+
+def search_text(c):
+    # This is how step 4 built `search_text` before.
+    return (
+        str(c.name)
+        + str(c.github_description)
+        + str(c.pypi_description)
+        + str(c.github_author)
+        + str(c.package)
+    )
+
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'components':>10} {'query':>16} {'matches':>8} "
+        f"{'linear scan':>12} {'index':>9}"
+    )
+    for n in [1_500, 10_000, 30_000, 100_000]:
+        components = make_components(n)
+        for c in components:
+            c.search_text = search_text(c)
+
+        start = time.perf_counter()
+        index = SearchIndex(components)
+        build = time.perf_counter() - start
+        print(f"{n:>10} {'(build index)':>16} {'':>8} {'':>12} {build * 1e3:>7.0f}ms")
+
+        for query in QUERIES:
+            linear = timeit(
+                lambda: [c for c in components if query.lower() in c.search_text],
+                args.repeat,
+            )
+            indexed = timeit(lambda: index.search(query), args.repeat)
+            matches = len(index.search(query))
+            print(
+                f"{n:>10} {query:>16} {matches:>8} {linear * 1e3:>10.2f}ms "
+                f"{indexed * 1e3:>7.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark candidate extraction from a large synthetic PyPI simple index.
+
+Compares the old approach (whole body in memory + BeautifulSoup DOM) with the
+streaming parser in `pypi.py`. Run from the repo root with:
+
+    python -m benchmarks.simple_index
+"""
+
+import argparse
+import json
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+import pypi
+
+EXCLUDE = ["streamlit", "st-spin"]
+
+
+def make_names(n):
+    random.seed(0)
+    names = []
+    for i in range(n):
+        name = "".join(random.choices(string.ascii_lowercase + "-", k=12)) + str(i)
+        if i % 250 == 0:
+            name = random.choice(["streamlit-", "st-", "st_"]) + name
+        names.append(name)
+    return names + EXCLUDE
+
+
+def write_html(names, path):
+    with open(path, "w") as f:
+        f.write("<!DOCTYPE html><html><body>\n")
+        for name in names:
+            f.write(f'<a href="/simple/{name}/">{name}</a>\n')
+        f.write("</body></html>\n")
+
+
+def write_json(names, path):
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "meta": {"_last-serial": 1, "api-version": "1.0"},
+                "projects": [{"_last-serial": 1, "name": name} for name in names],
+            },
+            f,
+        )
+
+
+def with_dom(path):
+    # This is what get_all_packages did before.
+    text = Path(path).read_text()
+    soup = BeautifulSoup(text, "html.parser")
+    return [
+        a.text
+        for a in soup.find_all("a")
+        if (
+            "streamlit" in a.text
+            or a.text.startswith("st-")
+            or a.text.startswith("st_")
+        )
+        and a.text not in EXCLUDE
+    ]
+
+
+def streaming(path, content_type):
+    def chunks():
+        with open(path, "rb") as f:
+            while chunk := f.read(pypi.CHUNK_SIZE):
+                yield chunk
+
+    exclude = set(EXCLUDE)
+    return [
+        n
+        for n in pypi.iter_index_names(chunks(), content_type)
+        if pypi.is_candidate(n) and n not in exclude
+    ]
+
+
+def measure(label, fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>20}: {duration:7.2f}s, peak memory {peak / 1e6:8.1f} MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--packages", type=int, default=500_000)
+    args = parser.parse_args()
+
+    names = make_names(args.packages)
+    with tempfile.TemporaryDirectory() as tmp:
+        html_path, json_path = Path(tmp) / "simple.html", Path(tmp) / "simple.json"
+        write_html(names, html_path)
+        write_json(names, json_path)
+        print(
+            f"{len(names)} packages, index is {html_path.stat().st_size / 1e6:.1f} MB "
+            f"(HTML) / {json_path.stat().st_size / 1e6:.1f} MB (JSON)"
+        )
+
+        expected = measure("BeautifulSoup", with_dom, html_path)
+        assert measure("streaming HTML", streaming, html_path, "text/html") == expected
+        assert (
+            measure("streaming JSON", streaming, json_path, pypi.SIMPLE_JSON)
+            == expected
+        )
+        print(f"{len(expected)} candidates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark the per-rerun cost of getting the catalog, before and after snapshots.
+
+Before, every rerun got the components from `get_components` (memo, so unpickled
+from its cache), hashed the list for each singleton that takes it (search index,
+table, card renderer), merged in the volatile stats and sorted and filtered. Now it
+gets the shared `Snapshot` and looks up cached row ids. This replays both on
+synthetic catalogs and reports time and memory allocated per rerun (only up to 3k
+components, the old way takes seconds per rerun beyond that). Run from the
+repo root with:
+
+    python -m benchmarks.snapshot
+"""
+
+import argparse
+import hashlib
+import pickle
+import time
+import tracemalloc
+
+import numpy as np
+from streamlit.runtime.caching.cache_utils import CacheType
+from streamlit.runtime.caching.hashing import update_hash
+
+from benchmarks.table import CATEGORIES, make_components
+from catalog import ComponentTable
+from search_index import SearchIndex
+from snapshot import SnapshotStore
+from stats import VolatileStats
+
+
+def streamlit_hash(value, cache_type):
+    hasher = hashlib.new("md5")
+    update_hash(value, hasher, cache_type)
+    return hasher.hexdigest()
+
+
+def make_stats(components):
+    volatile_stats = VolatileStats()
+    volatile_stats.downloads = {c.package: 1 for c in components[::2]}
+    volatile_stats._updates = 1
+    return volatile_stats
+
+
+def rerun_before(memo_value, table, search_index, volatile_stats):
+    # get_components(): memo returns a copy of its cached value.
+    components = pickle.loads(memo_value)
+    # get_search_index(components)
+    streamlit_hash(components, CacheType.SINGLETON)
+    components = volatile_stats.apply(components)
+    # get_component_table(components), get_card_renderer(components) (which calls
+    # get_component_table again).
+    for _ in range(3):
+        streamlit_hash(components, CacheType.SINGLETON)
+    rows = table.sort("stars")
+    table.filter(rows, newer_than=None)
+    # table.rank(rows, matches) back then, which scored the whole table.
+    scores = np.full(len(table), np.nan)
+    for row, score in search_index.search("chart"):
+        scores[row] = score
+    rows = rows[~np.isnan(scores[rows])]
+    rows = rows[np.argsort(-scores[rows], kind="stable")]
+    return table.filter(rows, categories=["charts"])
+
+
+def rerun_after(store, volatile_stats):
+    snapshot = store.with_stats(volatile_stats)
+    return store.query(snapshot, "stars", "chart", categories=["charts"])
+
+
+def measure(fn, repeat):
+    fn()  # warm up
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'components':>10} {'':>7} {'per rerun':>10} {'allocated':>10}")
+    for n in [500, 1_500, 3_000]:
+        components = make_components(n)
+        volatile_stats = make_stats(components)
+
+        memo_value = pickle.dumps(components)
+        table = ComponentTable(components, CATEGORIES)
+        search_index = SearchIndex(components)
+        before, before_memory = measure(
+            lambda: rerun_before(memo_value, table, search_index, volatile_stats),
+            args.repeat,
+        )
+
+        store = SnapshotStore(lambda: (None, time.time(), components), CATEGORIES)
+        start = time.perf_counter()
+        store.with_stats(volatile_stats)
+        build = time.perf_counter() - start
+        after, after_memory = measure(
+            lambda: rerun_after(store, volatile_stats), args.repeat
+        )
+
+        print(
+            f"{n:>10} {'before':>7} {before * 1e3:>8.2f}ms "
+            f"{before_memory / 1e6:>8.2f}MB"
+        )
+        print(
+            f"{n:>10} {'after':>7} {after * 1e3:>8.3f}ms "
+            f"{after_memory / 1e6:>8.3f}MB   (once per snapshot: {build * 1e3:.0f}ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
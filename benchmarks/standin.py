@@ -0,0 +1,152 @@
+"""Local HTTP stand-in for PyPI/GitHub, used by the benchmarks."""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@contextmanager
+def serve(handle, latency=0.0):
+    """Run a local HTTP server in a background thread and yield its base url.
+
+    `handle(method, path, headers, body)` returns a tuple of
+    (status_code, headers dict, body bytes). Every response is delayed by `latency`
+    seconds to simulate the round trip to the real server.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            status_code, headers, content = handle(
+                self.command, self.path, self.headers, body
+            )
+            time.sleep(latency)
+            self.send_response(status_code)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = do_POST = _respond
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def serve_redis():
+    """Run a tiny in-memory Redis stand-in and yield its url.
+
+    Knows GET, SET (with NX/XX/PX/EX), EXISTS, DEL, PEXPIRE and PING, plus EVAL for the
+    lease scripts in `shared` (it can't run arbitrary Lua).
+    """
+    import socketserver
+
+    import shared
+
+    data = {}  # key -> (value, expires_at or None)
+    lock = threading.Lock()
+
+    def lookup(key):
+        value, expires_at = data.get(key, (None, None))
+        if expires_at is not None and expires_at < time.time():
+            del data[key]
+            return None
+        return value
+
+    def execute(args):
+        command = args[0].decode().upper()
+        if command in ("PING", "AUTH", "SELECT"):
+            return "+OK"
+        if command == "GET":
+            return lookup(args[1])
+        if command == "EXISTS":
+            return sum(lookup(key) is not None for key in args[1:])
+        if command == "DEL":
+            return sum(data.pop(key, None) is not None for key in args[1:])
+        if command == "SET":
+            key, value, options = (
+                args[1],
+                args[2],
+                [a.decode().upper() for a in args[3:]],
+            )
+            exists = lookup(key) is not None
+            if ("NX" in options and exists) or ("XX" in options and not exists):
+                return None
+            expires_at = None
+            for unit, scale in [("PX", 1000), ("EX", 1)]:
+                if unit in options:
+                    expires_at = (
+                        time.time() + int(options[options.index(unit) + 1]) / scale
+                    )
+            data[key] = (value, expires_at)
+            return "+OK"
+        if command == "PEXPIRE":
+            if lookup(args[1]) is None:
+                return 0
+            data[args[1]] = (data[args[1]][0], time.time() + int(args[2]) / 1000)
+            return 1
+        if command == "EVAL":
+            script, key, owner = args[1].decode(), args[3], args[4]
+            if lookup(key) != owner:
+                return 0
+            if script == shared._RENEW:
+                return execute([b"PEXPIRE", key, args[5]])
+            if script == shared._RELEASE:
+                return execute([b"DEL", key])
+        return "-ERR unknown command"
+
+    def encode(reply):
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, str):
+            return reply.encode() + b"\r\n"
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int(self.rfile.readline()[1:])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                with lock:
+                    reply = execute(args)
+                self.wfile.write(encode(reply))
+
+    class Server(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,128 @@
+"""Compare the SQLite response store with the old memo disk cache.
+
+The memo cache of `get` pickled the full text of every response into its own file
+(PyPI project pages, Github pages and the simple index). The store keeps only the
+extracted fields per url, optionally with the zlib-compressed body. This writes the
+same synthetic crawl into each of them and reports the size on disk and how long a
+warm start takes to load everything. Run from the repo root with:
+
+    python -m benchmarks.store
+"""
+
+import argparse
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+import pypi
+from benchmarks.parsing import README, project_page, pypi_json
+from store import ResponseStore
+
+
+def make_responses(n):
+    """return [(url, body bytes, extracted value)] like in a crawl"""
+    responses = []
+    # The simple index (~400k packages), of which we only keep the candidates.
+    index = "".join(
+        f'<a href="/simple/package-{i}/">package-{i}</a>\n' for i in range(400_000)
+    )
+    candidates = [f"streamlit-{i}" for i in range(n)]
+    responses.append(("https://pypi.org/simple/", index.encode(), candidates))
+    for i in range(n):
+        page = project_page(i)
+        responses.append(
+            (pypi.project_url(f"st-{i}"), page.encode(), pypi.parse_html(page))
+        )
+        data = pypi_json(i)
+        responses.append(
+            (pypi.json_url(f"st-{i}"), data.encode(), pypi.parse_json(data))
+        )
+        responses.append(
+            (
+                f"https://api.github.com/repos/user/st-{i}/readme",
+                README.encode(),
+                ("img", "text", None),
+            )
+        )
+    return responses
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path)
+        for f in files
+    )
+
+
+def write_memo(directory, responses):
+    # One pickle of the return value (status code, text) per call.
+    for url, body, _ in responses:
+        key = hashlib.md5(url.encode()).hexdigest()
+        with open(directory / f"{key}.memo", "wb") as f:
+            pickle.dump((200, body.decode()), f)
+
+
+def load_memo(directory):
+    values = {}
+    for path in directory.iterdir():
+        with open(path, "rb") as f:
+            values[path.stem] = pickle.load(f)
+    return values
+
+
+def write_store(path, responses, keep_bodies):
+    store = ResponseStore(path, keep_bodies=keep_bodies)
+    for url, body, value in responses:
+        entry = {
+            "etag": '"abc"',
+            "last_modified": None,
+            "value": value,
+            "size": len(body),
+            "fetched_at": time.time(),
+        }
+        store.put(url, entry, body)
+    store.close()
+
+
+def timeit(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--packages", type=int, default=1_000)
+    args = parser.parse_args()
+
+    responses = make_responses(args.packages)
+    total = sum(len(body) for _, body, _ in responses)
+    print(f"{len(responses)} responses, {total / 1e6:.0f} MB\n")
+    print(f"{'':>24} {'on disk':>9} {'warm start':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memo = Path(tmp) / "memo"
+        memo.mkdir()
+        write_memo(memo, responses)
+        load = timeit(lambda: load_memo(memo))
+        size = directory_size(memo)
+        print(f"{'memo (pickled pages)':>24} {size / 1e6:>7.1f}MB {load * 1e3:>9.0f}ms")
+
+        for keep_bodies in [False, True]:
+            path = Path(tmp) / f"store-{keep_bodies}.sqlite"
+            write_store(path, responses, keep_bodies)
+            load = timeit(lambda: ResponseStore(path)._db.close())
+            label = "sqlite + bodies (zlib)" if keep_bodies else "sqlite (fields only)"
+            size = os.path.getsize(path)
+            print(f"{label:>24} {size / 1e6:>7.1f}MB {load * 1e3:>9.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Benchmark memory and sort/filter latency of `ComponentTable` against the list.
+
+Compares the old way (sorting and filtering a list of `Component` dataclasses with
+Python lambdas) with the columnar table, on synthetic catalogs from today's size up to
+100k components. Also checks that both give the same order. Run from the repo root
+with:
+
+    python -m benchmarks.table
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from catalog import Component, ComponentTable
+
+CATEGORIES = ["widgets", "charts", "image", "video", "text", "maps", "development"]
+
+
+def make_components(n):
+    random.seed(0)
+    components = []
+    for i in range(n):
+        user = f"user{i % 3000}"
+        package = f"streamlit-component-{i}"
+        created_at = datetime(2019, 1, 1) + timedelta(days=random.randint(0, 1500))
+        components.append(
+            Component(
+                name=f"Component {i}",
+                package=package,
+                demo=f"https://{package}.streamlit.app" if i % 3 == 0 else None,
+                forum_post=None,
+                github=f"https://github.com/{user}/{package}",
+                pypi=f"https://pypi.org/project/{package}/",
+                image_url=(
+                    f"https://github.com/{user}/{package}/raw/HEAD/demo.png"
+                    if i % 2 == 0
+                    else None
+                ),
+                stars=random.choice([None, random.randint(0, 2000)]),
+                github_description=f"A Streamlit component that does thing number {i}",
+                pypi_description=f"Does thing number {i}",
+                avatar=f"https://avatars.githubusercontent.com/u/{i % 3000}?v=4",
+                github_author=user,
+                pypi_author=user,
+                created_at=created_at if i % 10 else None,
+                released_at=created_at + timedelta(days=3),
+                downloads=random.choice([None, random.randint(0, 100_000)]),
+                categories=random.sample(CATEGORIES, random.randint(0, 2)),
+            )
+        )
+    return components
+
+
+def sort_list(components, by):
+    # This is how `sort_components` worked before.
+    if by == "stars":
+        key = lambda c: (c.stars if c.stars is not None else 0, c.image_url is not None)
+    elif by == "downloads":
+        key = lambda c: (
+            c.downloads if c.downloads is not None else 0,
+            c.image_url is not None,
+        )
+    else:
+        key = lambda c: (
+            c.created_at or c.released_at or datetime(1970, 1, 1),
+            c.image_url is not None,
+        )
+    return sorted(components, key=key, reverse=True)
+
+
+def filter_list(components, category=None, newer_than=None):
+    # This is how `filter_components` worked before.
+    if category:
+        components = list(filter(lambda c: category in c.categories, components))
+    if newer_than:
+        components = list(
+            filter(
+                lambda c: (c.created_at or c.released_at or datetime(1970, 1, 1))
+                >= newer_than,
+                components,
+            )
+        )
+    return components
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    newer_than = datetime(2022, 6, 1)
+
+    print(f"{'components':>10} {'operation':>26} {'list':>10} {'table':>10}")
+    for n in [1_500, 10_000, 30_000, 100_000]:
+        components, list_size = measure_memory(lambda: make_components(n))
+        # Build the table from its own copy of the components, which is freed again,
+        # so this counts the strings that are only kept alive by the table.
+        _, table_size = measure_memory(
+            lambda: ComponentTable(make_components(n), CATEGORIES)
+        )
+        table = ComponentTable(components, CATEGORIES)
+        print(
+            f"{n:>10} {'memory per component':>26} {list_size / n:>9.0f}B "
+            f"{table_size / n:>9.0f}B"
+        )
+
+        for by in ["stars", "downloads", "date"]:
+            by_list = sort_list(components, by)
+            by_table = table.sort(by)
+            assert [c.package for c in by_list] == [
+                table.strings["package"][i] for i in by_table
+            ], by
+            list_time = timeit(lambda: sort_list(components, by), args.repeat)
+            table_time = timeit(lambda: table.sort(by), args.repeat)
+            print(
+                f"{n:>10} {'sort by ' + by:>26} {list_time * 1e3:>8.2f}ms "
+                f"{table_time * 1e3:>8.2f}ms"
+            )
+
+        by_list = sort_list(components, "stars")
+        rows = table.sort("stars")
+        cases = [
+            ("category", {"category": "charts"}, {"categories": ["charts"]}),
+            ("newer than", {"newer_than": newer_than}, {"newer_than": newer_than}),
+        ]
+        for name, list_kwargs, table_kwargs in cases:
+            filtered = filter_list(by_list, **list_kwargs)
+            assert [c.package for c in filtered] == [
+                table.strings["package"][i] for i in table.filter(rows, **table_kwargs)
+            ], name
+            list_time = timeit(lambda: filter_list(by_list, **list_kwargs), args.repeat)
+            table_time = timeit(lambda: table.filter(rows, **table_kwargs), args.repeat)
+            print(
+                f"{n:>10} {'filter ' + name:>26} {list_time * 1e3:>8.2f}ms "
+                f"{table_time * 1e3:>8.2f}ms"
+            )
+
+        # Not possible with the list before, so only the table.
+        for match_all in [False, True]:
+            table_time = timeit(
+                lambda: table.filter(
+                    rows, categories=["charts", "maps"], match_all=match_all
+                ),
+                args.repeat,
+            )
+            name = "charts AND maps" if match_all else "charts OR maps"
+            print(f"{n:>10} {name:>26} {'':>10} {table_time * 1e3:>8.2f}ms")
+
+        # Building the components that are shown (first page).
+        table_time = timeit(lambda: table.take(rows[:60]), args.repeat)
+        print(
+            f"{n:>10} {'build 60 shown components':>26} {'':>10} {table_time * 1e3:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark bytes per page view with and without the thumbnail pipeline.
+
+Serves synthetic card images (animated GIFs and full-size screenshots, like the ones
+linked from READMEs) and avatars from a local stand-in, runs them through
+`ThumbnailStore.fetch` and compares what a visitor downloads for the first page of
+cards: the originals or the thumbnails. Time until all images of the page are shown
+is estimated from the bytes, for a browser with 6 connections per host on a few
+typical bandwidths. Run from the repo root with:
+
+    python -m benchmarks.thumbnails
+"""
+
+import argparse
+import io
+import math
+import os
+import random
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+import thumbnails
+from benchmarks.standin import serve
+
+BANDWIDTHS = {"3G (1.6 Mbit/s)": 1.6e6, "DSL (10 Mbit/s)": 10e6, "50 Mbit/s": 50e6}
+CONNECTIONS = 6
+
+
+def make_screenshot(i, size=(2400, 1500)):
+    # Flat app-like areas plus a chart with noise, which doesn't compress well.
+    random.seed(i)
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 500, size[1]), fill=(240, 242, 246))
+    for _ in range(40):
+        x, y = random.randrange(size[0]), random.randrange(size[1])
+        color = tuple(random.randrange(256) for _ in range(3))
+        draw.rectangle((x, y, x + random.randrange(400), y + 30), fill=color)
+    noise = Image.effect_noise((600, 350), 60).convert("RGB")
+    image.paste(noise, (800, 500))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def make_animation(i, size=(800, 500), frames=30):
+    random.seed(i)
+    images = []
+    for frame in range(frames):
+        image = Image.new("RGB", size, (250, 250, 250))
+        draw = ImageDraw.Draw(image)
+        for _ in range(20):
+            x, y = random.randrange(size[0]), random.randrange(size[1])
+            draw.ellipse((x, y, x + 80, y + 80), fill=(frame * 8, 100, 200 - i % 100))
+        image.paste(Image.effect_noise((300, 200), 40).convert("RGB"), (400, 250))
+        images.append(image)
+    buffer = io.BytesIO()
+    images[0].save(buffer, "GIF", save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+def make_avatar(i, size=(460, 460)):
+    image = Image.new("RGB", size, (i * 37 % 256, i * 91 % 256, i * 53 % 256))
+    ImageDraw.Draw(image).ellipse((100, 100, 360, 360), fill="white")
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def load_time(sizes, bandwidth, latency):
+    """rough time until all images are loaded, in seconds."""
+    round_trips = math.ceil(len(sizes) / CONNECTIONS) * latency
+    return round_trips + sum(sizes) * 8 / bandwidth
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"Making {args.cards} synthetic card images and avatars...")
+    files = {}
+    for i in range(args.cards):
+        if i % 3 == 0:
+            files[f"/image/{i}.gif"] = make_animation(i)
+        else:
+            files[f"/image/{i}.png"] = make_screenshot(i)
+        files[f"/avatar/{i}.png"] = make_avatar(i)
+
+    def handle(method, path, headers, body):
+        if path in files:
+            return 200, {"Content-Type": "image/png"}, files[path]
+        return 404, {}, b""
+
+    with serve(handle, latency=args.latency) as base:
+        with tempfile.TemporaryDirectory() as d:
+            store = thumbnails.ThumbnailStore(d)
+            image_urls = [base + p for p in files if p.startswith("/image/")]
+            avatar_urls = [base + p for p in files if p.startswith("/avatar/")]
+            start = time.perf_counter()
+            images = store.fetch(image_urls, thumbnails.CARD_SIZE)
+            avatars = store.fetch(avatar_urls, thumbnails.AVATAR_SIZE)
+            pipeline_time = time.perf_counter() - start
+
+            original = [len(files[p]) for p in files]
+            thumbnail = [
+                os.path.getsize(path)
+                for path in list(images.values()) + list(avatars.values())
+            ]
+
+    print(f"Pipeline (once per crawl): {pipeline_time:.1f}s, {store.summary()}")
+    print()
+    print(f"{'':>30} {'originals':>12} {'thumbnails':>12}")
+    print(
+        f"{'bytes per page view':>30} {sum(original) / 1e6:>10.1f}MB "
+        f"{sum(thumbnail) / 1e6:>10.2f}MB"
+    )
+    for name, bandwidth in BANDWIDTHS.items():
+        before = load_time(original, bandwidth, args.latency)
+        after = load_time(thumbnail, bandwidth, args.latency)
+        print(f"{'images shown, ' + name:>30} {before:>11.1f}s {after:>11.1f}s")
+
+
+if __name__ == "__main__":
+    main()
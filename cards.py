@@ -0,0 +1,299 @@
+"""Rendering of the component cards in the grid.
+
+`show_components` writes every card as a bunch of separate elements (columns,
+image, title, caption, description, code and links). `show_components_batched`
+renders the same cards as html instead: each card's html is built once per
+snapshot by `CardRenderer`, and the visible grid goes out as a handful of markdown
+elements, no matter how many cards are shown.
+"""
+
+import html
+
+import streamlit as st
+from streamlit import runtime
+from markdownlit import mdlit
+
+import thumbnails
+
+NUM_COLS = 4
+# Cards per markdown element in batched mode. Streamlit caches large messages in the
+# browser by their hash, so blocks that didn't change aren't sent again.
+CARDS_PER_BLOCK = 5 * NUM_COLS
+INSTALL_COMMAND = "pip install"
+DEFAULT_IMAGE = "default_image.png"
+DEFAULT_AVATAR = thumbnails.DEFAULT_AVATAR
+
+
+def chunks(lst, n):
+    """Yield successive n-sized chunks from lst."""
+    for i in range(0, len(lst), n):
+        yield lst[i : i + n]
+
+
+def shorten(text, length=100):
+    if len(text) > length:
+        short_text = text[:length]
+
+        # Cut last word if short_text doesn't end on a word.
+        if short_text[-1] != " " and text[length] != " ":
+            short_text = short_text[: short_text.rfind(" ")]
+
+        # Remove whitespace at the end.
+        short_text = short_text.rstrip()
+
+        # Deal with sentence end markers.
+        if short_text[-1] in [".", "!", "?"]:
+            return short_text
+        elif short_text[-1] in [",", ";", ":", "-"]:
+            return short_text[:-1] + "..."
+        else:
+            return short_text + "..."
+    else:
+        return text
+
+
+@st.experimental_memo(show_spinner=False)
+def avatar_data_uri(path):
+    # Thumbnails are content-addressed, so the path always has the same content.
+    return thumbnails.data_uri(path)
+
+
+# Can't memo-ize this right now because st.image doesn't work.
+# @st.experimental_memo
+def show_components(components, limit=None):
+    if limit is not None:
+        components = components[:limit]
+
+    for i, components_chunk in enumerate(chunks(components, NUM_COLS)):
+        cols = st.columns(NUM_COLS, gap="medium")
+        for c, col in zip(components_chunk, cols):
+            with col:
+                if thumbnails.exists(c.image_thumbnail):
+                    img_path = c.image_thumbnail
+                elif c.image_url is not None:
+                    img_path = c.image_url
+                # TODO: This doesn't work on Cloud, disabling for now.
+                # elif c.demo is not None:
+                #     screenshot_dir = Path("screenshots")
+                #     screenshot_dir.mkdir(exist_ok=True, parents=True)
+                #     escaped_screenshot_url = (
+                #         c.demo.replace("https://", "")
+                #         .replace("/", "_")
+                #         .replace(".", "_")
+                #     )
+                #     img_path = screenshot_dir / f"{escaped_screenshot_url}.png"
+                #     if not img_path.exists():
+                #         save_screenshot(c.demo, img_path, sleep=15)
+                else:
+                    img_path = DEFAULT_IMAGE
+
+                st.image(str(img_path), use_column_width=True)
+                title = f"#### {c.name}"
+                if c.stars:
+                    title += f" ({c.stars} ⭐️)"
+                # print(title)
+                st.write(title)
+                if thumbnails.exists(c.avatar_thumbnail):
+                    # Avatars are tiny, so inline them into the html.
+                    avatar_path = avatar_data_uri(c.avatar_thumbnail)
+                elif c.avatar:
+                    avatar_path = c.avatar
+                else:
+                    # TODO: Need to use web URL because we can't expose image through static folder.
+                    avatar_path = DEFAULT_AVATAR
+                if c.github_author and c.avatar:
+                    st.caption(
+                        f'<a href="https://github.com/{c.github_author}"><img src="{avatar_path}" style="border: 1px solid #D6D6D9; width: 20px; height: 20px; border-radius: 50%"></a> &nbsp; <a href="https://github.com/{c.github_author}" style="color: inherit; text-decoration: inherit">{c.github_author}</a>',
+                        unsafe_allow_html=True,
+                    )
+                # elif c.github_author:
+                #     # TODO: Some of the Github pages extracted above return 404, so
+                #     # we can't get the avatar image from them. We could get them by
+                #     # querying with the author name directly but for now I'm just hiding the avatar images.
+                #     st.caption(
+                #         f'<a href="https://github.com/{c.github_author}" style="color: inherit; text-decoration: inherit">{c.github_author}</a>',
+                #         unsafe_allow_html=True,
+                #     )
+                elif c.pypi_author:
+                    st.caption(
+                        f'<a href="https://pypi.org/user/{c.pypi_author}"><img src="{avatar_path}" style="border: 1px solid #D6D6D9; width: 20px; height: 20px; border-radius: 50%"></a> &nbsp; <a href="https://pypi.org/user/{c.pypi_author}" style="color: inherit; text-decoration: inherit">{c.pypi_author}</a>',
+                        unsafe_allow_html=True,
+                    )
+
+                if c.github_description:
+                    st.write(shorten(c.github_description))
+                elif c.pypi_description:
+                    st.write(c.pypi_description)
+                if c.package:
+                    st.code(f"{INSTALL_COMMAND} {c.package}", None)
+                formatted_links = []
+                if c.github:
+                    # formatted_links.append(mention("Github", c.github, icon="github", write=False))
+                    # formatted_links.append(f"[GitHub]({c.github})")
+                    formatted_links.append(f"@(GitHub)({c.github})")
+                if c.demo:
+                    # formatted_links.append(mention("Demo", c.demo, icon="🎈", write=False))
+                    # formatted_links.append(f"[Demo]({c.demo})")
+                    formatted_links.append(f"@(🎈)(Demo)({c.demo})")
+                if c.forum_post:
+                    # formatted_links.append(f"[Forum]({c.forum_post})")
+                    # formatted_links.append(mention("Forum", c.forum_post, icon="streamlit", write=False))
+                    formatted_links.append(f"@(Forum)({c.forum_post})")
+                if c.pypi:
+                    # formatted_links.append(f"[PyPI]({c.pypi})")
+                    # formatted_links.append(mention("PyPI", c.pypi, icon="📦", write=False))
+                    formatted_links.append(f"@(📦)(PyPI)({c.pypi})")
+
+                # st.write(" • ".join(formatted_links), unsafe_allow_html=True)
+                mdlit(" &nbsp;•&nbsp; ".join(formatted_links))
+                # st.caption(", ".join(c.categories))
+                st.write("")
+                st.write("")
+                st.write("")
+
+        # if i < (min(limit, len(components)) // NUM_COLS) - 1:
+        # st.write("---")
+
+
+GRID_STYLE = f"""
+<style>
+.card-grid {{display: grid; grid-template-columns: repeat({NUM_COLS}, minmax(0, 1fr)); gap: 2rem}}
+.card-grid .card-image {{border: 1px solid #D6D6D9; border-radius: 3px; height: 200px; object-fit: cover; width: 100%}}
+.card-grid h4 {{padding: 0.75rem 0 0.25rem 0}}
+.card-grid .card-author {{color: rgba(49, 51, 63, 0.6); font-size: 14px}}
+.card-grid .card-author a {{color: inherit; text-decoration: inherit}}
+.card-grid .card-author img {{border: 1px solid #D6D6D9; width: 20px; height: 20px; border-radius: 50%; vertical-align: middle}}
+.card-grid pre {{padding: 0.5rem 0.75rem}}
+@media (max-width: 768px) {{.card-grid {{grid-template-columns: minmax(0, 1fr)}}}}
+</style>
+"""
+
+
+class CardRenderer:
+    """Builds (and keeps) the html of each card, for one snapshot of the catalog.
+
+    `component(row)` returns the component in a row, e.g. `ComponentTable.row`.
+
+    Card images are served by Streamlit's media file manager (`media_files`, the one
+    of the running app by default), at urls the browser caches: 60 inlined 600x400
+    thumbnails were ~1.2 MB per rerun. Only the tiny avatars are inlined.
+    """
+
+    def __init__(self, component, media_files=None):
+        self.component = component
+        self.media_files = media_files
+        self._cards = {}
+        self._images = {}  # row -> thumbnail path (or bytes) of its card image
+        self._data_uris = {}
+        self._default = None
+
+    def _avatar_src(self, path, fallback):
+        if thumbnails.exists(path):
+            if path not in self._data_uris:
+                self._data_uris[path] = thumbnails.data_uri(path)
+            return self._data_uris[path]
+        return fallback
+
+    def _card_image(self, c):
+        """return the thumbnail path of the card image of `c`, the default image as
+        bytes if it doesn't have any or None if it's only got the original url."""
+        if thumbnails.exists(c.image_thumbnail):
+            return c.image_thumbnail
+        if c.image_url:
+            return None
+        if self._default is None:
+            with open(DEFAULT_IMAGE, "rb") as f:
+                data = thumbnails.make_thumbnail(f.read(), thumbnails.CARD_SIZE)
+            self._default = data
+        return self._default
+
+    def _serve(self, image):
+        """return the url of a card image.
+
+        Streamlit forgets the media files of a session at every rerun, so this has to
+        be called for every card that's shown, in every rerun.
+        """
+        media_files = self.media_files
+        if media_files is None:
+            if not runtime.exists():  # e.g. in bare mode
+                if isinstance(image, bytes):
+                    return thumbnails.to_data_uri(image)
+                return thumbnails.data_uri(image)
+            media_files = runtime.get_instance().media_file_mgr
+        key = image if isinstance(image, str) else DEFAULT_IMAGE
+        url = media_files.add(image, "image/webp", f"card-image-{key}")
+        # The file name is the hash of the content, so the image at a url never
+        # changes. With a `v` argument, the server lets the browser cache it for good.
+        # Relative (no leading slash), so it also works with `server.baseUrlPath`.
+        return url.lstrip("/") + "?v=1"
+
+    def render(self, c):
+        """return the html of the card for component `c`."""
+        e = html.escape
+        image = self._card_image(c)
+        image = c.image_url if image is None else self._serve(image)
+        title = e(c.name or "")
+        if c.stars:
+            title += f" ({c.stars} ⭐️)"
+        parts = [f'<img class="card-image" src="{e(image)}">', f"<h4>{title}</h4>"]
+
+        avatar = self._avatar_src(c.avatar_thumbnail, c.avatar or DEFAULT_AVATAR)
+        if c.github_author and c.avatar:
+            profile, author = f"https://github.com/{c.github_author}", c.github_author
+        elif c.pypi_author:
+            profile, author = f"https://pypi.org/user/{c.pypi_author}", c.pypi_author
+        else:
+            profile = None
+        if profile:
+            parts.append(
+                f'<p class="card-author"><a href="{e(profile)}"><img src="{e(avatar)}">'
+                f'</a> &nbsp; <a href="{e(profile)}">{e(author)}</a></p>'
+            )
+
+        if c.github_description:
+            parts.append(f"<p>{e(shorten(c.github_description))}</p>")
+        elif c.pypi_description:
+            parts.append(f"<p>{e(c.pypi_description)}</p>")
+        if c.package:
+            parts.append(f"<pre><code>{e(INSTALL_COMMAND)} {e(c.package)}</code></pre>")
+
+        links = [
+            (label, url)
+            for label, url in [
+                ("GitHub", c.github),
+                ("🎈 Demo", c.demo),
+                ("Forum", c.forum_post),
+                ("📦 PyPI", c.pypi),
+            ]
+            if url
+        ]
+        if links:
+            parts.append(
+                "<p>"
+                + " &nbsp;•&nbsp; ".join(
+                    f'<a href="{e(url)}" target="_blank">{label}</a>'
+                    for label, url in links
+                )
+                + "</p>"
+            )
+        return '<div class="card">' + "".join(parts) + "</div>"
+
+    def card(self, row):
+        if row not in self._cards:
+            c = self.component(row)
+            self._cards[row] = self.render(c)
+            self._images[row] = self._card_image(c)
+        elif self._images[row] is not None:
+            self._serve(self._images[row])
+        return self._cards[row]
+
+
+def show_components_batched(renderer, rows):
+    """show the cards of `rows` as a few markdown elements."""
+    for block in chunks(list(rows), CARDS_PER_BLOCK):
+        cards = "".join(renderer.card(row) for row in block)
+        st.markdown(
+            GRID_STYLE + f'<div class="card-grid">{cards}</div>',
+            unsafe_allow_html=True,
+        )
+        st.write("")
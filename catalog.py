@@ -0,0 +1,307 @@
+"""The component records, the catalog file they're stored in and a compact columnar
+table of them.
+
+`ComponentTable` stores the catalog column by column: numpy arrays for the numbers
+and dates we sort and filter by, a bitmask for the categories and lists of interned
+strings for everything else. Sorting and filtering are vectorized and return row
+ids, components are only built again for the rows that are actually shown.
+"""
+
+import dataclasses
+import gzip
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+
+@dataclass
+class Component:
+    name: str = None
+    package: str = None
+    demo: str = None
+    forum_post: str = None
+    github: str = None
+    pypi: str = None
+    image_url: str = None
+    image_thumbnail: str = None  # local path, see thumbnails.py
+    # screenshot_url: str = None
+    stars: int = None
+    github_description: str = None
+    pypi_description: str = None
+    avatar: str = None
+    avatar_thumbnail: str = None
+    github_author: str = None
+    pypi_author: str = None
+    created_at: datetime = None
+    released_at: datetime = None
+    downloads: int = None
+    categories: List[str] = None
+
+
+# Written by `python pipeline.py`, read by the app at startup.
+CATALOG_PATH = Path("catalog.jsonl")
+# Bump this when the file format or `Component` changes in an incompatible way.
+CATALOG_FORMAT = 1
+
+
+def _to_json(c):
+    d = dataclasses.asdict(c)
+    for field in ["created_at", "released_at"]:
+        if d[field] is not None:
+            d[field] = d[field].isoformat()
+    return json.dumps(d, ensure_ascii=False, separators=(",", ":"))
+
+
+def _from_json(line):
+    d = json.loads(line)
+    for field in ["created_at", "released_at"]:
+        if d.get(field) is not None:
+            d[field] = datetime.fromisoformat(d[field])
+    known = {f.name for f in fields(Component)}
+    return Component(**{k: v for k, v in d.items() if k in known})
+
+
+def _open(path, mode, gzipped):
+    if gzipped:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_catalog(path, components, crawled_at, **header):
+    """write components to a catalog file and return its version.
+
+    The file is JSON lines: a header with format, version and crawl time, then one
+    component per line (so two catalogs can be compared with `diff`). Gzipped if the
+    path ends with `.gz`. The version is a hash of the components. Keyword arguments
+    are added to the header (e.g. `pypi_serial`, see `read_header`).
+    """
+    lines = [_to_json(c) for c in components]
+    version = hashlib.sha1("\n".join(lines).encode()).hexdigest()[:12]
+    header = {
+        "format": CATALOG_FORMAT,
+        "version": version,
+        "crawled_at": crawled_at,
+        "components": len(lines),
+        **header,
+    }
+    tmp = f"{path}.tmp"
+    with _open(tmp, "w", str(path).endswith(".gz")) as f:
+        f.write(json.dumps(header) + "\n")
+        for line in lines:
+            f.write(line + "\n")
+    os.replace(tmp, path)
+    return version
+
+
+def read_header(path):
+    """return the header of a catalog file as a dict."""
+    with _open(path, "r", str(path).endswith(".gz")) as f:
+        return json.loads(f.readline())
+
+
+def read_catalog(path):
+    """read a catalog file, returns (version, crawled_at, components)."""
+    with _open(path, "r", str(path).endswith(".gz")) as f:
+        header = json.loads(f.readline())
+        if header.get("format") != CATALOG_FORMAT:
+            raise ValueError(
+                f"{path} has format {header.get('format')}, expected {CATALOG_FORMAT}"
+            )
+        components = [_from_json(line) for line in f if line.strip()]
+    return header["version"], header["crawled_at"], components
+
+
+def diff_catalogs(old, new):
+    """describe which components were added, removed or changed between two catalogs
+    (as returned by `read_catalog`)."""
+    key = lambda c: c.package or c.name
+    old_components = {key(c): c for c in old[2]}
+    new_components = {key(c): c for c in new[2]}
+    lines = [f"{old[0]} -> {new[0]}"]
+    for k in sorted(new_components.keys() - old_components.keys()):
+        lines.append(f"+ {k}")
+    for k in sorted(old_components.keys() - new_components.keys()):
+        lines.append(f"- {k}")
+    for k in sorted(old_components.keys() & new_components.keys()):
+        a, b = old_components[k], new_components[k]
+        changed = [
+            f"{f.name}: {getattr(a, f.name)!r} -> {getattr(b, f.name)!r}"
+            for f in fields(Component)
+            if getattr(a, f.name) != getattr(b, f.name)
+        ]
+        if changed:
+            lines.append(f"~ {k}: " + ", ".join(changed))
+    return "\n".join(lines)
+
+
+NUMBER_FIELDS = ["stars", "downloads"]
+DATE_FIELDS = ["created_at", "released_at"]
+STRING_FIELDS = [
+    f.name
+    for f in fields(Component)
+    if f.name not in NUMBER_FIELDS + DATE_FIELDS + ["categories"]
+]
+
+# Stands in for None in the integer columns.
+MISSING = -1
+
+
+def _intern(s):
+    return None if s is None else sys.intern(s)
+
+
+def _to_datetime64(values):
+    return np.array(
+        [np.datetime64("NaT") if v is None else np.datetime64(v, "s") for v in values],
+        dtype="datetime64[s]",
+    )
+
+
+class ComponentTable:
+    def __init__(self, components, categories=()):
+        # Categories are stored as one bit per category, in the given order.
+        # Categories that aren't in `categories` get bits after those.
+        self.category_names = list(categories)
+        for c in components:
+            for category in c.categories or []:
+                if category not in self.category_names:
+                    self.category_names.append(category)
+        if len(self.category_names) > 64:
+            raise ValueError("ComponentTable supports at most 64 categories")
+        self.category_bits = {
+            name: np.uint64(1) << np.uint64(i)
+            for i, name in enumerate(self.category_names)
+        }
+
+        self.strings = {
+            field: [_intern(getattr(c, field)) for c in components]
+            for field in STRING_FIELDS
+        }
+        self.numbers = {
+            field: np.array(
+                [
+                    MISSING if getattr(c, field) is None else getattr(c, field)
+                    for c in components
+                ],
+                dtype=np.int64,
+            )
+            for field in NUMBER_FIELDS
+        }
+        self.dates = {
+            field: _to_datetime64(getattr(c, field) for c in components)
+            for field in DATE_FIELDS
+        }
+        self.categories = np.array(
+            [self._mask(c.categories or []) for c in components], dtype=np.uint64
+        )
+        self.has_categories = np.array(
+            [c.categories is not None for c in components], dtype=bool
+        )
+
+        # Precomputed sort keys. Same as before: missing numbers count as 0, the
+        # date is when the repo was created or, without a repo, the first release.
+        self.has_image = np.array(
+            [s is not None for s in self.strings["image_url"]], dtype=bool
+        )
+        date = self.dates["created_at"].copy()
+        no_date = np.isnat(date)
+        date[no_date] = self.dates["released_at"][no_date]
+        self.date = np.where(np.isnat(date), 0, date.astype(np.int64))
+        self.sort_keys = {
+            "stars": np.maximum(self.numbers["stars"], 0),
+            "downloads": np.maximum(self.numbers["downloads"], 0),
+            "date": self.date,
+        }
+
+    def __len__(self):
+        return len(self.categories)
+
+    def _mask(self, categories):
+        mask = np.uint64(0)
+        for category in categories:
+            mask |= self.category_bits[category]
+        return mask
+
+    def sort(self, by, rows=None):
+        """return row ids sorted by `by` ("stars", "downloads" or "date"), descending.
+
+        Rows with an image come first among equal values. Ties keep their order.
+        """
+        if rows is None:
+            rows = np.arange(len(self))
+        key = self.sort_keys[by][rows]
+        # lexsort is stable and sorts by the last key first.
+        order = np.lexsort((~self.has_image[rows], -key))
+        return rows[order]
+
+    def filter(self, rows, categories=None, match_all=False, newer_than=None):
+        """return the subset of `rows` in the given categories and time window.
+
+        With several categories, rows need to be in any of them, or in all of them
+        if `match_all` is set. Order of `rows` is kept.
+        """
+        keep = np.ones(len(rows), dtype=bool)
+        if categories:
+            mask = self._mask(categories)
+            row_categories = self.categories[rows] & mask
+            keep &= row_categories == mask if match_all else row_categories != 0
+        if newer_than is not None:
+            keep &= self.date[rows] >= int(
+                np.datetime64(newer_than, "s").astype(np.int64)
+            )
+        return rows[keep]
+
+    def rank(self, matches, position):
+        """return the rows in `matches` ((row, score) pairs), best first.
+
+        Rows with the same score are ordered by `position` (row -> position, e.g. in
+        the sort order, see `LandingViews.positions`). Only looks at the matches, not
+        the whole table.
+        """
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        rows = np.fromiter((row for row, _ in matches), np.int64, len(matches))
+        scores = np.fromiter((score for _, score in matches), float, len(matches))
+        # lexsort sorts by the last key first.
+        return rows[np.lexsort((position[rows], -scores))]
+
+    def row(self, i):
+        """build the component in row `i`.
+
+        Categories come back in the order of the table and dates in whole seconds.
+        """
+        values = {field: column[i] for field, column in self.strings.items()}
+        for field, column in self.numbers.items():
+            values[field] = None if column[i] == MISSING else int(column[i])
+        for field, column in self.dates.items():
+            values[field] = None if np.isnat(column[i]) else column[i].astype(datetime)
+        if self.has_categories[i]:
+            mask = self.categories[i]
+            values["categories"] = [
+                name for name, bit in self.category_bits.items() if mask & bit
+            ]
+        return Component(**values)
+
+    def take(self, rows):
+        return [self.row(i) for i in rows]
+
+    def nbytes(self):
+        """rough memory use of the table in bytes (shared strings counted once)."""
+        size = sum(a.nbytes for a in self.numbers.values())
+        size += sum(a.nbytes for a in self.dates.values())
+        size += self.categories.nbytes + self.has_categories.nbytes
+        size += self.has_image.nbytes + sum(a.nbytes for a in self.sort_keys.values())
+        strings = {}
+        for column in self.strings.values():
+            size += sys.getsizeof(column)
+            for s in column:
+                if s is not None:
+                    strings[id(s)] = sys.getsizeof(s)
+        return size + sum(strings.values())
@@ -0,0 +1,115 @@
+"""Checkpoints of a running crawl, so an interrupted crawl can pick up where it
+stopped.
+
+Every finished item (e.g. one PyPI project or one Github repo) is appended to a log
+file right away. When the crawl starts again, items that are in the log are taken
+from there instead of being fetched again. Failed items are logged too, with the
+reason and how often they were tried. They're retried on the next run until they
+failed `MAX_ATTEMPTS` times, and they never abort the whole crawl.
+"""
+
+import json
+import pickle
+import time
+from pathlib import Path
+
+CHECKPOINT_PATH = Path(".cache") / "crawl-checkpoint.pickle"
+# Failures of the last finished crawl, for debugging (updates have their own file).
+FAILURES_PATH = Path(".cache") / "crawl-failures.json"
+# Checkpoints older than this are thrown away, the data would be outdated anyway.
+MAX_AGE = 3 * 24 * 3600
+MAX_ATTEMPTS = 3
+
+
+class Checkpoint:
+    def __init__(
+        self,
+        path=CHECKPOINT_PATH,
+        max_age=MAX_AGE,
+        resume=True,
+        failures_path=FAILURES_PATH,
+    ):
+        self.path = Path(path)
+        self.failures_path = Path(failures_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.results = {}  # (step, key) -> value
+        self.failures = {}  # (step, key) -> {"reason": ..., "attempts": ...}
+        self.started_at = time.time()
+        if resume and self.path.exists():
+            self._load(max_age)
+        if not self.results and not self.failures:
+            self._file = open(self.path, "wb")
+            self._append(("started", None, self.started_at))
+        else:
+            self._file = open(self.path, "ab")
+        self.resumed = len(self.results)
+
+    def _load(self, max_age):
+        records = []
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    records.append(pickle.load(f))
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError, AttributeError):
+                    # The last record is cut off if the crawl was killed while
+                    # writing it.
+                    break
+        if not records or records[0][0] != "started":
+            return
+        if time.time() - records[0][2] > max_age:
+            return
+        self.started_at = records[0][2]
+        for kind, key, value in records[1:]:
+            if kind == "done":
+                self.results[key] = value
+                self.failures.pop(key, None)
+            elif kind == "failed":
+                self.failures[key] = value
+
+    def _append(self, record):
+        pickle.dump(record, self._file)
+        self._file.flush()
+
+    def done(self, step, key=None):
+        return (step, key) in self.results
+
+    def get(self, step, key=None, default=None):
+        return self.results.get((step, key), default)
+
+    def save(self, step, key, value):
+        self.results[(step, key)] = value
+        self.failures.pop((step, key), None)
+        self._append(("done", (step, key), value))
+
+    def fail(self, step, key, reason):
+        failure = self.failures.get((step, key), {"attempts": 0})
+        failure = {"reason": str(reason), "attempts": failure["attempts"] + 1}
+        self.failures[(step, key)] = failure
+        self._append(("failed", (step, key), failure))
+        print(f"{step} failed for {key} (attempt {failure['attempts']}): {reason}")
+
+    def should_try(self, step, key=None):
+        """whether an item still needs to be fetched (not done, not given up on)."""
+        if (step, key) in self.results:
+            return False
+        failure = self.failures.get((step, key))
+        return failure is None or failure["attempts"] < MAX_ATTEMPTS
+
+    def summary(self):
+        return (
+            f"{len(self.results)} items done ({self.resumed} from an earlier run), "
+            f"{len(self.failures)} failed"
+        )
+
+    def finish(self):
+        """the crawl is complete: write out the failures and remove the checkpoint."""
+        self._file.close()
+        failures = [
+            {"step": step, "item": key, **failure}
+            for (step, key), failure in self.failures.items()
+        ]
+        with open(self.failures_path, "w") as f:
+            json.dump(failures, f, indent=1, default=str)
+        self.path.unlink()
@@ -0,0 +1,2 @@
+# Lets the tests in tests/ import the modules of the app (pytest puts this
+# directory on sys.path because of this file).
@@ -0,0 +1,140 @@
+"""Async crawl engine used by the app to fetch lots of pages concurrently."""
+
+import asyncio
+import contextlib
+import math
+
+import httpx
+
+from ratelimit import REQUEST_TIMEOUT, scheduler
+
+# Network errors on a single request are retried this many times before giving up.
+RETRIES = 2
+# Connections per httpx client. For every request, httpcore's pool checks each of its
+# connections against each waiting request, so one client with 64 connections spends
+# more time in there than on the network. Above this, requests are spread over
+# several clients.
+POOL_SIZE = 8
+
+
+async def _fetch(client, semaphore, url, extract, cache, binary, ignore_errors):
+    async with semaphore:
+        for attempt in range(RETRIES + 1):
+            try:
+                if cache is not None:
+                    return await cache.afetch(client, url, extract)
+                res = await scheduler.arequest(lambda: client.get(url), url)
+                return res.status_code, res.content if binary else res.text
+            except httpx.TransportError:
+                if attempt == RETRIES:
+                    if ignore_errors:
+                        return None, None
+                    raise
+                await asyncio.sleep(0.5 * 2**attempt)
+            except (httpx.HTTPError, httpx.InvalidURL):
+                if ignore_errors:
+                    return None, None
+                raise
+
+
+async def _fetch_all(
+    urls,
+    concurrency,
+    on_response,
+    headers,
+    timeout,
+    extract,
+    cache,
+    binary,
+    ignore_errors,
+):
+    semaphore = asyncio.Semaphore(concurrency)
+    n_clients = math.ceil(concurrency / POOL_SIZE)
+    pool_size = math.ceil(concurrency / n_clients)
+    limits = httpx.Limits(
+        max_connections=pool_size, max_keepalive_connections=pool_size
+    )
+    # Loading the CA certificates takes a while, do it once for all clients.
+    ssl_context = httpx.create_ssl_context()
+    async with contextlib.AsyncExitStack() as stack:
+        clients = [
+            await stack.enter_async_context(
+                httpx.AsyncClient(
+                    headers=headers,
+                    timeout=timeout,
+                    limits=limits,
+                    verify=ssl_context,
+                    follow_redirects=True,
+                )
+            )
+            for _ in range(n_clients)
+        ]
+        # Requests run roughly in the order of `urls`, so this keeps the clients
+        # equally busy.
+        tasks = [
+            asyncio.ensure_future(
+                _fetch(
+                    clients[i % n_clients],
+                    semaphore,
+                    url,
+                    extract,
+                    cache,
+                    binary,
+                    ignore_errors,
+                )
+            )
+            for i, url in enumerate(urls)
+        ]
+        try:
+            # Hand out responses in the order of `urls` (not in the order they
+            # arrive), so callers build up their data exactly like a sequential
+            # crawl would. Requests further down the list keep running meanwhile.
+            for url, task in zip(urls, tasks):
+                status_code, result = await task
+                if on_response is not None:
+                    on_response(url, status_code, result)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def fetch_all(
+    urls,
+    concurrency=16,
+    on_response=None,
+    headers=None,
+    timeout=REQUEST_TIMEOUT,
+    extract=None,
+    cache=None,
+    binary=False,
+    ignore_errors=False,
+):
+    """fetch all urls with at most `concurrency` requests in flight.
+
+    `on_response(url, status_code, text)` is called once per url, in the order of
+    `urls`. Responses are dropped as soon as the callback returned, so this works for
+    thousands of pages without holding all of them in memory.
+
+    If a `revalidate.ValidatorCache` is passed as `cache`, requests are revalidated
+    against it and the callback gets `extract(text)` (or the value stored for a 304)
+    instead of the text. With `binary=True`, the callback gets the raw bytes instead
+    of the text (e.g. for images). With `ignore_errors=True`, urls that still fail
+    after all retries (or aren't valid urls) are passed on with status code None
+    instead of raising, which is useful for links to arbitrary hosts.
+    """
+    urls = list(urls)
+    if not urls:
+        return
+    asyncio.run(
+        _fetch_all(
+            urls,
+            max(1, concurrency),
+            on_response,
+            headers,
+            timeout,
+            extract,
+            cache,
+            binary,
+            ignore_errors,
+        )
+    )
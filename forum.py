@@ -0,0 +1,97 @@
+"""Helpers to read the components tracker from the forum (Discourse).
+
+Instead of the rendered thread, this reads the first post through the JSON API:
+`/t/<topic>.json` once to find the post, then `/posts/<id>.json`. Only the cooked
+html of that post is parsed (or its raw markdown, if there's no cooked html), and
+not at all if the post's `updated_at` didn't change since the last crawl.
+"""
+
+import json
+import re
+
+import requests
+from bs4 import BeautifulSoup
+
+import parsing
+from ratelimit import REQUEST_TIMEOUT, scheduler
+
+FORUM_URL = "https://discuss.streamlit.io"
+TRACKER_TOPIC = 4634
+
+_MARKDOWN_ITEM = re.compile(r"^\s*(?:[*+-]|\d+\.)\s+(.*)$", re.MULTILINE)
+_MARKDOWN_LINK = re.compile(r"\[([^\]]*)\]\(\s*<?([^)\s>]+)>?[^)]*\)")
+_BARE_URL = re.compile(r"(?<![(<\[])https?://[^\s)\]>]+")
+
+
+def topic_url(topic_id):
+    return f"{FORUM_URL}/t/{topic_id}.json"
+
+
+def post_url(post_id):
+    return f"{FORUM_URL}/posts/{post_id}.json"
+
+
+def _get_json(url):
+    res = scheduler.request(lambda: requests.get(url, timeout=REQUEST_TIMEOUT), url)
+    if res.status_code != 200:
+        raise RuntimeError(
+            f"Could not access components tracker, status code {res.status_code} "
+            f"for url: {url}"
+        )
+    return json.loads(res.text)
+
+
+def parse_cooked(html):
+    """get text and links of all components listed in the cooked html of a post.
+
+    The components are the items of the longest list in the post.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    lists = soup.find_all(["ul", "ol"])
+    if not lists:
+        return []
+    longest = max(lists, key=lambda l: len(l.find_all("li", recursive=False)))
+    return [
+        (li.text, [a.get("href") for a in li.find_all("a")])
+        for li in longest.find_all("li")
+    ]
+
+
+def parse_raw(markdown):
+    """same as `parse_cooked`, but for the raw markdown of a post."""
+    entries = []
+    for item in _MARKDOWN_ITEM.findall(markdown):
+        links = [url for _, url in _MARKDOWN_LINK.findall(item)]
+        links += _BARE_URL.findall(_MARKDOWN_LINK.sub("", item))
+        text = _MARKDOWN_LINK.sub(lambda m: m.group(1), item)
+        entries.append((_BARE_URL.sub("", text).strip(), links))
+    return entries
+
+
+def fetch_tracker(cache, topic_id=TRACKER_TOPIC):
+    """return [(text, links)] for the components listed in the tracker.
+
+    `cache` is a `revalidate.ValidatorCache`. It remembers the id of the first post
+    and what was parsed from it, which is reused as long as the post wasn't edited.
+    """
+    key = f"forum-tracker:{topic_id}"
+    remembered = cache.recall(key)
+    if remembered is not None:
+        post = _get_json(post_url(remembered["post_id"]))
+    else:
+        post = _get_json(topic_url(topic_id))["post_stream"]["posts"][0]
+    if remembered is not None and remembered["updated_at"] == post["updated_at"]:
+        return remembered["entries"]
+
+    if post.get("cooked"):
+        entries = parsing.parse(parse_cooked, post["cooked"].encode())
+    else:
+        entries = parsing.parse(parse_raw, (post.get("raw") or "").encode())
+    if not entries:
+        # Better than silently crawling nothing if the post looks different now.
+        raise RuntimeError(f"Found no components in the tracker post {post['id']}")
+    cache.remember(
+        key,
+        {"post_id": post["id"], "updated_at": post["updated_at"], "entries": entries},
+    )
+    return entries
@@ -0,0 +1,103 @@
+"""Helpers to read repository metadata from Github."""
+
+from datetime import datetime
+
+import requests
+
+from ratelimit import REQUEST_TIMEOUT, scheduler
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+# Github allows up to 100 repos per query and charges 1 point of rate limit for it,
+# no matter how many repos are in there.
+BATCH_SIZE = 100
+
+REPO_FIELDS = "stargazerCount description createdAt owner { avatarUrl }"
+
+
+def parse_repo_url(url):
+    """get (user, repo) from a github url, or None if it doesn't point to a repo."""
+    parts = url.replace("https://", "").replace("http://", "").split("/")
+    if len(parts) < 3 or not parts[1] or not parts[2]:
+        return None
+    user, repo = parts[1], parts[2]
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    return user, repo
+
+
+def readme_url(user, repo):
+    """api url for the raw readme (with `Accept: application/vnd.github.raw`)"""
+    return f"https://api.github.com/repos/{user}/{repo}/readme"
+
+
+def raw_base_url(user, repo):
+    """base url to resolve relative paths in the readme against"""
+    return f"https://github.com/{user}/{repo}/raw/HEAD"
+
+
+def _build_query(batch):
+    variables = {}
+    params = []
+    fields = []
+    for i, (user, repo) in enumerate(batch):
+        variables[f"o{i}"], variables[f"n{i}"] = user, repo
+        params.append(f"$o{i}: String!, $n{i}: String!")
+        fields.append(
+            f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ {REPO_FIELDS} }}"
+        )
+    query = f"query({', '.join(params)}) {{ {' '.join(fields)} }}"
+    return query, variables
+
+
+def _parse_repo(data):
+    if data is None:
+        return None
+    created_at = datetime.strptime(data["createdAt"], "%Y-%m-%dT%H:%M:%SZ")
+    return (
+        data["stargazerCount"],
+        data["description"],
+        data["owner"]["avatarUrl"],
+        created_at,
+    )
+
+
+def fetch_repos(repos, token, batch_size=BATCH_SIZE, url=GRAPHQL_URL):
+    """use the github graphql api to get info on many repos with few requests.
+
+    `repos` is a list of (user, repo) tuples. Returns a dict that maps each of them
+    to (stars, description, avatar url, created_at), or to None if the repo
+    doesn't exist or can't be read (e.g. blocked for legal reasons).
+    """
+    repos = list(dict.fromkeys(repos))
+    results = {}
+    for start in range(0, len(repos), batch_size):
+        batch = repos[start : start + batch_size]
+        query, variables = _build_query(batch)
+        response = scheduler.request(
+            lambda: requests.post(
+                url,
+                json={"query": query, "variables": variables},
+                headers={"Authorization": f"bearer {token}"},
+                timeout=REQUEST_TIMEOUT,
+            ),
+            url,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"Couldn't get repo details, status code {response.status_code} for {len(batch)} repos"
+            )
+        response_json = response.json()
+
+        # Repos that don't exist or can't be read come back as null, with an error
+        # for their alias (e.g. NOT_FOUND or FORBIDDEN). That only loses those repos,
+        # the whole request only went wrong if there's no data at all.
+        errors = response_json.get("errors") or []
+        if response_json.get("data") is None:
+            raise RuntimeError(f"Couldn't get repo details: {errors}")
+        for e in errors:
+            if e.get("type") != "NOT_FOUND":
+                print(f"Couldn't get repo details for {e.get('path')}: {e}")
+
+        for i, repo in enumerate(batch):
+            results[repo] = _parse_repo(response_json["data"].get(f"r{i}"))
+    return results
@@ -0,0 +1,228 @@
+"""Instrumentation of the crawl, written to a JSON report per run.
+
+Records, while a run is active:
+
+- wall time per step of the crawl and per helper (`pipeline.parse_github_readme`,
+  `get_downloads`, ...)
+- per host: requests, bytes, status codes, time spent waiting for the rate limit
+  and a latency histogram (every attempt that goes through `ratelimit.scheduler`)
+- time spent in each extract function (see `parsing`)
+- how much counters like the validator cache stats changed
+
+Reports go to `.cache/reports/` (the last `KEEP_REPORTS`), so they can be compared
+across runs, e.g. in the admin view of the app (`?admin=...`).
+"""
+
+import bisect
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+REPORTS_DIR = Path(".cache") / "reports"
+KEEP_REPORTS = 200
+# Upper bounds of the latency histogram buckets in seconds (plus one for slower).
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _name(fn):
+    if isinstance(fn, functools.partial):
+        fn = fn.func
+    return f"{fn.__module__}.{fn.__qualname__}"
+
+
+def response_size(response):
+    """bytes of a `requests` or `httpx` response, None if it's streamed."""
+    length = response.headers.get("Content-Length")
+    if length is not None:
+        return int(length)
+    if getattr(response, "_content", None) is False:
+        # Streamed with `requests` and not read yet, reading it here would break
+        # the streaming.
+        return None
+    try:
+        return len(response.content)
+    except Exception:  # e.g. a streamed httpx response
+        return None
+
+
+class CrawlMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.steps = {}  # name -> seconds, in the order they ran
+            self.calls = {}  # helper -> {"calls", "seconds"}
+            self.hosts = {}
+            self.parsing = {}  # extract function -> {"calls", "seconds"}
+            self.extra = {}
+            self._counters = {}
+            self._step = None  # (name, start) of the current step
+
+    def begin_step(self, name):
+        """start timing a step of the crawl, this ends the one before (steps run one
+        after the other). None just ends the last one."""
+        now = time.perf_counter()
+        with self._lock:
+            if self._step is not None:
+                last, start = self._step
+                self.steps[last] = self.steps.get(last, 0) + now - start
+            self._step = None if name is None else (name, now)
+
+    def timed(self, fn):
+        """decorator that counts the calls of `fn` and the time spent in them."""
+        name = _name(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._add(self.calls, name, time.perf_counter() - start)
+
+        return wrapper
+
+    def _steps_so_far(self):
+        # needs to hold `_lock`, includes the step that's running
+        steps = dict(self.steps)
+        if self._step is not None:
+            name, start = self._step
+            steps[name] = steps.get(name, 0) + time.perf_counter() - start
+        return steps
+
+    def _add(self, table, name, seconds):
+        with self._lock:
+            stats = table.setdefault(name, {"calls": 0, "seconds": 0.0})
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+
+    def _host(self, url):
+        # needs to hold `_lock`
+        host = urlsplit(url).hostname
+        if host not in self.hosts:
+            self.hosts[host] = {
+                "requests": 0,
+                "bytes": 0,
+                "seconds": 0.0,
+                "waited": 0.0,
+                "status_codes": {},
+                "latency": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        return self.hosts[host]
+
+    def record_request(self, url, status_code, seconds, size=None):
+        """record one attempt of a request, `status_code` is None if it failed."""
+        status = "error" if status_code is None else str(status_code)
+        with self._lock:
+            stats = self._host(url)
+            stats["requests"] += 1
+            stats["bytes"] += size or 0
+            stats["seconds"] += seconds
+            stats["status_codes"][status] = stats["status_codes"].get(status, 0) + 1
+            stats["latency"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def record_wait(self, url, seconds):
+        """record time spent waiting for the rate limit of a host."""
+        if seconds > 0:
+            with self._lock:
+                self._host(url)["waited"] += seconds
+
+    def record_parse(self, extract, seconds):
+        self._add(self.parsing, _name(extract), seconds)
+
+    def set(self, name, value):
+        """add something to the report, e.g. the stats of the thumbnail store."""
+        with self._lock:
+            self.extra[name] = value
+
+    def count(self, name, counters):
+        """report how much the numbers in the dict `counters` change during the
+        run (e.g. the stats of the validator cache, which count since startup)."""
+        with self._lock:
+            self._counters[name] = (counters, dict(counters))
+
+    def report(self):
+        """return the report of the current run as a json-serializable dict."""
+        with self._lock:
+            hosts = {}
+            for host, stats in sorted(self.hosts.items(), key=lambda x: str(x[0])):
+                latency = dict(
+                    zip([f"<={b}s" for b in LATENCY_BUCKETS], stats["latency"])
+                )
+                latency[f">{LATENCY_BUCKETS[-1]}s"] = stats["latency"][-1]
+                hosts[str(host)] = {
+                    **stats,
+                    "status_codes": dict(stats["status_codes"]),
+                    "latency": latency,
+                }
+            counters = {
+                name: {key: counters[key] - before.get(key, 0) for key in counters}
+                for name, (counters, before) in self._counters.items()
+            }
+            return {
+                "started_at": self.started_at,
+                "duration": time.time() - self.started_at,
+                "running": self.running,
+                "steps": self._steps_so_far(),
+                "calls": {k: dict(v) for k, v in self.calls.items()},
+                "hosts": hosts,
+                "parsing": {k: dict(v) for k, v in self.parsing.items()},
+                "counters": counters,
+                **self.extra,
+            }
+
+    @contextmanager
+    def run(self, kind, directory=REPORTS_DIR):
+        """start recording a new run and write its report when it ends (also if it
+        fails). Yields a dict to add fields to the report."""
+        self.reset()
+        self.running = True
+        fields = {"kind": kind, "error": None}
+        try:
+            yield fields
+        except BaseException as e:
+            fields["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.begin_step(None)
+            self.running = False
+            path = write_report({**self.report(), **fields}, directory)
+            print(f"Wrote run report to {path}")
+
+
+def write_report(report, directory=REPORTS_DIR):
+    """write a run report, keeps the last `KEEP_REPORTS`. Returns its path."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    started = datetime.fromtimestamp(report["started_at"])
+    path = directory / f"{report['kind']}-{started:%Y%m%d-%H%M%S}.json"
+    path.write_text(json.dumps(report, indent=1))
+    for old in sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)[
+        :-KEEP_REPORTS
+    ]:
+        old.unlink()
+    return path
+
+
+def load_reports(directory=REPORTS_DIR):
+    """return all run reports, oldest first."""
+    reports = []
+    for path in Path(directory).glob("*.json"):
+        try:
+            reports.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # e.g. written right now
+    return sorted(reports, key=lambda r: r["started_at"])
+
+
+# Shared by the whole process, like the scheduler (there's only one crawl at a time).
+metrics = CrawlMetrics()
@@ -0,0 +1,66 @@
+"""Resolve package and repo names locally instead of probing PyPI for them.
+
+The crawl used to request `pypi.org/project/<name>/` for every forum entry without a
+PyPI link, only to see whether a package with the name of its Github repo exists.
+All of that can be answered from the simple index, which is downloaded anyway. Names
+are compared in their PEP 503 normalized form, so `Streamlit_AgGrid` on Github finds
+`streamlit-aggrid` on PyPI.
+"""
+
+import re
+
+
+def normalize(name):
+    """PEP 503 normalized name: lowercase, runs of -_. replaced by a single -."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def title_to_name(title):
+    """guess the package name from a forum title, e.g. "Streamlit AgGrid"."""
+    return normalize(re.sub(r"\s+", "-", title.strip()))
+
+
+def variants(name):
+    """spellings a repo for package `name` might have, `name` first.
+
+    Packages often have "-" where their repos have "_" (or the other way around).
+    """
+    result = [name]
+    for old, new in [("-", "_"), ("_", "-")]:
+        if old in name and name.replace(old, new) not in result:
+            result.append(name.replace(old, new))
+    return result
+
+
+class NameIndex:
+    """Maps normalized names to the spelling of the package on PyPI.
+
+    Lookups are dict lookups, so it's fine to check every forum entry (and a few
+    variants of its name) against it.
+    """
+
+    def __init__(self, names=()):
+        self._names = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return normalize(name) in self._names
+
+    def add(self, name):
+        self._names.setdefault(normalize(name), name)
+
+    def resolve(self, name):
+        """return the package called `name` (in its PyPI spelling), or None."""
+        return self._names.get(normalize(name))
+
+    def resolve_any(self, names):
+        """return the first of `names` that is a package, or None."""
+        for name in names:
+            package = self.resolve(name)
+            if package is not None:
+                return package
+        return None
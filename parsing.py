@@ -0,0 +1,143 @@
+"""Run the extraction functions of the crawl in a process pool.
+
+Parsing the responses (PyPI JSON and project pages, READMEs, the forum tracker) is
+pure-Python and used to run on a single core inside the Streamlit server process,
+so the server got sluggish during a crawl. Now the crawl only hands the response
+bytes to `parse` (or `aparse` in async code), which decodes and extracts them in a
+worker process and returns the (small) extracted value.
+
+Extract functions need to be picklable, i.e. module-level functions or
+`functools.partial`s of them, not lambdas.
+
+Workers are spawned (not forked: the server process has lots of threads). A spawned
+process normally runs the `__main__` module of its parent first, and in the app
+that's `streamlit_app.py`, i.e. the whole app including a crawl. So the workers are
+started without it (see `_preparation_data`). Swapping out `sys.modules["__main__"]`
+while they start isn't an option, Streamlit sets it for every script run.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import spawn
+from multiprocessing.context import SpawnContext, SpawnProcess
+
+from metrics import metrics
+
+WORKERS = min(4, os.cpu_count() or 1)
+
+_pool = None
+_workers = WORKERS
+_lock = threading.Lock()
+_WORKER_NAME = "parse-worker"
+
+
+# If this module is reloaded, keep wrapping the function of multiprocessing.
+_get_preparation_data = getattr(
+    spawn.get_preparation_data, "original", spawn.get_preparation_data
+)
+
+
+def _preparation_data(name):
+    """what a spawned process needs to know about its parent, without the parent's
+    `__main__` for our workers. Everything they run lives in importable modules."""
+    data = _get_preparation_data(name)
+    if name.startswith(_WORKER_NAME):
+        data.pop("init_main_from_path", None)
+        data.pop("init_main_from_name", None)
+    return data
+
+
+# multiprocessing looks it up whenever it starts a process.
+_preparation_data.original = _get_preparation_data
+spawn.get_preparation_data = _preparation_data
+
+
+class _Process(SpawnProcess):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = f"{_WORKER_NAME}-{self.name}"
+
+
+class _Context(SpawnContext):
+    Process = _Process
+
+
+def text(text):
+    """extract function that returns the text itself (decoded in-process)."""
+    return text
+
+
+def _decode(content, encoding):
+    return content.decode(encoding or "utf-8", errors="replace")
+
+
+def _extract(extract, content, encoding):
+    """return (extracted value, seconds it took), measured where it runs."""
+    start = time.perf_counter()
+    value = extract(_decode(content, encoding))
+    return value, time.perf_counter() - start
+
+
+def _done(extract, result):
+    value, seconds = result
+    metrics.record_parse(extract, seconds)
+    return value
+
+
+def set_workers(workers):
+    """use `workers` processes from now on, 0 to parse in this process."""
+    global _workers
+    shutdown()
+    _workers = workers
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(_workers, mp_context=_Context())
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def _in_process(extract):
+    return _workers == 0 or extract is text
+
+
+def parse(extract, content, encoding=None):
+    """return `extract(text)` for the bytes of a response, run in a worker."""
+    if _in_process(extract):
+        return _done(extract, _extract(extract, content, encoding))
+    try:
+        result = _get_pool().submit(_extract, extract, content, encoding).result()
+        return _done(extract, result)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory), start over with a new pool.
+        shutdown()
+        raise
+
+
+async def aparse(extract, content, encoding=None):
+    """async version of `parse`, doesn't block the event loop while parsing."""
+    if _in_process(extract):
+        return _done(extract, _extract(extract, content, encoding))
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(
+            _get_pool(), _extract, extract, content, encoding
+        )
+        return _done(extract, result)
+    except BrokenProcessPool:
+        shutdown()
+        raise
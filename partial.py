@@ -0,0 +1,69 @@
+"""The components of a crawl that's still running, so the app can show them already.
+
+Without a catalog, the app used to wait for the whole crawl before showing anything.
+Now the crawl passes each component to `PartialCatalog.add` as soon as it has
+something to show (see `pipeline.crawl`), and the app shows a snapshot of what's
+there so far until the first real snapshot is built. The app only does that once
+`start()` is called, i.e. if there's a crawl: loading a catalog file is quick enough
+to just wait for.
+"""
+
+import dataclasses
+import threading
+import time
+
+from snapshot import Snapshot
+
+
+class PartialCatalog:
+    def __init__(self, categories=()):
+        self.categories = tuple(categories)
+        self.started_at = None
+        self.crawling = threading.Event()  # set by `start`
+        self._components = {}  # package or name -> component, in the order found
+        self._changes = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._components)
+
+    def start(self):
+        """note that the first catalog has to be crawled (or waited for)."""
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+        self.crawling.set()
+
+    def add(self, c):
+        """add a component, or update it if it was added before."""
+        # A copy, because the crawl keeps changing its components.
+        c = dataclasses.replace(c)
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+            self._components[c.package or c.name] = c
+            self._changes += 1
+
+    def snapshot(self):
+        """return a `Snapshot` of the components so far (in the order they were
+        found), or None if there aren't any yet."""
+        with self._lock:
+            if not self._components:
+                return None
+            version = f"partial-{self._changes}"
+            if self._snapshot is not None and self._snapshot.version == version:
+                return self._snapshot
+            components = list(self._components.values())
+        snapshot = Snapshot(components, self.categories, version)
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def clear(self):
+        """forget everything, e.g. once the crawl is done."""
+        with self._lock:
+            self.started_at = None
+            self.crawling.clear()
+            self._components = {}
+            self._snapshot = None
@@ -0,0 +1,802 @@
+"""The crawl that builds the catalog: forum tracker -> PyPI index -> PyPI projects ->
+Github + additional_data.yaml -> thumbnails.
+
+Doesn't need Streamlit. The app runs it when there's no recent catalog file, or it
+can run on its own (e.g. as a scheduled job) and write the catalog file the app
+loads at startup:
+
+    GH_TOKEN=... python pipeline.py --output catalog.jsonl
+    GH_TOKEN=... python pipeline.py --fresh  # don't resume an interrupted crawl
+    GH_TOKEN=... python pipeline.py --update  # only what changed on PyPI since
+    GH_TOKEN=... python pipeline.py --publish redis://cache:6379/0
+    python pipeline.py --diff old.jsonl catalog.jsonl
+
+Every crawl and update writes a report (timings per step, requests per host, cache
+hits, ...) to .cache/reports, see `metrics`.
+"""
+
+import argparse
+import dataclasses
+import functools
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import requests
+import yaml
+from tqdm import tqdm
+
+import catalog
+import crawler
+import forum
+import github
+import names
+import parsing
+import pypi
+import readme
+import shared
+import thumbnails
+from catalog import Component
+from checkpoint import Checkpoint
+from metrics import metrics
+from revalidate import validators
+
+# Max. number of requests in flight when crawling PyPI. Set to 1 to crawl sequentially.
+CRAWL_CONCURRENCY = 16
+# Separate from the one of the full crawl, so they don't mix.
+UPDATE_CHECKPOINT_PATH = Path(".cache") / "update-checkpoint.pickle"
+# Not the failures file of the last full crawl, an update shouldn't replace it.
+UPDATE_FAILURES_PATH = Path(".cache") / "update-failures.json"
+
+EXCLUDE = [
+    "streamlit",
+    "streamlit-nightly",
+    "repl-streamlit",
+    "streamlit-with-ssl",
+    "streamlit-fesion",
+    "streamlit-aggrid-pro",
+    "st-dbscan",
+    "st-kickoff",
+    "st-undetected-chromedriver",
+    "st-package-reviewer",
+    "streamlit-webcam-example",
+    "st-pyv8",
+    "streamlit-extras-arnaudmiribel",
+    "st-schema-python",
+    "st-optics",
+    "st-spin",
+    "st-dataprovider",
+    "st-microservice",
+    "st_nester",
+    "st-jsme",
+    "st-parsetree",
+    "st-git-hooks",
+    "st-schema",
+    "st-distributions",
+    "st-common-data",
+    "awesome-streamlit",
+    "awesome-streamlit-master",
+    "extra-streamlit-components-SEM",
+    "barfi",
+    "streamlit-plotly-events-retro",
+    "pollination-streamlit-io",
+    "pollination-streamlit-viewer",
+    "st-clustering",
+    "streamlit-text-rating-component",
+    "custom-streamlit",
+    "hf-streamlit",
+]
+
+
+@metrics.timed
+def parse_github_readme(url, gh_token):
+    """get image url, description and demo url from the raw github readme"""
+    repo = github.parse_repo_url(url)
+    if repo is None:
+        return None, None, None
+    status_code, parsed = validators.fetch(
+        github.readme_url(*repo),
+        functools.partial(readme.parse, raw_base=github.raw_base_url(*repo)),
+        headers={
+            "Accept": "application/vnd.github.raw",
+            "Authorization": f"Token {gh_token}",
+        },
+    )
+    if status_code == 404:
+        return None, None, None
+    elif status_code != 200:
+        raise RuntimeError(
+            f"Couldn't get Github readme, status code {status_code} for url: {url}"
+        )
+    return parsed
+
+
+@metrics.timed
+def get_all_packages(lookup=()):
+    """return (candidate packages, names from `lookup` that exist on PyPI)"""
+    # Streams through the index instead of parsing the whole thing (> 40 MB) at once.
+    return pypi.stream_candidates(exclude=EXCLUDE, lookup=lookup)
+
+
+def forum_names(c):
+    """names a forum entry without PyPI link might be published under."""
+    guesses = []
+    if c.github:
+        repo = github.parse_repo_url(c.github)
+        if repo is not None:
+            guesses.append(repo[1])
+    # Titles are often generic ("Chat", "Timeline"), only trust them if they look
+    # like a component package.
+    title = names.title_to_name(c.name)
+    if pypi.is_candidate(title):
+        guesses.append(title)
+    return guesses
+
+
+def resolve_packages(components_dict, index):
+    """fill in the package of forum entries that didn't link to PyPI.
+
+    Uses the names of their Github repo or their title, if a package with that
+    name exists. Returns the components keyed by package (or name) again.
+    """
+    resolved = {}
+    for c in components_dict.values():
+        if c.package:
+            # Use the spelling of the index, so it matches the names in step 3.
+            c.package = index.resolve(c.package) or c.package
+        else:
+            package = index.resolve_any(forum_names(c))
+            if package is not None:
+                c.package = package
+                c.pypi = pypi.project_url(package)
+                # print("found package based on repo name:", package)
+        resolved[c.package or c.name] = c
+    return resolved
+
+
+@metrics.timed
+def get_downloads(package):
+    return pypi.fetch_downloads(package)
+
+
+def crawl_tracker(progress=tqdm):
+    """get all components listed in the forum tracker, keyed by package or name"""
+    entries = forum.fetch_tracker(validators)
+
+    components_dict = {}
+    for text, links in progress(entries, desc="🎈 Crawling Streamlit forum (step 1/5)"):
+        c = Component()
+        name = re.sub("\(.*?\)", "", text)
+        name = name.split(" – ")[0]
+        name = name.strip()
+        c.name = name
+
+        for l in links:
+            if l.startswith("https://github.com"):
+                c.github = l
+            elif l.startswith("https://share.streamlit.io") or "streamlitapp.com" in l:
+                c.demo = l
+            elif l.startswith("https://discuss.streamlit.io"):
+                c.forum_post = l
+            elif l.startswith("https://pypi.org"):
+                c.pypi = l
+                c.package = re.match("https://pypi.org/project/(.*?)/", l).group(1)
+
+        if c.package:
+            components_dict[c.package] = c
+        else:
+            components_dict[c.name] = c
+    return components_dict
+
+
+def crawl(
+    gh_token,
+    progress=tqdm,
+    concurrency=CRAWL_CONCURRENCY,
+    checkpoint=None,
+    workers=parsing.WORKERS,
+    on_component=None,
+):
+    """crawl all components from the forum, PyPI and Github and return them.
+
+    `progress` is a tqdm-like class to show progress with, e.g. `stqdm` in the app.
+    Progress is saved to `checkpoint` (by default the one in .cache), so if the crawl
+    is interrupted, the next one continues where it stopped. Responses are parsed in
+    `workers` processes (0 to parse them in this one).
+
+    `on_component(c)` is called whenever a component was found or got more info, so
+    they can be shown while the crawl is still running (see `partial`). The ones from
+    the forum tracker come right after step 2 (with just the info from the forum),
+    then each one again when it's done (see `enrich`).
+    """
+    parsing.set_workers(workers)
+    if checkpoint is None:
+        checkpoint = Checkpoint()
+    if checkpoint.resumed:
+        print(f"Resuming crawl from checkpoint: {checkpoint.summary()}")
+
+    # Step 1: Get components from tracker
+    metrics.begin_step("tracker")
+    if checkpoint.done("tracker"):
+        components_dict = checkpoint.get("tracker")
+    else:
+        components_dict = crawl_tracker(progress)
+        checkpoint.save("tracker", None, components_dict)
+
+    # Step 2: Download PyPI index. Also look up whether the forum entries without
+    # PyPI link have a package named like their repo or title, no need to request
+    # each of these from PyPI.
+    metrics.begin_step("pypi_index")
+    if checkpoint.done("index"):
+        packages, found = checkpoint.get("index")
+    else:
+        lookup = {
+            names.normalize(name)
+            for c in components_dict.values()
+            for name in ([c.package] if c.package else forum_names(c))
+        }
+        with progress(total=1, desc="⬇️ Downloading PyPI index (step 2/5)") as bar:
+            packages, found = get_all_packages(lookup)
+            bar.update()
+        checkpoint.save("index", None, (packages, found))
+    index = names.NameIndex(packages + found)
+    components_dict = resolve_packages(components_dict, index)
+    if on_component is not None:
+        for c in components_dict.values():
+            on_component(c)
+    return enrich(
+        components_dict,
+        packages,
+        gh_token,
+        progress,
+        concurrency,
+        checkpoint,
+        on_component,
+    )
+
+
+def enrich(
+    components_dict,
+    packages,
+    gh_token,
+    progress=tqdm,
+    concurrency=CRAWL_CONCURRENCY,
+    checkpoint=None,
+    on_component=None,
+):
+    """steps 3-5 of the crawl: add info from PyPI and Github, categories and
+    thumbnails to the components and return them.
+
+    `components_dict` has the components found so far (keyed by package or name),
+    the ones for `packages` that aren't in there yet are added. Each component is
+    passed to `on_component` as soon as it's complete except for its thumbnails (in
+    step 4): the ones from `components_dict` first, then the others by stars.
+    """
+    if checkpoint is None:
+        checkpoint = Checkpoint()
+    # Known before step 3, e.g. from the forum tracker.
+    tracked = list(components_dict)
+
+    # Step 3: Search through PyPI packages
+    metrics.begin_step("pypi")
+
+    def needs_html(status_code, metadata):
+        # The JSON API failed or didn't tell us the PyPI user, so fall back to
+        # scraping the (much larger) project page.
+        return status_code == 200 and (metadata is None or metadata[0] is None)
+
+    def merge_html(metadata, html_status_code, html_metadata):
+        """return metadata from the JSON API, completed from the project page"""
+        if html_status_code == 200:
+            metadata = tuple(
+                a or b for a, b in zip(metadata or html_metadata, html_metadata)
+            )
+        return metadata
+
+    def add_pypi_info(p, status_code, metadata):
+        # if p.startswith("streamlit") or p.startswith("st-") or p.startswith("st_"):
+        if status_code == 404:
+            return
+
+        if p not in components_dict:
+            components_dict[p] = Component(name=p)
+        c = components_dict[p]
+
+        url = pypi.project_url(p)
+        if not c.package:
+            c.package = p
+        if not c.pypi:
+            c.pypi = url
+        if metadata is None:
+            return
+
+        pypi_author, github, pypi_description, released_at = metadata
+        if not c.pypi_author:
+            c.pypi_author = pypi_author
+        if not c.github and github:
+            c.github = github
+            # print("found github link on pypi:", c.github)
+        if pypi_description:
+            c.pypi_description = pypi_description
+        c.released_at = released_at
+
+    def save_pypi_info(p, status_code, metadata):
+        if status_code not in (200, 404):
+            # Still shown, but without metadata. Tried again on the next run.
+            checkpoint.fail("pypi", p, f"status code {status_code}")
+        else:
+            checkpoint.save("pypi", p, (status_code, metadata))
+        bar.update()
+
+    # Project page url -> (package, metadata from the JSON API). They're fetched
+    # after all JSON responses, because the callbacks of `crawler.fetch_all` run on
+    # its event loop and mustn't block.
+    fallbacks = {}
+
+    def on_pypi_response(p, status_code, metadata):
+        if status_code is None:
+            checkpoint.fail("pypi", p, "request failed")
+            bar.update()
+        elif needs_html(status_code, metadata):
+            fallbacks[pypi.project_url(p)] = (p, metadata)
+        else:
+            save_pypi_info(p, status_code, metadata)
+
+    def on_html_response(url, html_status_code, html_metadata):
+        p, metadata = fallbacks[url]
+        if html_status_code is None:
+            checkpoint.fail("pypi", p, "project page request failed")
+            bar.update()
+        else:
+            metadata = merge_html(metadata, html_status_code, html_metadata)
+            save_pypi_info(p, 200, metadata)
+
+    todo = [p for p in packages if checkpoint.should_try("pypi", p)]
+    bar = progress(total=len(packages), desc="📦 Crawling PyPI (step 3/5)")
+    bar.update(len(packages) - len(todo))
+    if concurrency > 1:
+        # Async mode: keep up to `concurrency` requests in flight.
+        urls = {pypi.json_url(p): p for p in todo}
+        crawler.fetch_all(
+            urls,
+            concurrency=concurrency,
+            on_response=lambda url, *args: on_pypi_response(urls[url], *args),
+            extract=pypi.parse_json,
+            cache=validators,
+            ignore_errors=True,
+        )
+        crawler.fetch_all(
+            fallbacks,
+            concurrency=concurrency,
+            on_response=on_html_response,
+            extract=pypi.parse_html,
+            cache=validators,
+            ignore_errors=True,
+        )
+    else:
+        for p in todo:
+            try:
+                response = validators.fetch(pypi.json_url(p), pypi.parse_json)
+            except requests.RequestException:
+                response = None, None
+            on_pypi_response(p, *response)
+        for url in list(fallbacks):
+            try:
+                response = validators.fetch(url, pypi.parse_html)
+            except requests.RequestException:
+                response = None, None
+            on_html_response(url, *response)
+    bar.close()
+    # Add them in the order of `packages`, so the result is the same no matter in
+    # which order they were fetched (or if they came from the checkpoint).
+    for p in packages:
+        if checkpoint.done("pypi", p):
+            add_pypi_info(p, *checkpoint.get("pypi", p))
+        elif ("pypi", p) in checkpoint.failures:
+            # It's in the index, so still list it, just without metadata.
+            add_pypi_info(p, None, None)
+
+    # profiler.start()
+    # Step 4: Enrich info of components found above by reading data from Github
+    metrics.begin_step("github_repos")
+    # Try to get Github URL by combining PyPI author name + package name. All of these
+    # guesses are checked together with the known repos below.
+    possible_repos = {}
+    for c in components_dict.values():
+        if not c.github and c.package and c.pypi_author:
+            # Sometimes, package names contain "-" but repos "_", so check for these
+            # mutations as well.
+            possible_repos[c.package] = [
+                (c.pypi_author, repo) for repo in names.variants(c.package)
+            ]
+
+    # Get stars etc. for all repos in a few batched requests to the GraphQL API.
+    repos = {
+        github.parse_repo_url(c.github) for c in components_dict.values() if c.github
+    }
+    repos.update(r for guesses in possible_repos.values() for r in guesses)
+    repos.discard(None)
+    # One checkpoint item per repo, so a resumed run (or an update that covers more
+    # packages than the interrupted one) fetches the repos it doesn't have yet.
+    todo = [
+        repo for repo in sorted(repos) if checkpoint.should_try("github_repo", repo)
+    ]
+    for start in range(0, len(todo), github.BATCH_SIZE):
+        batch = todo[start : start + github.BATCH_SIZE]
+        try:
+            infos = github.fetch_repos(batch, gh_token)
+        except (RuntimeError, requests.RequestException) as e:
+            # Sometimes Github shows 401 errors. Go on without stars for these, the
+            # next run tries again.
+            for repo in batch:
+                checkpoint.fail("github_repo", repo, e)
+            continue
+        for repo, info in infos.items():
+            checkpoint.save("github_repo", repo, info)
+    github_repos = {repo: checkpoint.get("github_repo", repo) for repo in repos}
+
+    # Categories were curated manually in additional_data.yaml. They're added in here
+    # as well, so each component is complete (except for thumbnails) once it's done.
+    with open("additional_data.yaml") as f:
+        additional_data = yaml.safe_load(f)
+
+    def expected_stars(c):
+        repos = [github.parse_repo_url(c.github)] if c.github else []
+        repos += possible_repos.get(c.package, [])
+        infos = [github_repos.get(repo) for repo in repos]
+        return max((info[0] or 0 for info in infos if info), default=0)
+
+    # The ones from the forum tracker first, then the most popular ones, so a crawl
+    # that's watched while it runs (see `on_component`) shows the best ones first.
+    tracked_keys = set(tracked)
+    order = tracked + sorted(
+        (key for key in components_dict if key not in tracked_keys),
+        key=lambda key: expected_stars(components_dict[key]),
+        reverse=True,
+    )
+
+    metrics.begin_step("github")
+    for key in progress(order, desc="👾 Crawling Github (step 4/5)"):
+        c = components_dict[key]
+        for user, repo in possible_repos.get(c.package, []):
+            if github_repos.get((user, repo)):
+                c.github = f"https://github.com/{user}/{repo}"
+                if repo != c.package:
+                    print(
+                        f"found github url by mutating package name, original: {c.package}, mutated: {repo}"
+                    )
+                break
+
+        if c.github:
+            # print(c.github)
+            c.github_author = re.search("github.com/(.*?)/", c.github).group(1)
+            github_info = github_repos.get(github.parse_repo_url(c.github))
+            if github_info:
+                (
+                    c.stars,
+                    c.github_description,
+                    c.avatar,
+                    c.created_at,
+                ) = github_info
+
+        # Readme and downloads are separate checkpoint items, so if one of them
+        # fails, the other one is still kept. Either way, the component is listed,
+        # just without that info. Items that failed too often aren't tried again.
+        if c.github and checkpoint.should_try("readme", key):
+            try:
+                readme_info = parse_github_readme(c.github, gh_token)
+            except (RuntimeError, requests.RequestException) as e:
+                checkpoint.fail("readme", key, e)
+            else:
+                checkpoint.save("readme", key, readme_info)
+        image_url, readme_description, demo_url = checkpoint.get(
+            "readme", key, (None,) * 3
+        )
+        # Get download numbers from PyPI
+        if c.package and checkpoint.should_try("downloads", key):
+            try:
+                checkpoint.save("downloads", key, get_downloads(c.package))
+            except (RuntimeError, requests.RequestException) as e:
+                checkpoint.fail("downloads", key, e)
+        downloads = checkpoint.get("downloads", key)
+
+        if c.github:
+            c.image_url = image_url
+            if not c.github_description and readme_description:
+                # print("found description in github readme")
+                c.github_description = readme_description
+            if not c.demo and demo_url:
+                # print("found demo url in github readme", demo_url)
+                c.demo = demo_url
+        if c.package and downloads is not None:
+            c.downloads = downloads
+
+        # Set names based on PyPI package names.
+        # TODO: If I go with this, I should not even fetch the names from the forum post
+        # above.
+        if c.package:
+            name = c.package
+            if name.startswith("st-") or name.startswith("st_"):  # only do at start
+                name = name[3:]
+            c.name = (
+                name.replace("streamlit", "")
+                .replace("--", " ")
+                .replace("-", " ")
+                .replace("__", " ")
+                .replace("_", " ")
+                .strip()
+                .title()
+                .replace("Nlu", "NLU")  # special case adjustments for top results ;)
+                .replace(" Cli", " CLI")
+                .replace("rtc", "RTC")
+                .replace("Hiplot", "HiPlot")
+                .replace("Spacy", "SpaCy")
+                .replace("Aggrid", "AgGrid")
+                .replace("Echarts", "ECharts")
+                .replace("Ui", "UI")
+            )
+
+            # if c.package.startswith("streamlit-"):
+            #     c.name = c.package[10:].replace("-", " ").capitalize()
+            # elif c.package.endswith("-streamlit"):
+            #     c.name = c.package[:-10].replace("-", " ").capitalize()
+            # elif c.package.startswith("st-"):
+            #     c.name = c.package[3:].replace("-", " ").capitalize()
+            # else:
+            #     c.name = c.package.replace("-streamlit-", " ").replace("-", " ").capitalize()
+
+        # TODO: Need to do this better. Maybe just store pypi name instead of entire url.
+        if c.pypi and c.pypi.split("/")[-2] in additional_data:
+            c.categories = additional_data[c.pypi.split("/")[-2]]["categories"]
+        else:
+            c.categories = []
+
+        if on_component is not None:
+            on_component(c)
+
+    # profiler.stop()
+
+    # Step 5: Make small local thumbnails of all card images and avatars, so visitors
+    # don't have to download the (often huge) originals.
+    def make_thumbnails(urls, size):
+        """return {url: thumbnail path}, for the urls that aren't done yet as well."""
+        step = f"thumbnail-{size[0]}x{size[1]}"
+
+        def on_result(url, path):
+            if path is None:
+                checkpoint.fail(step, url, "couldn't fetch or decode image")
+            else:
+                checkpoint.save(step, url, path)
+
+        store.fetch(
+            [url for url in urls if checkpoint.should_try(step, url)],
+            size,
+            concurrency=concurrency,
+            on_result=on_result,
+        )
+        return {url: checkpoint.get(step, url) for url in urls}
+
+    metrics.begin_step("thumbnails")
+    with progress(total=2, desc="🖼 Making thumbnails (step 5/5)") as bar:
+        store = thumbnails.ThumbnailStore()
+        components = components_dict.values()
+        images = make_thumbnails(
+            {c.image_url for c in components if c.image_url}, thumbnails.CARD_SIZE
+        )
+        bar.update()
+        avatars = make_thumbnails(
+            {c.avatar for c in components if c.avatar} | {thumbnails.DEFAULT_AVATAR},
+            thumbnails.AVATAR_SIZE,
+        )
+        bar.update()
+        for c in components:
+            c.image_thumbnail = images.get(c.image_url)
+            c.avatar_thumbnail = avatars.get(c.avatar or thumbnails.DEFAULT_AVATAR)
+    print("Thumbnails:", store.summary())
+    metrics.set("thumbnails", dict(store.stats))
+    metrics.begin_step(None)
+
+    validators.sync()
+    print("Validator cache:", validators.summary())
+    checkpoint.finish()
+    print("Crawl:", checkpoint.summary())
+    metrics.set(
+        "checkpoint",
+        {
+            "done": len(checkpoint.results),
+            "resumed": checkpoint.resumed,
+            "failed": len(checkpoint.failures),
+        },
+    )
+    parsing.shutdown()
+    return list(components_dict.values())
+
+
+def crawl_catalog(path, gh_token, checkpoint=None, **kwargs):
+    """crawl everything and write it to a catalog file, returns its version.
+
+    Keyword arguments are passed on to `crawl`.
+    """
+    if checkpoint is None:
+        checkpoint = Checkpoint()
+    # Writes a run report to .cache/reports (see `metrics`).
+    with metrics.run("crawl") as report:
+        metrics.count("validator_cache", validators.stats)
+        metrics.begin_step("pypi_serial")
+        try:
+            # Taken before the crawl, so the next update also gets everything that
+            # changes while this crawl runs.
+            serial = pypi.last_serial()
+        except (RuntimeError, requests.RequestException) as e:
+            print(f"Couldn't get the PyPI serial, --update won't work: {e}")
+            serial = None
+        components = crawl(gh_token, checkpoint=checkpoint, **kwargs)
+        # If it was resumed, the data is as old as the interrupted crawl.
+        version = catalog.write_catalog(
+            path, components, crawled_at=checkpoint.started_at, pypi_serial=serial
+        )
+        report.update(version=version, components=len(components))
+    return version
+
+
+def changed_packages(serial, updated_at):
+    """return (candidate packages changed on PyPI since `serial`, new serial)"""
+    try:
+        changed, serial = pypi.changed_since(serial)
+    except (RuntimeError, requests.RequestException) as e:
+        print(f"PyPI changelog failed, falling back to the RSS feeds: {e}")
+        changed, oldest = pypi.recent_from_rss()
+        if oldest is not None and oldest > updated_at:
+            print("The RSS feeds don't go back far enough, some changes may be missed")
+    changed = {p for p in changed if pypi.is_candidate(p) and p not in EXCLUDE}
+    return sorted(changed), serial
+
+
+def update_catalog(
+    path,
+    gh_token,
+    progress=tqdm,
+    concurrency=CRAWL_CONCURRENCY,
+    workers=parsing.WORKERS,
+):
+    """refresh only the components that changed on PyPI since the catalog was
+    written, and add new ones. Returns the new version.
+
+    Steps 1 and 2 (forum tracker and PyPI index) are skipped, the other steps only
+    run for the changed packages.
+    """
+    with metrics.run("update") as report:
+        metrics.count("validator_cache", validators.stats)
+        header = catalog.read_header(path)
+        _, crawled_at, components = catalog.read_catalog(path)
+        if header.get("pypi_serial") is None:
+            raise RuntimeError(f"{path} has no PyPI serial, needs a full crawl first")
+        updated_at = header.get("updated_at", crawled_at)
+        metrics.begin_step("changelog")
+        changed, serial = changed_packages(header["pypi_serial"], updated_at)
+        print(f"{len(changed)} candidates changed on PyPI: {', '.join(changed)}")
+
+        key = lambda c: c.package or c.name
+        existing = {names.normalize(c.package): c for c in components if c.package}
+        components_dict = {}
+        for p in changed:
+            c = existing.get(names.normalize(p))
+            if c is not None:
+                components_dict[c.package] = dataclasses.replace(c)
+        # Use the spelling of the catalog for packages that are in there.
+        packages = [
+            (
+                existing[names.normalize(p)].package
+                if names.normalize(p) in existing
+                else p
+            )
+            for p in changed
+        ]
+        if packages:
+            parsing.set_workers(workers)
+            checkpoint = Checkpoint(
+                UPDATE_CHECKPOINT_PATH, failures_path=UPDATE_FAILURES_PATH
+            )
+            updated = enrich(
+                components_dict, packages, gh_token, progress, concurrency, checkpoint
+            )
+            updated = {key(c): c for c in updated}
+            components = [updated.pop(key(c), c) for c in components]
+            components += updated.values()
+        version = catalog.write_catalog(
+            path,
+            components,
+            crawled_at=crawled_at,
+            updated_at=time.time(),
+            pypi_serial=serial,
+        )
+        report.update(version=version, components=len(components), changed=len(changed))
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl the components catalog.")
+    parser.add_argument("--output", default=str(catalog.CATALOG_PATH))
+    parser.add_argument("--concurrency", type=int, default=CRAWL_CONCURRENCY)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=parsing.WORKERS,
+        help="processes that parse responses, 0 to parse in the main process",
+    )
+    parser.add_argument(
+        "--gh-token", default=os.environ.get("GH_TOKEN"), help="default: $GH_TOKEN"
+    )
+    parser.add_argument(
+        "--diff",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="show what changed between two catalog files instead of crawling",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="ignore the checkpoint of an interrupted crawl and start from scratch",
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="only refresh the components that changed on PyPI since the catalog "
+        "in --output was written (much faster, e.g. to run every hour)",
+    )
+    parser.add_argument(
+        "--publish",
+        metavar="URL",
+        help="publish the catalog to the shared cache of the app replicas (e.g. "
+        "redis://host:6379/0, see shared.py), unless one of them is crawling",
+    )
+    args = parser.parse_args()
+
+    if args.diff:
+        old, new = (catalog.read_catalog(path) for path in args.diff)
+        print(catalog.diff_catalogs(old, new))
+        return
+    if not args.gh_token:
+        sys.exit("Needs a Github token, set $GH_TOKEN or pass --gh-token")
+
+    run = update_to_file if args.update else crawl_to_file
+    if not args.publish:
+        run(args)
+        return
+    backend = shared.from_url(args.publish)
+    with shared.lease(backend) as acquired:
+        if not acquired:
+            sys.exit("Another replica is crawling already")
+        if args.update:
+            # Start from the latest published catalog.
+            shared.fetch_catalog(backend, args.output)
+        run(args)
+        shared.publish_catalog(backend, args.output)
+        print(f"Published the catalog to {args.publish}")
+
+
+def crawl_to_file(args):
+    start = time.time()
+    checkpoint = Checkpoint(resume=not args.fresh)
+    version = crawl_catalog(
+        args.output,
+        args.gh_token,
+        concurrency=args.concurrency,
+        checkpoint=checkpoint,
+        workers=args.workers,
+    )
+    print(f"Wrote {args.output} (version {version}) in {time.time() - start:.0f}s")
+
+
+def update_to_file(args):
+    start = time.time()
+    version = update_catalog(
+        args.output, args.gh_token, concurrency=args.concurrency, workers=args.workers
+    )
+    print(f"Updated {args.output} (version {version}) in {time.time() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Helpers to read package metadata from PyPI."""
+
+import codecs
+import html
+import json
+import re
+import xmlrpc.client
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from xml.etree import ElementTree
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+import names
+import readme
+from ratelimit import REQUEST_TIMEOUT, scheduler
+
+NO_DESCRIPTION = "No project description provided"
+
+SIMPLE_INDEX = "https://pypi.org/simple/"
+SIMPLE_JSON = "application/vnd.pypi.simple.v1+json"
+CHUNK_SIZE = 256 * 1024
+
+_HTML_NAME = re.compile(r"<a\b[^>]*>([^<]*)</a>", re.IGNORECASE)
+_JSON_NAME = re.compile(r'"name"\s*:\s*("(?:[^"\\]|\\.)*")')
+# Longest piece of a half-received anchor/JSON object we carry over between chunks.
+_MAX_TOKEN = 4096
+
+
+def project_url(package):
+    return f"https://pypi.org/project/{package}/"
+
+
+def json_url(package):
+    return f"https://pypi.org/pypi/{package}/json"
+
+
+def _find_github(urls):
+    for url in urls:
+        if url and "github.com" in url:
+            return url
+    return None
+
+
+def _parse_upload_time(s):
+    return datetime.strptime(s[:19], "%Y-%m-%dT%H:%M:%S")
+
+
+def parse_json(text):
+    """get author, github url, description and release date from the JSON API.
+
+    Returns a tuple (pypi_author, github, pypi_description, released_at), or None if
+    the response can't be read. `released_at` is the upload time of the first
+    release.
+    """
+    try:
+        data = json.loads(text)
+        info = data["info"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    # The JSON API has no gravatar/username in `info`, but `ownership` lists the
+    # PyPI users that maintain the project (same as the sidebar on the project page).
+    roles = (data.get("ownership") or {}).get("roles") or []
+    pypi_author = roles[0]["user"] if roles else None
+
+    # Homepage first, then the other project links (= sidebar links on the page).
+    project_urls = info.get("project_urls") or {}
+    github = _find_github([info.get("home_page")] + list(project_urls.values()))
+
+    summary = (info.get("summary") or "").strip()
+    if summary and summary != NO_DESCRIPTION:
+        pypi_description = summary
+    else:
+        pypi_description = readme.first_paragraph(info.get("description"))
+
+    upload_times = [
+        f["upload_time_iso_8601"]
+        for files in (data.get("releases") or {}).values()
+        for f in files
+        if f.get("upload_time_iso_8601")
+    ] or [f["upload_time_iso_8601"] for f in data.get("urls") or []]
+    released_at = _parse_upload_time(min(upload_times)) if upload_times else None
+
+    return pypi_author, github, pypi_description, released_at
+
+
+# The only parts of the project page `parse_html` looks at, the rest isn't parsed.
+_PROJECT_PAGE_PARTS = SoupStrainer(
+    class_=re.compile(
+        r"(?:^|\s)(?:sidebar-section__user-gravatar-text|vertical-tabs__tab"
+        r"|package-description__summary|project-description)(?:\s|$)"
+    )
+)
+
+
+def parse_html(text):
+    """get the same fields as `parse_json` by scraping the project page.
+
+    This is only used as a fallback if the JSON API doesn't have what we need. The
+    rendered page doesn't show the first release, so `released_at` is always None.
+    """
+    soup = BeautifulSoup(text, "html.parser", parse_only=_PROJECT_PAGE_PARTS)
+
+    gravatar = soup.find("span", class_="sidebar-section__user-gravatar-text")
+    pypi_author = gravatar.text.strip() if gravatar else None
+
+    github = None
+    homepage = soup.find("i", class_="fas fa-home")
+    if homepage and "github.com" in homepage.parent.get("href", ""):
+        github = homepage.parent["href"]
+    else:
+        sidebar_links = soup.find_all(
+            "a",
+            class_="vertical-tabs__tab vertical-tabs__tab--with-icon vertical-tabs__tab--condensed",
+        )
+        github = _find_github(l.get("href") for l in sidebar_links)
+
+    pypi_description = None
+    summary = soup.find("p", class_="package-description__summary")
+    if summary and summary.text and summary.text != NO_DESCRIPTION:
+        pypi_description = summary.text
+    else:
+        # Search for first non-empty paragraph.
+        project_description = soup.find("div", class_="project-description")
+        if project_description:
+            for paragraph in project_description.find_all("p"):
+                text = paragraph.text.replace("\n", "").strip()
+                if text:
+                    pypi_description = text
+                    break
+
+    return pypi_author, github, pypi_description, None
+
+
+def is_candidate(name):
+    """check if a package name looks like a Streamlit component."""
+    return "streamlit" in name or name.startswith("st-") or name.startswith("st_")
+
+
+def iter_index_names(chunks, content_type="text/html"):
+    """yield package names from the simple index while it's being downloaded.
+
+    `chunks` is an iterable of bytes, e.g. `response.iter_content()`. Works for the
+    HTML index and the JSON one from PEP 691. Only a few KB of the body are kept in
+    memory at any time.
+    """
+    if SIMPLE_JSON in content_type:
+        pattern, unquote = _JSON_NAME, json.loads
+    else:
+        pattern, unquote = _HTML_NAME, lambda s: html.unescape(s).strip()
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        end = 0
+        for match in pattern.finditer(buffer):
+            yield unquote(match.group(1))
+            end = match.end()
+        # Keep the (possibly incomplete) rest for the next chunk.
+        buffer = buffer[max(end, len(buffer) - _MAX_TOKEN) :]
+    buffer += decoder.decode(b"", final=True)
+    for match in pattern.finditer(buffer):
+        yield unquote(match.group(1))
+
+
+def stream_candidates(url=SIMPLE_INDEX, exclude=(), lookup=()):
+    """get all Streamlit component candidates from the simple index, streaming.
+
+    Never builds a DOM of the index or holds the entire body in memory. Returns
+    (candidates, found), where `found` are the names in the index whose normalized
+    form (see `names.normalize`) is in `lookup`, whether they're candidates or not.
+    """
+    exclude = set(exclude)
+    lookup = set(lookup)
+    res = scheduler.request(
+        lambda: requests.get(
+            url,
+            headers={"Accept": f"{SIMPLE_JSON}, text/html;q=0.1"},
+            stream=True,
+            timeout=REQUEST_TIMEOUT,
+        ),
+        url,
+    )
+    with res:
+        if res.status_code != 200:
+            raise RuntimeError(
+                f"Couldn't get PyPI index, status code {res.status_code} for url: {url}"
+            )
+        candidates, found = [], []
+        for n in iter_index_names(
+            res.iter_content(CHUNK_SIZE), res.headers.get("Content-Type", "")
+        ):
+            if is_candidate(n) and n not in exclude:
+                candidates.append(n)
+            if lookup and names.normalize(n) in lookup:
+                found.append(n)
+        return candidates, found
+
+
+XMLRPC_URL = "https://pypi.org/pypi"
+# Newest projects and latest releases (only the last 40/100 of them).
+RSS_FEEDS = ["https://pypi.org/rss/packages.xml", "https://pypi.org/rss/updates.xml"]
+_RSS_PROJECT = re.compile(r"/project/([^/]+)/")
+
+
+def _xmlrpc(method, *params):
+    body = xmlrpc.client.dumps(params, method)
+    res = scheduler.request(
+        lambda: requests.post(
+            XMLRPC_URL,
+            data=body,
+            headers={"Content-Type": "text/xml"},
+            timeout=REQUEST_TIMEOUT,
+        ),
+        XMLRPC_URL,
+    )
+    if res.status_code != 200:
+        raise RuntimeError(
+            f"PyPI XML-RPC {method} failed, status code {res.status_code}"
+        )
+    try:
+        (result,), _ = xmlrpc.client.loads(res.content)
+    except (xmlrpc.client.Fault, ValueError) as e:
+        raise RuntimeError(f"PyPI XML-RPC {method} failed: {e}")
+    return result
+
+
+def last_serial():
+    """the serial of the latest change on PyPI (grows with every change)."""
+    return _xmlrpc("changelog_last_serial")
+
+
+def changed_since(serial):
+    """return (names of projects created or changed after `serial`, latest serial)."""
+    changes = _xmlrpc("changelog_since_serial", serial)
+    # Entries are [name, version, timestamp, action, serial].
+    names = {change[0] for change in changes}
+    return names, max([serial] + [change[4] for change in changes])
+
+
+def recent_from_rss():
+    """return (names of recently created or released projects, oldest date covered).
+
+    Only a fallback for `changed_since`: the feeds just have the last few dozen
+    changes, so anything before the oldest date might have been missed.
+    """
+    names = set()
+    oldest = None
+    for url in RSS_FEEDS:
+        res = scheduler.request(lambda: requests.get(url, timeout=REQUEST_TIMEOUT), url)
+        if res.status_code != 200:
+            raise RuntimeError(f"Couldn't get {url}, status code {res.status_code}")
+        for item in ElementTree.fromstring(res.content).iter("item"):
+            match = _RSS_PROJECT.search(item.findtext("link") or "")
+            if match:
+                names.add(match.group(1))
+            published = item.findtext("pubDate")
+            if published:
+                published = parsedate_to_datetime(published).timestamp()
+                oldest = published if oldest is None else min(oldest, published)
+    return names, oldest
+
+
+def downloads_url(package):
+    return f"https://pypistats.org/api/packages/{package.lower()}/recent?period=month"
+
+
+def fetch_downloads(package):
+    """get the number of downloads in the last month from pypistats.org, or None if
+    it's not there."""
+    url = downloads_url(package)
+    res = scheduler.request(lambda: requests.get(url, timeout=REQUEST_TIMEOUT), url)
+    if res.status_code != 200:
+        # Not tracked by pypistats (yet), or it kept failing even after retrying.
+        # Not 0, that would replace the number we had.
+        return None
+    return res.json()["data"]["last_month"]
@@ -0,0 +1,194 @@
+"""Per-host request scheduler that all crawl requests go through.
+
+Every host gets a token bucket with a fixed rate. On top of that, the scheduler
+reads the rate limit headers of each response (`X-RateLimit-Remaining`,
+`X-RateLimit-Reset`, `Retry-After`), slows down or pauses a host before it runs out
+of requests, and retries rate-limited or failed requests with backoff.
+"""
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from metrics import metrics, response_size
+
+# (requests per second, burst) for each host. Hosts that aren't listed here aren't
+# throttled, but still back off when they send 429s.
+HOST_LIMITS = {
+    "github.com": (5, 10),
+    "api.github.com": (10, 20),
+    "pypi.org": (50, 50),
+    "pypistats.org": (5, 5),
+}
+
+MAX_RETRIES = 5
+# Seconds to wait for a connection or the next bytes of a response. `requests` waits
+# forever by default, so a hung socket would keep the crawl (and its lease) alive.
+REQUEST_TIMEOUT = 30
+MAX_BACKOFF = 60
+# Github resets its rate limit every hour, so we might have to pause that long.
+MAX_PAUSE = 3600
+# Once less than this share of a host's rate limit is left, the remaining requests
+# are spread out until the limit resets (instead of running into it at full speed).
+LOW_WATERMARK = 0.1
+
+# Status codes that are worth retrying. Github sends 403 instead of 429 when the
+# rate limit is exceeded, so these are only retried if the headers say so.
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.max_rate = self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        # Set from the rate limit headers of the host.
+        self.paused_until = 0
+        self.slow_until = 0
+
+    def reserve(self):
+        """take one token and return how many seconds to wait before using it."""
+        now = time.monotonic()
+        if now >= self.slow_until:
+            self.rate = self.max_rate
+        if self.rate == float("inf"):
+            wait = 0
+        else:
+            elapsed = now - self.updated
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate) - 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        self.updated = now
+        return max(wait, self.paused_until - now)
+
+
+class Scheduler:
+    def __init__(self, limits=HOST_LIMITS, max_retries=MAX_RETRIES):
+        self.limits = limits
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        if host not in self._buckets:
+            rate, burst = self.limits.get(host, (float("inf"), 1))
+            self._buckets[host] = TokenBucket(rate, burst)
+        return self._buckets[host]
+
+    def _wait_time(self, host):
+        with self._lock:
+            return self._bucket(host).reserve()
+
+    def _wait(self, host, url):
+        wait = self._wait_time(host)
+        metrics.record_wait(url, wait)
+        return wait
+
+    def _record(self, url, response, start):
+        seconds = time.perf_counter() - start
+        size = response_size(response)
+        metrics.record_request(url, response.status_code, seconds, size)
+
+    def _observe(self, host, response):
+        """adjust the bucket of `host` to the rate limit headers of `response`."""
+        headers = response.headers
+        now = time.monotonic()
+        pause = None
+        retry_after = _parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None and response.status_code in (403, 429, 503):
+            pause = retry_after
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        limit = headers.get("X-RateLimit-Limit")
+        with self._lock:
+            bucket = self._bucket(host)
+            if remaining is not None and reset is not None:
+                remaining = int(remaining)
+                seconds_to_reset = max(0, float(reset) - time.time()) + 1
+                if remaining == 0:
+                    pause = max(pause or 0, seconds_to_reset)
+                elif limit is not None and remaining < LOW_WATERMARK * int(limit):
+                    # Spread the remaining requests until the reset.
+                    bucket.rate = min(bucket.max_rate, remaining / seconds_to_reset)
+                    bucket.slow_until = now + seconds_to_reset
+            if pause is not None:
+                bucket.paused_until = max(bucket.paused_until, now + pause)
+        return pause
+
+    def _retry_delay(self, host, response, attempt):
+        """return how long to wait before retrying, or None if we shouldn't retry."""
+        pause = self._observe(host, response)
+        status_code = response.status_code
+        if attempt >= self.max_retries:
+            return None
+        if status_code not in RETRY_STATUS_CODES and status_code != 403:
+            # E.g. a 200 that used up the rate limit: it's a fine response, the pause
+            # is only for the next requests (it's on the bucket already).
+            return None
+        if pause is not None:
+            return min(pause, MAX_PAUSE)
+        if status_code in RETRY_STATUS_CODES:
+            return min(2**attempt, MAX_BACKOFF)
+        return None  # a 403 that isn't about the rate limit
+
+    def request(self, send, url):
+        """call `send()` to make a request to `url`, as soon as its host allows it.
+
+        `send` returns a `requests` or `httpx` response. Rate-limited and failed
+        requests are retried with backoff, the last response is returned.
+        """
+        host = urlsplit(url).hostname
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._wait(host, url))
+            start = time.perf_counter()
+            try:
+                response = send()
+            except Exception:
+                metrics.record_request(url, None, time.perf_counter() - start)
+                raise
+            self._record(url, response, start)
+            delay = self._retry_delay(host, response, attempt)
+            if delay is None:
+                return response
+            response.close()
+            metrics.record_wait(url, delay)
+            time.sleep(delay)
+
+    async def arequest(self, send, url):
+        """async version of `request`, `send()` returns an awaitable."""
+        host = urlsplit(url).hostname
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self._wait(host, url))
+            start = time.perf_counter()
+            try:
+                response = await send()
+            except Exception:
+                metrics.record_request(url, None, time.perf_counter() - start)
+                raise
+            self._record(url, response, start)
+            delay = self._retry_delay(host, response, attempt)
+            if delay is None:
+                return response
+            await response.aclose()
+            metrics.record_wait(url, delay)
+            await asyncio.sleep(delay)
+
+
+def _parse_retry_after(value):
+    if value is None:
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        try:
+            return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+# Shared by all requests in this process, so that all crawl steps (and sessions)
+# stay within the same limits.
+scheduler = Scheduler()
@@ -0,0 +1,142 @@
+"""Helpers to pull information out of README sources (markdown or rst)."""
+
+import html
+import re
+
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)|!\[[^\]]*\]\[[^\]]*\]")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)|\[([^\]]*)\]\[[^\]]*\]")
+_RST_LINK = re.compile(r"`([^`<]*?)\s*<[^>]*>`_+")
+_HTML_TAG = re.compile(r"<[^>]+>")
+_EMPHASIS = re.compile(r"\*{1,3}|`+|(?<!\w)_{1,3}|_{1,3}(?!\w)")
+_UNDERLINE = re.compile(r"^\s*([=\-~^*#+])\1+\s*$")
+_HTML_HEADING = re.compile(r"<(h[1-6])\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+
+# Image sources in the order they can appear in a README: markdown inline images,
+# markdown reference images, html <img> tags and rst image/figure directives.
+_IMAGE_SOURCES = re.compile(
+    r"!\[[^\]]*\]\(\s*<?([^)\s>]+)>?[^)]*\)"
+    r"|!\[([^\]]*)\]\[([^\]]*)\]"
+    r"|<img\b[^>]*?\bsrc\s*=\s*[\"']([^\"']+)[\"']"
+    r"|^\s*\.\.\s+(?:image|figure)::\s*(\S+)",
+    re.IGNORECASE | re.MULTILINE,
+)
+_LINK_DEFINITION = re.compile(r"^\s*\[([^\]]+)\]:\s*<?(\S+?)>?(?:\s|$)", re.MULTILINE)
+
+# Links to demo apps, in order of preference.
+DEMO_PATTERNS = [
+    re.compile(r"https?://share\.streamlit\.io/+[^\s)\"'<>\]]*"),
+    re.compile(r"https?://[\w.-]+\.streamlitapp\.com[^\s)\"'<>\]]*"),
+    re.compile(r"https?://[\w-]+(?:\.[\w-]+)*\.streamlit\.app[^\s)\"'<>\]]*"),
+]
+
+
+def is_no_badge(src):
+    """check if an image url is an actual image and not a badge or logo."""
+    return not (
+        "badge" in src
+        or "shields.io" in src
+        or "circleci" in src
+        or "buymeacoffee" in src
+        or "ko-fi" in src
+        or "logo" in src
+        or "streamlit-mark" in src
+        or "coverage" in src
+        or "Cover" in src
+        or "hydra.png" in src
+    )
+
+
+def first_paragraph(source):
+    """get the text of the first non-empty paragraph in a markdown/rst document.
+
+    Headings, badges and images are skipped, links are replaced by their text. This
+    mimics what we get from the first non-empty `<p>` on the rendered page.
+    """
+    if not source:
+        return None
+    in_code_block = False
+    block = []
+    for line in source.splitlines() + [""]:
+        if line.lstrip().startswith(("```", "~~~")):
+            in_code_block = not in_code_block
+            block = []
+            continue
+        if in_code_block:
+            continue
+        if line.strip() and not _UNDERLINE.match(line):
+            block.append(line.strip())
+            continue
+        if _UNDERLINE.match(line):
+            # Underlined rst/setext heading -> the block so far was the heading.
+            block = []
+            continue
+        text = _clean_block(block)
+        block = []
+        if text:
+            return text
+    return None
+
+
+def _clean_block(lines):
+    lines = [
+        l
+        for l in lines
+        if not l.startswith(("#", ">", "|", "..", ":", "- ", "* ", "+ "))
+        and not re.match(r"^\d+\.\s", l)
+    ]
+    text = " ".join(lines)
+    text = _HTML_HEADING.sub("", text)
+    text = _IMAGE.sub("", text)
+    text = _LINK.sub(lambda m: m.group(1) or m.group(2) or "", text)
+    text = _RST_LINK.sub(r"\1", text)
+    text = _HTML_TAG.sub("", text)
+    text = _EMPHASIS.sub("", text)
+    text = re.sub(r"\s+", " ", text.replace("&nbsp;", " ")).strip()
+    return text or None
+
+
+def _resolve(src, raw_base):
+    src = html.unescape(src)
+    if src.startswith("//"):
+        return "https:" + src
+    if src.startswith(("http://", "https://", "data:")):
+        # Links to files in a github repo don't show an image, the raw ones do.
+        return re.sub(r"^(https?://github\.com/[^/]+/[^/]+)/blob/", r"\1/raw/", src)
+    # Relative to the repo root, where the README lives.
+    return raw_base.rstrip("/") + "/" + re.sub(r"^(\./)*/*", "", src)
+
+
+def find_image(source, raw_base):
+    """get the url of the first image in a README that's not a badge or logo.
+
+    Relative image paths are resolved against `raw_base`, e.g.
+    https://github.com/<user>/<repo>/raw/HEAD.
+    """
+    definitions = {
+        m.group(1).lower(): m.group(2) for m in _LINK_DEFINITION.finditer(source)
+    }
+    for m in _IMAGE_SOURCES.finditer(source):
+        if m.group(2) is not None:
+            # Reference-style image, e.g. ![alt][ref] or ![ref][].
+            src = definitions.get((m.group(3) or m.group(2)).lower())
+        else:
+            src = m.group(1) or m.group(4) or m.group(5)
+        if src and is_no_badge(src):
+            return _resolve(src, raw_base)
+    return None
+
+
+def find_demo(source):
+    """get the first link to a demo app on Streamlit Cloud from a README."""
+    for pattern in DEMO_PATTERNS:
+        m = pattern.search(source)
+        if m:
+            return m.group(0)
+    return None
+
+
+def parse(source, raw_base):
+    """get image url, description and demo url from the source of a README."""
+    if not source:
+        return None, None, None
+    return find_image(source, raw_base), first_paragraph(source), find_demo(source)
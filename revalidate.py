@@ -0,0 +1,152 @@
+"""HTTP validator cache, so recrawls only download what changed.
+
+For every url, this stores the `ETag`/`Last-Modified` validators of the last
+response together with the fields we extracted from it (not the response itself,
+unless `keep_bodies` is set), in a SQLite file (see `store`).
+On the next request, it sends `If-None-Match`/`If-Modified-Since`. If the server
+answers with 304 Not Modified, the stored fields are reused without downloading or
+parsing anything. Github doesn't count 304s against the rate limit.
+"""
+
+import time
+
+import requests
+
+import parsing
+from ratelimit import REQUEST_TIMEOUT, scheduler
+from store import MAX_BYTES, STORE_PATH, ResponseStore
+
+# Entries younger than this are used without asking the server at all.
+MAX_AGE = 24 * 3600
+
+
+class ValidatorCache:
+    def __init__(
+        self, path=STORE_PATH, max_age=MAX_AGE, max_bytes=MAX_BYTES, keep_bodies=False
+    ):
+        self.max_age = max_age
+        self._store = ResponseStore(path, max_bytes, keep_bodies)
+        self.stats = {
+            "hits": 0,  # fresh entry, no request
+            "not_modified": 0,  # revalidated with a 304
+            "misses": 0,  # full download
+            "bytes_downloaded": 0,
+            "bytes_saved": 0,  # size of the responses we didn't have to download
+        }
+
+    def _lookup(self, url):
+        """return (cached entry or None, fresh value or None)"""
+        entry = self._store.get(url)
+        if entry is not None and time.time() - entry["fetched_at"] < self.max_age:
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += entry["size"]
+            return entry, entry["value"]
+        return entry, None
+
+    def _conditional_headers(self, entry, headers):
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _check(self, url, entry, response):
+        """return (status_code, value) if a response doesn't need to be parsed."""
+        if response.status_code == 304 and entry is not None:
+            self.stats["not_modified"] += 1
+            self.stats["bytes_saved"] += entry["size"]
+            self._store.touch(url, time.time())
+            return 200, entry["value"]
+
+        if response.status_code != 200:
+            return response.status_code, None
+        return None
+
+    def _save(self, url, response, value):
+        self.stats["misses"] += 1
+        self.stats["bytes_downloaded"] += len(response.content)
+        entry = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "value": value,
+            "size": len(response.content),
+            "fetched_at": time.time(),
+        }
+        self._store.put(url, entry, response.content)
+        return 200, value
+
+    def fetch(self, url, extract, headers=None):
+        """get `extract(text)` for the response of `url`, revalidating if cached.
+
+        Returns (status_code, value). A 304 is reported as 200 with the stored value.
+        For other status codes than 200, value is None. `extract` runs in a worker
+        process (see `parsing`), so it needs to be picklable.
+        """
+        entry, value = self._lookup(url)
+        if value is not None:
+            return 200, value
+        headers = self._conditional_headers(entry, headers)
+        response = scheduler.request(
+            lambda: requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT),
+            url,
+        )
+        result = self._check(url, entry, response)
+        if result is not None:
+            return result
+        value = parsing.parse(extract, response.content, response.encoding)
+        return self._save(url, response, value)
+
+    async def afetch(self, client, url, extract, headers=None):
+        """async version of `fetch` that uses an `httpx.AsyncClient`."""
+        entry, value = self._lookup(url)
+        if value is not None:
+            return 200, value
+        headers = self._conditional_headers(entry, headers)
+        response = await scheduler.arequest(
+            lambda: client.get(url, headers=headers), url
+        )
+        result = self._check(url, entry, response)
+        if result is not None:
+            return result
+        value = await parsing.aparse(extract, response.content, response.encoding)
+        return self._save(url, response, value)
+
+    def recall(self, key):
+        """return a value stored with `remember`, or None."""
+        entry = self._store.get(key)
+        return None if entry is None else entry["value"]
+
+    def remember(self, key, value):
+        """store something that isn't the response of a url, e.g. parsed from one."""
+        entry = {
+            "etag": None,
+            "last_modified": None,
+            "value": value,
+            "size": 0,
+            "fetched_at": time.time(),
+        }
+        self._store.put(key, entry)
+
+    def sync(self):
+        evicted = self._store.sync()
+        if evicted:
+            print(f"Evicted {evicted} entries from the validator cache")
+
+    def close(self):
+        self._store.close()
+
+    def summary(self):
+        s = self.stats
+        requests_saved = s["hits"] + s["not_modified"]
+        total = requests_saved + s["misses"]
+        return (
+            f"{s['misses']} downloaded, {s['not_modified']} not modified (304), "
+            f"{s['hits']} fresh – saved {requests_saved}/{total} downloads and "
+            f"{s['bytes_saved'] / 1e6:.1f} MB"
+        )
+
+
+# Shared by the whole process.
+validators = ValidatorCache()
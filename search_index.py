@@ -0,0 +1,86 @@
+"""Inverted search index over the components.
+
+Built once per list of components. Text is split into case-folded tokens (at
+spaces, punctuation, "-" and "_"), so matches can't run across field boundaries.
+Every query token matches all indexed tokens it's a prefix of, and results are
+ranked by which fields matched.
+"""
+
+import bisect
+import re
+from collections import defaultdict
+
+# How much a match in each field counts: name > package > description > author.
+FIELD_WEIGHTS = {
+    "name": 8,
+    "package": 4,
+    "github_description": 2,
+    "pypi_description": 2,
+    "github_author": 1,
+    "pypi_author": 1,
+}
+# Prefix matches count a bit less than matching the whole token.
+PREFIX_FACTOR = 0.7
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return _TOKEN.findall(text.casefold())
+
+
+class SearchIndex:
+    def __init__(self, components):
+        # token -> {row: weight of the best field that contains the token}
+        self.postings = defaultdict(dict)
+        for row, c in enumerate(components):
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(getattr(c, field)):
+                    if self.postings[token].get(row, 0) < weight:
+                        self.postings[token][row] = weight
+        self.postings = dict(self.postings)
+        self.vocabulary = sorted(self.postings)
+
+    def _match(self, query_token):
+        """return {row: score} for all rows that have a token starting with this."""
+        scores = {}
+        start = bisect.bisect_left(self.vocabulary, query_token)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(query_token):
+                break
+            postings = self.postings[token]
+            if token == query_token and not scores:
+                scores = dict(postings)
+                continue
+            factor = 1 if token == query_token else PREFIX_FACTOR
+            for row, weight in postings.items():
+                if scores.get(row, 0) < weight * factor:
+                    scores[row] = weight * factor
+        return scores
+
+    def search(self, query):
+        """return (row, score) of all components matching all words of the query.
+
+        `row` is the position of the component in the list the index was built from.
+        Best matches come first.
+        """
+        matches = []
+        for token in set(tokenize(query)):
+            match = self._match(token)
+            if not match:
+                return []
+            matches.append(match)
+        if not matches:
+            return []
+
+        # Start with the rarest token, so the intersection stays small.
+        matches.sort(key=len)
+        scores = matches[0]
+        for other in matches[1:]:
+            scores = {
+                row: score + other[row] for row, score in scores.items() if row in other
+            }
+        ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+        return [(row, scores[row]) for row in ranked]
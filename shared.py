@@ -0,0 +1,419 @@
+"""Cache shared by all replicas of the app, and a lease so only one of them crawls.
+
+When the app runs as several replicas, each of them used to crawl on its own. Now
+the catalog is published to a shared backend after a crawl, and a replica that
+needs a new catalog first looks there. The thumbnails of the catalog go along with
+it (stored by their hash, so each one is only uploaded once), since they're local
+files of whoever crawled. Whoever needs to crawl first takes the
+"crawl" lease, the others keep serving what they have and pick up the new catalog
+once it's published.
+
+Backends are picked by url (`$SHARED_CACHE_URL`):
+
+    sqlite:///path/to/shared.sqlite  (default: .cache/shared.sqlite, for replicas
+                                      on one host, it uses WAL mode which doesn't
+                                      work on network filesystems)
+    redis://[:password@]host:port/db  (anything that speaks the Redis protocol)
+"""
+
+import gzip
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import catalog
+import thumbnails
+
+DEFAULT_URL = "sqlite:///.cache/shared.sqlite"
+# A lease is given up if it isn't renewed for this long (e.g. the replica died).
+LEASE_TTL = 10 * 60
+LEASE_NAME = "components:crawl-lease"
+CATALOG_KEY = "components:catalog"
+VERSION_KEY = "components:catalog-version"
+THUMBNAIL_KEY = "components:thumbnail:{}"
+# How often replicas without any catalog check whether one was published.
+WAIT_INTERVAL = 5
+
+
+class SQLiteBackend:
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = str(path)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS leases "
+                "(name TEXT PRIMARY KEY, owner TEXT, expires_at REAL)"
+            )
+
+    def _connect(self):
+        # A new connection per call, so this works from any thread and process.
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        return _closing(db)
+
+    def get(self, key):
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def set(self, key, value):
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO kv VALUES (?, ?)", (key, value))
+
+    def exists(self, key):
+        with self._connect() as db:
+            row = db.execute("SELECT 1 FROM kv WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def acquire(self, name, owner, ttl):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "DELETE FROM leases WHERE name = ? AND expires_at < ?",
+                (name, time.time()),
+            )
+            db.execute(
+                "INSERT OR IGNORE INTO leases VALUES (?, ?, ?)",
+                (name, owner, time.time() + ttl),
+            )
+            (holder,) = db.execute(
+                "SELECT owner FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+            db.execute("COMMIT")
+        return holder == owner
+
+    def renew(self, name, owner, ttl):
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ?",
+                (time.time() + ttl, name, owner),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, name, owner):
+        with self._connect() as db:
+            db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def held(self, name):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT 1 FROM leases WHERE name = ? AND expires_at >= ?",
+                (name, time.time()),
+            ).fetchone()
+        return row is not None
+
+
+@contextmanager
+def _closing(db):
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Only change the lease if we still hold it.
+_RENEW = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+)
+_RELEASE = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+
+class RedisBackend:
+    """Speaks just enough of the Redis protocol (RESP) for the commands used here,
+    so it doesn't need the redis package."""
+
+    def __init__(self, host="localhost", port=6379, db=0, password=None, timeout=30):
+        self.address = (host, port)
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, self.timeout)
+        self._file = self._sock.makefile("rb")
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.db:
+            self._send("SELECT", self.db)
+
+    def _send(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self._sock.sendall(b"".join(parts))
+        return self._read()
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Redis closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RuntimeError(f"Redis error: {rest.decode()}")
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            if int(rest) == -1:
+                return None
+            data = self._file.read(int(rest) + 2)
+            return data[:-2]
+        if kind == b"*":
+            if int(rest) == -1:
+                return None
+            return [self._read() for _ in range(int(rest))]
+        raise RuntimeError(f"Unexpected reply from Redis: {line!r}")
+
+    def command(self, *args):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(*args)
+                except (ConnectionError, OSError):
+                    # Reconnect once, e.g. after the server restarted.
+                    self._sock = None
+                    if attempt == 1:
+                        raise
+
+    def get(self, key):
+        return self.command("GET", key)
+
+    def set(self, key, value):
+        self.command("SET", key, value)
+
+    def exists(self, key):
+        return self.command("EXISTS", key) == 1
+
+    def acquire(self, name, owner, ttl):
+        return self.command("SET", name, owner, "NX", "PX", int(ttl * 1000)) == "OK"
+
+    def renew(self, name, owner, ttl):
+        return self.command("EVAL", _RENEW, 1, name, owner, int(ttl * 1000)) == 1
+
+    def release(self, name, owner):
+        self.command("EVAL", _RELEASE, 1, name, owner)
+
+    def held(self, name):
+        return self.exists(name)
+
+
+def from_url(url=None):
+    """return the backend for `url` (default: `$SHARED_CACHE_URL` or DEFAULT_URL)."""
+    url = url or os.environ.get("SHARED_CACHE_URL") or DEFAULT_URL
+    parts = urlsplit(url)
+    if parts.scheme == "sqlite":
+        # sqlite:///relative/path, sqlite:////absolute/path
+        return SQLiteBackend(parts.path[1:])
+    if parts.scheme == "redis":
+        return RedisBackend(
+            parts.hostname or "localhost",
+            parts.port or 6379,
+            int(parts.path[1:] or 0),
+            parts.password,
+        )
+    raise ValueError(f"Unknown shared cache url: {url}")
+
+
+@contextmanager
+def lease(backend, name=LEASE_NAME, ttl=LEASE_TTL):
+    """try to take a lease, yields whether we got it.
+
+    While it's held, it's renewed in the background, so it only expires if this
+    process dies (or hangs).
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    if not backend.acquire(name, owner, ttl):
+        yield False
+        return
+
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(ttl / 3):
+            try:
+                if not backend.renew(name, owner, ttl):
+                    print(f"Lost the lease {name}")
+                    return
+            except (RuntimeError, OSError) as e:
+                print(f"Couldn't renew the lease {name}: {e}")
+
+    thread = threading.Thread(target=renew, name="renew-lease", daemon=True)
+    thread.start()
+    try:
+        yield True
+    finally:
+        stop.set()
+        thread.join()
+        backend.release(name, owner)
+
+
+def _header(data):
+    return json.loads(data.split(b"\n", 1)[0])
+
+
+def _updated_at(header):
+    # Incremental updates (see `pipeline.update_catalog`) keep `crawled_at`.
+    return header.get("updated_at", header["crawled_at"])
+
+
+def _read_bytes(path):
+    data = Path(path).read_bytes()
+    return gzip.decompress(data) if str(path).endswith(".gz") else data
+
+
+def _thumbnail_paths(components):
+    return sorted(
+        {p for c in components for p in [c.image_thumbnail, c.avatar_thumbnail] if p}
+    )
+
+
+def _thumbnail_key(path):
+    # Thumbnails are named by the hash of their content (see `thumbnails`).
+    return THUMBNAIL_KEY.format(Path(path).stem)
+
+
+def publish_thumbnails(backend, components):
+    """upload the thumbnails of `components` that aren't in the backend yet, returns
+    how many."""
+    published = 0
+    for path in _thumbnail_paths(components):
+        key = _thumbnail_key(path)
+        if thumbnails.exists(path) and not backend.exists(key):
+            backend.set(key, Path(path).read_bytes())
+            published += 1
+    return published
+
+
+def fetch_thumbnails(backend, components):
+    """download the thumbnails of `components` that aren't here yet, returns how many.
+
+    Ones that were never published are left out, the app shows the original images
+    instead.
+    """
+    fetched = 0
+    for path in _thumbnail_paths(components):
+        if thumbnails.exists(path):
+            continue
+        data = backend.get(_thumbnail_key(path))
+        if data is None:
+            continue
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        fetched += 1
+    return fetched
+
+
+def publish_catalog(backend, path=catalog.CATALOG_PATH):
+    """make a catalog file and its thumbnails available to all replicas."""
+    data = _read_bytes(path)
+    _, _, components = catalog.read_catalog(path)
+    # First, so whoever gets the catalog finds its thumbnails.
+    publish_thumbnails(backend, components)
+    backend.set(CATALOG_KEY, gzip.compress(data))
+    # Written last, so whoever sees the new version also gets the new catalog.
+    backend.set(VERSION_KEY, _header(data)["version"].encode())
+
+
+def published_version(backend):
+    version = backend.get(VERSION_KEY)
+    return None if version is None else version.decode()
+
+
+def fetch_catalog(backend, path=catalog.CATALOG_PATH):
+    """replace the catalog file with the published one (and get its thumbnails), if
+    that one is newer.
+
+    Returns whether the file was replaced.
+    """
+    path = Path(path)
+    local = _header(_read_bytes(path)) if path.exists() else None
+    version = published_version(backend)
+    if version is None or (local and local["version"] == version):
+        return False
+    data = gzip.decompress(backend.get(CATALOG_KEY))
+    if local and _updated_at(_header(data)) <= _updated_at(local):
+        return False
+    # Same suffix, so `read_catalog` knows whether it's gzipped.
+    tmp = path.with_name("tmp-" + path.name)
+    tmp.write_bytes(gzip.compress(data) if path.name.endswith(".gz") else data)
+    _, _, components = catalog.read_catalog(tmp)
+    fetch_thumbnails(backend, components)
+    os.replace(tmp, path)
+    return True
+
+
+def load_catalog(
+    backend, crawl, path=catalog.CATALOG_PATH, max_age=None, on_crawl=None
+):
+    """return (version, crawled_at, components) of the latest catalog.
+
+    Takes the local file or the published one if it's younger than `max_age`.
+    Otherwise, calls `crawl(path)` to write a new catalog file if we get the lease,
+    and publishes it. If another replica is crawling, returns the old
+    catalog (or waits for the new one if there's none). `on_crawl()` is called
+    before crawling or waiting.
+    """
+    path = Path(path)
+    fetch_catalog(backend, path)
+    if path.exists():
+        version, crawled_at, components = catalog.read_catalog(path)
+        if max_age is None or time.time() - crawled_at < max_age:
+            return version, crawled_at, components
+
+    with lease(backend) as acquired:
+        if acquired:
+            # Someone might have published one right before we got the lease.
+            if fetch_catalog(backend, path):
+                return catalog.read_catalog(path)
+            if on_crawl is not None:
+                on_crawl()
+            crawl(path)
+            publish_catalog(backend, path)
+            return catalog.read_catalog(path)
+
+    # Someone else is crawling. Serve the old catalog until they publish the new one
+    # (which the app notices by polling `published_version`).
+    if not path.exists() and on_crawl is not None:
+        on_crawl()
+    if not path.exists() and not wait_for_catalog(backend, path):
+        raise RuntimeError("Another replica is crawling but didn't publish a catalog")
+    return catalog.read_catalog(path)
+
+
+def wait_for_catalog(backend, path=catalog.CATALOG_PATH, name=LEASE_NAME):
+    """wait until another replica published a catalog, returns whether it did.
+
+    Waits as long as the crawl lease is held (a full crawl can take hours), so this
+    only gives up if the crawling replica released it without publishing or died.
+    """
+    while True:
+        if fetch_catalog(backend, path):
+            return True
+        if not backend.held(name):
+            # Published right before it was released?
+            return fetch_catalog(backend, path)
+        time.sleep(WAIT_INTERVAL)
@@ -0,0 +1,368 @@
+"""One immutable, process-wide snapshot of the catalog, shared by all sessions.
+
+Memo and singleton functions hash their arguments on every call, and memo returns a
+fresh unpickled copy of its value each time. With the full list of components as
+argument, every rerun of every session hashed and copied the whole catalog several
+times. Instead, the catalog is now loaded once into a `Snapshot` with a version id.
+Sessions only hold a reference to it. The queries without search (landing page,
+newcomers, categories) are precomputed when a snapshot is built (`LandingViews`),
+other sort/filter results are cached per (snapshot version, query) as read-only
+arrays of row ids.
+
+Once the snapshot is older than `MAX_AGE` (or a new catalog file shows up), a single
+background thread loads the next one while the old one is still served
+(stale-while-revalidate), and then swaps it in. Only the very first build makes
+visitors wait, or, if it has to crawl, see the components that are done so far (see
+`partial`). If the load returns the version we already have (e.g. another replica
+is still crawling, see `shared`), nothing is rebuilt and it's tried again later.
+"""
+
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from catalog import ComponentTable
+from search_index import SearchIndex
+
+# Crawl again after this long.
+MAX_AGE = 28 * 24 * 3600
+# Wait this long before trying again after a refresh failed (or found nothing new).
+RETRY_AFTER = 3600
+# How often to check whether there's a new catalog (see `poll` below).
+POLL_INTERVAL = 60
+# Number of sort/filter results kept (they're only a few kB each).
+QUERY_CACHE_SIZE = 512
+# The newcomers on the landing page are from this many days.
+NEWCOMER_DAYS = 60
+
+
+def _readonly(rows):
+    rows.flags.writeable = False
+    return rows
+
+
+class LandingViews:
+    """Row ids of the queries without search, i.e. what the landing page and the
+    category pages show, computed once per snapshot.
+
+    For each sort key: all rows, the rows of each category and the newcomers (rows
+    from the last `newcomer_days` days before the views were built, with their
+    dates, so any later window is a filter over a few dozen rows). Also the position
+    of each row in the sort order, so search results can be ranked without sorting
+    the whole table.
+    """
+
+    def __init__(self, table, newcomer_days=NEWCOMER_DAYS, now=None):
+        now = time.time() if now is None else now
+        # Midnight of the day before, so a window that starts at any time of the
+        # first day fits, in any timezone (dates are naive).
+        self.recent_since = int(now // 86400 - newcomer_days - 1) * 86400
+        self.by_sort = {}
+        self.positions = {}  # sort key -> position of each row in `by_sort`
+        self.by_category = {}
+        self.recent = {}
+        self._newcomers = {}  # (sort key, newer_than) -> rows, one per day in the app
+        for key in table.sort_keys:
+            rows = _readonly(table.sort(key))
+            self.by_sort[key] = rows
+            positions = np.empty(len(rows), dtype=np.int64)
+            positions[rows] = np.arange(len(rows))
+            self.positions[key] = _readonly(positions)
+            for category in table.category_names:
+                self.by_category[key, category] = _readonly(
+                    table.filter(rows, categories=[category])
+                )
+            recent = rows[table.date[rows] >= self.recent_since]
+            self.recent[key] = (recent, table.date[recent])
+
+    def lookup(self, sort_by, categories=None, newer_than=None):
+        """return the row ids for a query without search, or None if it's not one
+        of the precomputed ones."""
+        if sort_by not in self.by_sort:
+            return None
+        if newer_than is None:
+            if not categories:
+                return self.by_sort[sort_by]
+            if len(categories) == 1:
+                return self.by_category.get((sort_by, categories[0]))
+            return None
+        if categories:
+            return None
+        key = (sort_by, newer_than)
+        rows = self._newcomers.get(key)
+        if rows is None:
+            since = int(np.datetime64(newer_than, "s").astype(np.int64))
+            if since < self.recent_since:
+                return None
+            recent, dates = self.recent[sort_by]
+            rows = self._newcomers[key] = _readonly(recent[dates >= since])
+        return rows
+
+    def nbytes(self):
+        arrays = [*self.by_sort.values(), *self.positions.values()]
+        arrays += self.by_category.values()
+        arrays += [a for pair in self.recent.values() for a in pair]
+        return sum(a.nbytes for a in arrays)
+
+
+class Snapshot:
+    def __init__(self, components, categories=(), version=None, created_at=None):
+        self.components = tuple(components)
+        self.categories = tuple(categories)
+        if version is None:
+            version = hashlib.sha1(pickle.dumps(self.components)).hexdigest()[:12]
+        self.version = version
+        # When the data was crawled.
+        self.created_at = time.time() if created_at is None else created_at
+        self.table = ComponentTable(self.components, self.categories)
+        self.search_index = SearchIndex(self.components)
+        self.views = LandingViews(self.table)
+        self._extras = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.components)
+
+    @property
+    def age(self):
+        return time.time() - self.created_at
+
+    def extra(self, name, build):
+        """return `build(self)`, built once per snapshot (e.g. the card renderer)."""
+        with self._lock:
+            if name not in self._extras:
+                self._extras[name] = build(self)
+            return self._extras[name]
+
+    def query(self, sort_by, search=None, categories=None, newer_than=None):
+        """return row ids of the components matching the query, in display order.
+
+        `sort_by` is a sort key of `ComponentTable`. With a search, the best matches
+        come first (in sort order for the same score).
+        """
+        if not search:
+            rows = self.views.lookup(sort_by, categories, newer_than)
+            if rows is not None:
+                return rows
+        if search:
+            matches = self.search_index.search(search)
+            rows = self.table.rank(matches, self.views.positions[sort_by])
+        else:
+            rows = self.views.by_sort[sort_by]
+        rows = self.table.filter(rows, categories=categories, newer_than=newer_than)
+        rows.flags.writeable = False
+        return rows
+
+
+class SnapshotStore:
+    """Holds the current snapshot and caches query results for it.
+
+    `load()` returns (version, crawled_at, components) of the latest catalog (version
+    can be None). It's called when the store is first used (everyone waits for that)
+    and then in the background whenever the snapshot gets older than `max_age`, or
+    when `poll()` returns something else than the last time (e.g. the modification
+    time of the catalog file).
+    """
+
+    def __init__(self, load, categories=(), max_age=MAX_AGE, poll=None):
+        self.load = load
+        self.categories = tuple(categories)
+        self.max_age = max_age
+        self.poll = poll
+        self._polled_at = 0
+        self._poll_value = None
+        self._snapshot = None
+        self._merged = {}  # stats version -> snapshot with stats merged in
+        self._results = OrderedDict()  # (version, query) -> rows
+        self._lock = threading.Lock()
+        # Held while a snapshot is built, so there's only ever one crawl.
+        self._build_lock = threading.Lock()
+        # Notified when a build is done (or failed).
+        self._built = threading.Condition(self._lock)
+        self.refresh_status = {
+            "running": False,
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "unchanged": False,
+        }
+
+    def _build(self):
+        """load and swap in a new snapshot. Needs to hold `_build_lock`."""
+        with self._lock:
+            self.refresh_status.update(running=True, started_at=time.time())
+        try:
+            poll_value = self.poll() if self.poll is not None else None
+            version, crawled_at, components = self.load()
+            with self._lock:
+                current = self._snapshot
+            if (
+                version is not None
+                and current is not None
+                and current.version == version
+            ):
+                with self._lock:
+                    self._poll_value = poll_value
+                    self.refresh_status.update(
+                        running=False,
+                        finished_at=time.time(),
+                        error=None,
+                        unchanged=True,
+                    )
+                return
+            snapshot = Snapshot(components, self.categories, version, crawled_at)
+        except Exception as e:
+            with self._lock:
+                self.refresh_status.update(
+                    running=False, finished_at=time.time(), error=str(e)
+                )
+                self._built.notify_all()
+            raise
+        with self._lock:
+            self._snapshot = snapshot
+            self._poll_value = poll_value
+            self._merged = {}
+            self.refresh_status.update(
+                running=False, finished_at=time.time(), error=None, unchanged=False
+            )
+            self._built.notify_all()
+
+    def _start_refresh(self, force=False):
+        with self._lock:
+            status = self.refresh_status
+            if (
+                not force
+                and (status["error"] or status["unchanged"])
+                and time.time() - status["finished_at"] < RETRY_AFTER
+            ):
+                return
+        if not self._build_lock.acquire(blocking=False):
+            return  # already running
+        with self._lock:
+            # Right away, not once the thread runs, see `_wait_for_first`.
+            self.refresh_status["running"] = True
+
+        def run():
+            try:
+                self._build()
+            except Exception as e:
+                # Keep serving the old snapshot, we'll try again later.
+                print(f"Couldn't refresh the catalog: {e}")
+            finally:
+                self._build_lock.release()
+
+        threading.Thread(target=run, name="refresh-catalog", daemon=True).start()
+
+    def current(self, block=True, until=None):
+        """return the current snapshot.
+
+        Builds the first one (blocking). With `block=False`, it's built in the
+        background instead and this returns None until it's there. With an `until`
+        event as well, it still waits for it, unless (or until) the event is set, e.g.
+        once the load turns out to need a crawl. After the first one, it always
+        returns right away and starts a refresh in the background if the snapshot is
+        too old.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None and not block:
+            self._start_refresh()
+            if until is not None:
+                snapshot = self._wait_for_first(until)
+        elif snapshot is None:
+            with self._build_lock:
+                with self._lock:
+                    snapshot = self._snapshot
+                if snapshot is None:
+                    self._build()
+                    with self._lock:
+                        snapshot = self._snapshot
+        elif self._source_changed():
+            self._start_refresh(force=True)
+        elif snapshot.age > self.max_age:
+            self._start_refresh()
+        return snapshot
+
+    def _wait_for_first(self, until):
+        with self._lock:
+            while self._snapshot is None and not until.is_set():
+                if not self.refresh_status["running"]:
+                    break  # failed
+                # `until` can't notify, so check it every now and then.
+                self._built.wait(0.05)
+            return self._snapshot
+
+    def _source_changed(self):
+        if self.poll is None or time.time() - self._polled_at < POLL_INTERVAL:
+            return False
+        self._polled_at = time.time()
+        return self.poll() != self._poll_value
+
+    def refresh(self):
+        """start a refresh in the background, even if the snapshot isn't stale yet."""
+        self._start_refresh(force=True)
+
+    def status(self):
+        """return version and age of the current snapshot and the refresh status."""
+        with self._lock:
+            snapshot = self._snapshot
+            status = dict(self.refresh_status)
+        if snapshot is not None:
+            status.update(version=snapshot.version, age=snapshot.age)
+        return status
+
+    def with_stats(self, volatile_stats):
+        """return the current snapshot with the latest stars/downloads merged in.
+
+        Built once per version of the stats, its version is the one of the crawl plus
+        the one of the stats.
+        """
+        snapshot = self.current()
+        stats_version = volatile_stats.version
+        if stats_version is None:
+            return snapshot
+        with self._lock:
+            merged = self._merged.get(stats_version)
+        if merged is None:
+            merged = Snapshot(
+                volatile_stats.apply(snapshot.components),
+                self.categories,
+                version=f"{snapshot.version}-{stats_version}",
+                created_at=snapshot.created_at,
+            )
+            with self._lock:
+                if self._snapshot is snapshot:
+                    # Only the latest stats are needed.
+                    self._merged = {stats_version: merged}
+        return merged
+
+    def query(self, snapshot, sort_by, search=None, categories=None, newer_than=None):
+        """cached version of `snapshot.query`."""
+        if not search:
+            # The common ones (e.g. the landing page) are precomputed per snapshot.
+            rows = snapshot.views.lookup(sort_by, categories, newer_than)
+            if rows is not None:
+                return rows
+        if search:
+            search = " ".join(search.casefold().split())
+        key = (
+            snapshot.version,
+            sort_by,
+            search or None,
+            tuple(categories or ()),
+            newer_than,
+        )
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        rows = snapshot.query(sort_by, search, categories, newer_than)
+        with self._lock:
+            self._results[key] = rows
+            while len(self._results) > QUERY_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return rows
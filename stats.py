@@ -0,0 +1,128 @@
+"""Fast-refresh tier for the numbers that change all the time (downloads and stars).
+
+The catalog itself is only crawled every few weeks. Download counts and stars are
+kept separately here, keyed by package and repo, and refreshed in the background on
+their own schedule. They're merged onto the cached components whenever the page is
+read, so sorting uses fresh numbers without a full recrawl.
+"""
+
+import dataclasses
+import threading
+import time
+
+import requests
+
+import github
+import pypi
+
+STARS_TTL = 3600
+# pypistats.org only updates once a day anyway.
+DOWNLOADS_TTL = 24 * 3600
+# Wait this long before trying again after a refresh failed.
+RETRY_AFTER = 300
+
+
+class VolatileStats:
+    def __init__(self, stars_ttl=STARS_TTL, downloads_ttl=DOWNLOADS_TTL):
+        self.stars_ttl = stars_ttl
+        self.downloads_ttl = downloads_ttl
+        self.stars = {}  # (user, repo) -> stars
+        self.downloads = {}  # package -> downloads last month
+        self.stars_updated = 0
+        self.downloads_updated = 0
+        self._updates = 0
+        self._running = set()
+        self._failed_at = {}
+        self._lock = threading.Lock()
+
+    def refresh_stars(self, repos, token):
+        infos = github.fetch_repos(repos, token)
+        stars = {repo: info[0] for repo, info in infos.items() if info}
+        with self._lock:
+            self.stars.update(stars)
+            self.stars_updated = time.time()
+            self._updates += 1
+
+    def refresh_downloads(self, packages):
+        downloads = {}
+        failed = 0
+        for package in packages:
+            try:
+                count = pypi.fetch_downloads(package)
+            except (requests.RequestException, KeyError, TypeError, ValueError) as e:
+                # One flaky request (or odd response) shouldn't cost all the others.
+                failed += 1
+                last_error = e
+                continue
+            if count is not None:  # keep the last number (or the crawled one)
+                downloads[package] = count
+        if failed:
+            print(f"Couldn't refresh downloads of {failed} packages: {last_error}")
+        with self._lock:
+            self.downloads.update(downloads)
+            self.downloads_updated = time.time()
+            self._updates += 1
+
+    @property
+    def version(self):
+        """changes whenever new numbers come in, None if there aren't any yet."""
+        with self._lock:
+            if not self.stars and not self.downloads:
+                return None
+            return str(self._updates)
+
+    def _start(self, name, target, *args):
+        with self._lock:
+            if name in self._running:
+                return
+            if time.time() - self._failed_at.get(name, 0) < RETRY_AFTER:
+                return
+            self._running.add(name)
+
+        def run():
+            try:
+                target(*args)
+            except Exception as e:
+                # Keep serving the old numbers, we'll try again on the next read.
+                print(f"Couldn't refresh {name}: {e}")
+                with self._lock:
+                    self._failed_at[name] = time.time()
+            finally:
+                with self._lock:
+                    self._running.discard(name)
+
+        threading.Thread(target=run, name=f"refresh-{name}", daemon=True).start()
+
+    def maybe_refresh(self, components, token):
+        """refresh stars/downloads in the background if they're out of date."""
+        now = time.time()
+        if now - self.stars_updated > self.stars_ttl:
+            repos = {github.parse_repo_url(c.github) for c in components if c.github}
+            repos.discard(None)
+            self._start("stars", self.refresh_stars, sorted(repos), token)
+        if now - self.downloads_updated > self.downloads_ttl:
+            packages = sorted({c.package for c in components if c.package})
+            self._start("downloads", self.refresh_downloads, packages)
+
+    def apply(self, components):
+        """return the components with the latest stars/downloads merged in.
+
+        Components without fresh numbers keep the ones from the crawl. The
+        components that are passed in aren't modified.
+        """
+        with self._lock:
+            stars, downloads = self.stars, self.downloads
+            if not stars and not downloads:
+                return components
+            stars, downloads = dict(stars), dict(downloads)
+
+        merged = []
+        for c in components:
+            changes = {}
+            repo = github.parse_repo_url(c.github) if c.github else None
+            if repo in stars and stars[repo] != c.stars:
+                changes["stars"] = stars[repo]
+            if c.package in downloads and downloads[c.package] != c.downloads:
+                changes["downloads"] = downloads[c.package]
+            merged.append(dataclasses.replace(c, **changes) if changes else c)
+        return merged
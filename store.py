@@ -0,0 +1,189 @@
+"""SQLite store for the validator cache (see `revalidate`).
+
+One file instead of a shelve/pickle file per url. Keeps the validators and the
+extracted value per url, and optionally the raw body (zlib-compressed, e.g. to
+re-extract fields after changing a parser without downloading everything again).
+All entries are loaded with one query at startup; after that, lookups are dict
+lookups and writes go to SQLite. When the file grows beyond `max_bytes`, the least
+recently used entries are evicted.
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+STORE_PATH = Path(".cache") / "crawl.sqlite"
+MAX_BYTES = 200_000_000
+# Commit after this many writes (and on `sync`), so a killed crawl keeps most of them.
+COMMIT_EVERY = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    value BLOB,
+    body BLOB,
+    size INTEGER,
+    fetched_at REAL,
+    used_at REAL
+)
+"""
+
+
+class ResponseStore:
+    def __init__(self, path=STORE_PATH, max_bytes=MAX_BYTES, keep_bodies=False):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.keep_bodies = keep_bodies
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        self._entries = self._load()
+        self._used = {}  # url -> used_at, written on `sync`
+        self._writes = 0
+
+    def _load(self):
+        rows = self._db.execute(
+            "SELECT url, etag, last_modified, value, size, fetched_at FROM entries"
+        )
+        return {
+            url: {
+                "etag": etag,
+                "last_modified": last_modified,
+                "value": pickle.loads(value),
+                "size": size,
+                "fetched_at": fetched_at,
+            }
+            for url, etag, last_modified, value, size, fetched_at in rows
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, url):
+        return url in self._entries
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._used[url] = time.time()
+            return entry
+
+    def put(self, url, entry, body=None):
+        """store an entry (a dict like the ones `get` returns) and maybe its body."""
+        if body is not None and self.keep_bodies:
+            body = zlib.compress(body)
+        else:
+            body = None
+        with self._lock:
+            self._entries[url] = entry
+            self._used.pop(url, None)
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    entry["etag"],
+                    entry["last_modified"],
+                    pickle.dumps(entry["value"], pickle.HIGHEST_PROTOCOL),
+                    body,
+                    entry["size"],
+                    entry["fetched_at"],
+                    time.time(),
+                ),
+            )
+            self._written()
+
+    def touch(self, url, fetched_at):
+        """mark an entry as revalidated (after a 304)."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return
+            entry["fetched_at"] = fetched_at
+            self._used.pop(url, None)
+            self._db.execute(
+                "UPDATE entries SET fetched_at = ?, used_at = ? WHERE url = ?",
+                (fetched_at, time.time(), url),
+            )
+            self._written()
+
+    def _written(self):
+        # needs to hold `_lock`
+        self._writes += 1
+        if self._writes >= COMMIT_EVERY:
+            self._db.commit()
+            self._writes = 0
+
+    def body(self, url):
+        """return the raw body stored for `url`, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return zlib.decompress(row[0])
+
+    def nbytes(self):
+        """size of the stored entries in bytes (roughly the size of the file)."""
+        with self._lock:
+            (size,) = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(url) + LENGTH(value) + "
+                "COALESCE(LENGTH(body), 0)), 0) FROM entries"
+            ).fetchone()
+        return size
+
+    def _evict(self):
+        """delete least recently used entries until they fit in `max_bytes`."""
+        excess = self.nbytes() - self.max_bytes
+        if excess <= 0:
+            return 0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, LENGTH(url) + LENGTH(value) + COALESCE(LENGTH(body), 0) "
+                "FROM entries ORDER BY used_at"
+            ).fetchall()
+            evict = []
+            for url, size in rows:
+                if excess <= 0:
+                    break
+                evict.append(url)
+                excess -= size
+            self._db.executemany(
+                "DELETE FROM entries WHERE url = ?", [(url,) for url in evict]
+            )
+            for url in evict:
+                self._entries.pop(url, None)
+                self._used.pop(url, None)
+        return len(evict)
+
+    def sync(self):
+        """write out when entries were used, evict and commit."""
+        with self._lock:
+            used, self._used = self._used, {}
+            self._db.executemany(
+                "UPDATE entries SET used_at = ? WHERE url = ?",
+                [(used_at, url) for url, used_at in used.items()],
+            )
+        evicted = self._evict()
+        with self._lock:
+            self._db.commit()
+            self._writes = 0
+        if evicted:
+            with self._lock:
+                self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._db.execute("VACUUM")
+        return evicted
+
+    def close(self):
+        self.sync()
+        with self._lock:
+            self._db.close()
@@ -1,66 +1,32 @@
-import re
+import hmac
 import time
-from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List
 
-import httpx
-import pypistats
-import requests
+import numpy as np
 import streamlit as st
-import yaml
-from bs4 import BeautifulSoup
-from markdownlit import mdlit
-from stqdm import stqdm
 
 # from streamlit_dimensions import st_dimensions
 from streamlit_pills import pills
 
+import catalog
+import pipeline
+import shared
+import stats
+from cards import CardRenderer, show_components, show_components_batched
+from metrics import REPORTS_DIR, load_reports, metrics
+from partial import PartialCatalog
+from snapshot import MAX_AGE, NEWCOMER_DAYS, SnapshotStore
+
 # from streamlit_profiler import Profiler
 
 # profiler = Profiler()
 
 st.set_page_config("Streamlit Components Hub", "🎪", layout="wide")
-NUM_COLS = 4
-
-EXCLUDE = [
-    "streamlit",
-    "streamlit-nightly",
-    "repl-streamlit",
-    "streamlit-with-ssl",
-    "streamlit-fesion",
-    "streamlit-aggrid-pro",
-    "st-dbscan",
-    "st-kickoff",
-    "st-undetected-chromedriver",
-    "st-package-reviewer",
-    "streamlit-webcam-example",
-    "st-pyv8",
-    "streamlit-extras-arnaudmiribel",
-    "st-schema-python",
-    "st-optics",
-    "st-spin",
-    "st-dataprovider",
-    "st-microservice",
-    "st_nester",
-    "st-jsme",
-    "st-parsetree",
-    "st-git-hooks",
-    "st-schema",
-    "st-distributions",
-    "st-common-data",
-    "awesome-streamlit",
-    "awesome-streamlit-master",
-    "extra-streamlit-components-SEM",
-    "barfi",
-    "streamlit-plotly-events-retro",
-    "pollination-streamlit-io",
-    "pollination-streamlit-viewer",
-    "st-clustering",
-    "streamlit-text-rating-component",
-    "custom-streamlit",
-    "hf-streamlit",
-]
+# Render the grid as pre-rendered html in a few elements instead of ~10 elements per
+# card. Much faster on every rerun, but loses the copy button on the install command.
+BATCHED_RENDERING = True
+# While the first crawl runs, rerun this often to show the components it found since.
+PARTIAL_RERUN_INTERVAL = 3
 
 CATEGORY_NAMES = {
     # Putting this first so people don't miss it. Plus I think's it's one of the most
@@ -125,6 +91,95 @@ st.write(
     unsafe_allow_html=True,
 )
 
+
+def is_admin():
+    # The admin view is at ?admin=<admin_token from the secrets>, if there's one.
+    token = st.secrets.get("admin_token")
+    given = st.experimental_get_query_params().get("admin", [""])[0]
+    return bool(token) and hmac.compare_digest(given, token)
+
+
+def show_admin_view():
+    """show the run reports of the crawls in this process or on this disk (see
+    `metrics`), to see when and where crawls get slower."""
+    icon("🔧")
+    st.write("# Crawl reports")
+    reports = load_reports()
+    if metrics.running:
+        reports.append({**metrics.report(), "kind": "running", "error": None})
+    if not reports:
+        st.write(f"No crawl reports in `{REPORTS_DIR}` yet.")
+        return
+
+    st.write("### Duration of the steps (seconds)")
+    steps = list(dict.fromkeys(step for r in reports for step in r["steps"]))
+    st.line_chart({step: [r["steps"].get(step, 0) for r in reports] for step in steps})
+    st.dataframe(
+        [
+            {
+                "started": datetime.fromtimestamp(r["started_at"]).strftime(
+                    "%Y-%m-%d %H:%M"
+                ),
+                "kind": r["kind"],
+                "minutes": round(r["duration"] / 60, 1),
+                "requests": sum(h["requests"] for h in r["hosts"].values()),
+                "MB": round(sum(h["bytes"] for h in r["hosts"].values()) / 1e6, 1),
+                "error": r["error"],
+            }
+            for r in reversed(reports)
+        ]
+    )
+
+    report = st.selectbox(
+        "Run",
+        list(reversed(reports)),
+        format_func=lambda r: datetime.fromtimestamp(r["started_at"]).strftime(
+            f"%Y-%m-%d %H:%M:%S ({r['kind']})"
+        ),
+    )
+    if report["error"]:
+        st.error(report["error"])
+    st.write("### Hosts")
+    st.dataframe(
+        [
+            {
+                "host": host,
+                "requests": h["requests"],
+                "MB": round(h["bytes"] / 1e6, 2),
+                "mean latency (s)": round(h["seconds"] / max(h["requests"], 1), 3),
+                "rate limit wait (s)": round(h["waited"], 1),
+                **{f"status {code}": n for code, n in h["status_codes"].items()},
+            }
+            for host, h in report["hosts"].items()
+        ]
+    )
+    host = st.selectbox("Latency histogram", list(report["hosts"]))
+    if host:
+        latency = report["hosts"][host]["latency"]
+        st.dataframe([{"latency": k, "requests": n} for k, n in latency.items()])
+    st.write("### Parsing and helpers")
+    timings = {**report["parsing"], **report["calls"]}
+    st.dataframe(
+        [
+            {"function": name, "calls": t["calls"], "seconds": round(t["seconds"], 2)}
+            for name, t in timings.items()
+        ]
+    )
+    st.write("### Caches and checkpoint")
+    st.json(
+        {
+            **report["counters"],
+            **{k: report.get(k) for k in ["thumbnails", "checkpoint"]},
+        }
+    )
+    with st.expander("Full report"):
+        st.json(report)
+
+
+if is_admin():
+    show_admin_view()
+    st.stop()
+
 # Only do this once at the beginning of the session. If we're doing it at every rerun,
 # the width will fluctuate because the sidebar appears or disappears, leading to
 # this running over and over again.
@@ -164,7 +219,6 @@ if search:
 sorting = col2.selectbox(
     "Sort by", ["⭐️ Stars on GitHub", "⬇️ Downloads last month", "🐣 Newest"]
 )
-install_command = "pip install"
 category = pills(
     "Category",
     list(CATEGORY_NAMES.keys()),
@@ -178,614 +232,195 @@ category = pills(
 st.write("")
 
 
-@st.experimental_memo(ttl=28 * 24 * 3600, persist="disk", show_spinner=False)
-def get(*args, **kwargs):
-    res = requests.get(*args, **kwargs)
-    return res.status_code, res.text
+SORT_KEYS = {
+    "⭐️ Stars on GitHub": "stars",
+    "⬇️ Downloads last month": "downloads",
+    # Repo creation date from Github if we have it, otherwise the first release on PyPI.
+    "🐣 Newest": "date",
+}
 
 
-@st.experimental_memo(ttl=28 * 24 * 3600, persist="disk", show_spinner=False)
-def get_github_info(url):
-    """use the github api to get the number of stars for a given repo"""
-    url = url.replace("https://", "").replace("http://", "")
-    user, repo = url.split("/")[1:3]
-    response = requests.get(
-        f"https://api.github.com/repos/{user}/{repo}",
-        headers={
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f"Token {st.secrets.gh_token}",
-        },
-    )
-    if response.status_code == 404:
-        return None, None, None, None
-    elif response.status_code != 200:
-        raise RuntimeError(
-            f"Couldn't get repo details, status code {response.status_code} for url: {url}, user: {user}, repo: {repo}"
-        )
-    response_json = response.json()
-    created_at = datetime.strptime(response_json["created_at"], "%Y-%m-%dT%H:%M:%SZ")
-    return (
-        response_json["stargazers_count"],
-        response_json["description"],
-        response_json["owner"]["avatar_url"],
-        created_at,
+def get_rows(snapshot, sorting, search=None, category=None, newer_than=None):
+    """return row ids of the components to show, cached per snapshot and query."""
+    if sorting not in SORT_KEYS:
+        raise ValueError(f"`sorting` must be one of {list(SORT_KEYS)}")
+    return snapshot_store.query(
+        snapshot,
+        SORT_KEYS[sorting],
+        search,
+        categories=[category] if category else None,
+        newer_than=newer_than,
     )
 
 
-@st.experimental_memo(ttl=28 * 24 * 3600, persist="disk", show_spinner=False)
-def parse_github_readme(url):
-    """get the image url from the github readme"""
-    # TODO: Could do this by getting the raw readme file and not the rendered page.
-    # But then it's a lot more difficult to find images, since we need to parse markdown.
-    status_code, text = get(
-        url,
-        headers={
-            "Authorization": f"Token {st.secrets.gh_token}",
-        },
-    )
-    if status_code == 404:
-        return None, None, None
-    elif status_code != 200:
-        raise RuntimeError(
-            f"Couldn't get Github page, status code {status_code} for url: {url}"
-        )
-    time.sleep(0.2)  # wait a bit to not get rate limited
-    soup = BeautifulSoup(text, "html.parser")
-    # st.expander("Show HTML").code(response.text)
-    readme = soup.find(id="readme")
-    if readme is None:
-        return None, None, None
-
-    # Find first image that's not a badge or logo.
-    images = readme.find_all("img")
-
-    def is_no_badge(img):
-        srcs = img["src"] + img.get("data-canonical-src", "")
-        return not (
-            "badge" in srcs
-            or "shields.io" in srcs
-            or "circleci" in srcs
-            or "buymeacoffee" in srcs
-            or "ko-fi" in srcs
-            or "logo" in srcs
-            or "streamlit-mark" in srcs
-            or "coverage" in srcs
-            or "Cover" in srcs
-            or "hydra.png" in srcs
-        )
+if "limit" not in st.session_state:
+    st.session_state["limit"] = 60
 
-    images = list(filter(is_no_badge, images))
-    if not images:
-        image_url = None
-    else:
-        image_url = images[0]["src"]
-        if image_url.startswith("/"):
-            image_url = "https://github.com" + image_url
-
-    # Find text in first paragraph.
-    description = None
-    paragraphs = readme.find_all("p")
-    for paragraph in paragraphs:
-        clean_paragraph = paragraph.text.replace("\n", "").strip()
-        if clean_paragraph:
-            description = clean_paragraph
-            break
-
-    # Find link to demo app.
-    # TODO: Should only do this if demo app is not known yet.
-    try:
-        demo_url = soup.find("a", href=re.compile("share\.streamlit\.io/+"))["href"]
-    except TypeError:
-        try:
-            demo_url = soup.find("a", href=re.compile("\.streamlitapp\.com"))["href"]
-        except TypeError:
-            demo_url = None
-            # TODO: Need to add streamlit.app here.
-
-    # print("func", image_url, description)
-    return image_url, description, demo_url
-
-
-def chunks(lst, n):
-    """Yield successive n-sized chunks from lst."""
-    for i in range(0, len(lst), n):
-        yield lst[i : i + n]
-
-
-TRACKER = "https://discuss.streamlit.io/t/streamlit-components-community-tracker/4634"
-
-
-@dataclass
-class Component:
-    name: str = None
-    package: str = None
-    demo: str = None
-    forum_post: str = None
-    github: str = None
-    pypi: str = None
-    image_url: str = None
-    # screenshot_url: str = None
-    stars: int = None
-    github_description: str = None
-    pypi_description: str = None
-    avatar: str = None
-    search_text: str = None
-    github_author: str = None
-    pypi_author: str = None
-    created_at: datetime = None
-    downloads: int = None
-    categories: List[str] = None
-
-
-@st.experimental_memo(ttl=28 * 24 * 3600, persist="disk", show_spinner=False)
-def get_all_packages():
-    url = "https://pypi.org/simple/"
-    status_code, text = get(url)
-    soup = BeautifulSoup(text, "html.parser")
-    packages = [
-        a.text
-        for a in soup.find_all("a")
-        if (
-            "streamlit" in a.text
-            or a.text.startswith("st-")
-            or a.text.startswith("st_")
-        )
-        and a.text not in EXCLUDE
-    ]
-    return packages
-
-
-@st.experimental_memo(ttl=24 * 3600, persist="disk", show_spinner=False)
-def get_downloads(package):
-    try:
-        downloads = pypistats.recent(package, "month", format="pandas")["last_month"][
-            0
-        ]  # .iloc[-1]["downloads"]
-    except httpx.HTTPStatusError:
-        time.sleep(10)
-        try:
-            downloads = pypistats.recent(package, "month", format="pandas")[
-                "last_month"
-            ][
-                0
-            ]  # .iloc[-1]["downloads"]
-        except httpx.HTTPStatusError:
-            # give up
-            return 0
-    time.sleep(0.1)  # don't get rate-limited
-    return downloads
-
-
-@st.experimental_memo(ttl=28 * 24 * 3600, show_spinner=False)
-def get_components():
-    components_dict = {}
-
-    # Step 1: Get components from tracker
-    status_code, text = get(TRACKER)
-    if status_code != 200:
-        raise RuntimeError(
-            f"Could not access components tracker, status code {status_code}"
-        )
 
-    soup = BeautifulSoup(text, "html.parser")
-    lis = soup.find_all("ul")[3].find_all("li")
-
-    for li in stqdm(lis, desc="🎈 Crawling Streamlit forum (step 1/5)"):
-        c = Component()
-        name = re.sub("\(.*?\)", "", li.text)
-        name = name.split(" – ")[0]
-        name = name.strip()
-        c.name = name
-
-        links = [a.get("href") for a in li.find_all("a")]
-        for l in links:
-            if l.startswith("https://github.com"):
-                c.github = l
-            elif l.startswith("https://share.streamlit.io") or "streamlitapp.com" in l:
-                c.demo = l
-            elif l.startswith("https://discuss.streamlit.io"):
-                c.forum_post = l
-            elif l.startswith("https://pypi.org"):
-                c.pypi = l
-                c.package = re.match("https://pypi.org/project/(.*?)/", l).group(1)
-
-        if c.github and not c.package:
-            repo_name = (
-                c.github.replace("https://", "").replace("http://", "").split("/")[2]
-            )
-            # print(repo_name)
-            url = f"https://pypi.org/project/{repo_name}/"
-            status_code, text = get(url)
-            if status_code != 404:
-                c.package = repo_name
-                c.pypi = url
-                # print("found package based on repo name:", repo_name)
-
-        if c.package:
-            components_dict[c.package] = c
-        else:
-            components_dict[c.name] = c
-
-    # Step 2: Download PyPI index
-    with st.spinner("⬇️ Downloading PyPI index (step 2/5)"):
-        packages = get_all_packages()
-
-    # Step 3: Search through PyPI packages
-    # TODO: This could be wrapped in memo as well.
-    for p in stqdm(packages, desc="📦 Crawling PyPI (step 3/5)"):
-        # if p.startswith("streamlit") or p.startswith("st-") or p.startswith("st_"):
-
-        # TODO: There's a JSON API to do this: https://pypi.org/pypi/<package>/json
-
-        url = f"https://pypi.org/project/{p}/"
-        status_code, text = get(url)
-        if status_code != 404:
-            # st.expander("show html").code(res.text)
-
-            if p not in components_dict:
-                components_dict[p] = Component(name=p)
-            c = components_dict[p]
-
-            if not c.package:
-                c.package = p
-            if not c.pypi:
-                c.pypi = url
-
-            if not c.pypi_author or not c.github:
-                soup = BeautifulSoup(text, "html.parser")
-
-                if not c.pypi_author:
-                    pypi_author = soup.find(
-                        "span", class_="sidebar-section__user-gravatar-text"
-                    ).text.strip()
-                    c.pypi_author = pypi_author
-
-                if not c.github:
-                    homepage = soup.find("i", class_="fas fa-home")
-                    if homepage and "github.com" in homepage.parent["href"]:
-                        c.github = homepage.parent["href"]
-                        # print("found github link from homepage link:", c.github)
-                    else:
-                        sidebar_links = soup.find_all(
-                            "a",
-                            class_="vertical-tabs__tab vertical-tabs__tab--with-icon vertical-tabs__tab--condensed",
-                        )
-                        for l in sidebar_links:
-                            if "github.com" in l["href"]:
-                                c.github = l["href"]
-                                # print(
-                                #     "found github link from sidebar link:",
-                                #     c.github,
-                                # )
-                                break
-
-                # TODO: Maybe do this outside of the if?
-                summary = soup.find("p", class_="package-description__summary")
-                if (
-                    summary
-                    and summary.text
-                    and summary.text != "No project description provided"
-                ):
-                    # print("found summary description on pypi:", summary.text)
-                    c.pypi_description = summary.text
-                else:
-                    # Search for first non-empty paragraph.
-                    project_description = soup.find("div", class_="project-description")
-                    if project_description:
-                        paragraphs = project_description.find_all("p")
-                        for p in paragraphs:
-                            text = p.text.replace("\n", "").strip()
-                            if text:
-                                c.pypi_description = text
-                                break
-
-    # profiler.start()
-    # Step 4: Enrich info of components found above by reading data from Github
-    for c in stqdm(components_dict.values(), desc="👾 Crawling Github (step 4/5)"):
-        # Try to get Github URL by combining PyPI author name + package name.
-        if not c.github and c.package and c.pypi_author:
-            possible_repo_names = [c.package]
-            if "-" in c.package:
-                # Sometimes, package names contain "-"" but repos "_", so check for these
-                # mutations as well.
-                possible_repo_names.append(c.package.replace("-", "_"))
-            for repo in possible_repo_names:
-                status_code, text = get(
-                    f"https://api.github.com/repos/{c.pypi_author}/{repo}",
-                    headers={
-                        "Accept": "application/vnd.github.v3+json",
-                        "Authorization": f"Token {st.secrets.gh_token}",
-                    },
-                )
-                if status_code == 200:
-                    c.github = f"https://github.com/{c.pypi_author}/{repo}"
-                    if repo != c.package:
-                        print(
-                            f"found github url by mutating package name, original: {c.package}, mutated: {repo}"
-                        )
-                    break
-
-        if c.github:
-            # print(c.github)
-            c.github_author = re.search("github.com/(.*?)/", c.github).group(1)
-            try:
-                (
-                    c.stars,
-                    c.github_description,
-                    c.avatar,
-                    c.created_at,
-                ) = get_github_info(c.github)
-            except:
-                pass  # TODO: Handle this better. Sometimes Github shows 401 errors.
-
-            # this can also return None!
-            c.image_url, readme_description, demo_url = parse_github_readme(c.github)
-            if not c.github_description and readme_description:
-                # print("found description in github readme")
-                c.github_description = readme_description
-            if not c.demo and demo_url:
-                # print("found demo url in github readme", demo_url)
-                c.demo = demo_url
-
-        # Get download numbers from PyPI
-        if c.package:
-            c.downloads = get_downloads(c.package)
-
-        # Set names based on PyPI package names.
-        # TODO: If I go with this, I should not even fetch the names from the forum post
-        # above.
-        if c.package:
-            name = c.package
-            if name.startswith("st-") or name.startswith("st_"):  # only do at start
-                name = name[3:]
-            c.name = (
-                name.replace("streamlit", "")
-                .replace("--", " ")
-                .replace("-", " ")
-                .replace("__", " ")
-                .replace("_", " ")
-                .strip()
-                .title()
-                .replace("Nlu", "NLU")  # special case adjustments for top results ;)
-                .replace(" Cli", " CLI")
-                .replace("rtc", "RTC")
-                .replace("Hiplot", "HiPlot")
-                .replace("Spacy", "SpaCy")
-                .replace("Aggrid", "AgGrid")
-                .replace("Echarts", "ECharts")
-                .replace("Ui", "UI")
-            )
-
-            # if c.package.startswith("streamlit-"):
-            #     c.name = c.package[10:].replace("-", " ").capitalize()
-            # elif c.package.endswith("-streamlit"):
-            #     c.name = c.package[:-10].replace("-", " ").capitalize()
-            # elif c.package.startswith("st-"):
-            #     c.name = c.package[3:].replace("-", " ").capitalize()
-            # else:
-            #     c.name = c.package.replace("-streamlit-", " ").replace("-", " ").capitalize()
-
-        c.search_text = (
-            str(c.name)
-            + str(c.github_description)
-            + str(c.pypi_description)
-            + str(c.github_author)
-            + str(c.package)
-        )
+def show_more():
+    st.session_state["limit"] += 40
 
-    # profiler.stop()
-
-    # Step 5: Enrich with additional data that was manually curated in
-    # additional_data.yaml (currently only categories).
-    with open("additional_data.yaml") as f:
-        additional_data = yaml.safe_load(f)
-    for c in stqdm(
-        components_dict.values(),
-        desc="🖐 Enriching with manually collected data (step 5/5)",
-    ):
-        # TODO: Need to do this better. Maybe just store pypi name instead of entire url.
-        if c.pypi and c.pypi.split("/")[-2] in additional_data:
-            c.categories = additional_data[c.pypi.split("/")[-2]]["categories"]
-        else:
-            c.categories = []
-    return list(components_dict.values())
-
-
-@st.experimental_memo(show_spinner=False)
-def sort_components(components: list, by):
-    if by == "⭐️ Stars on GitHub":
-        return sorted(
-            components,
-            key=lambda c: (
-                c.stars if c.stars is not None else 0,
-                c.image_url is not None,  # items with image first
-            ),
-            reverse=True,
-        )
-    elif by == "🐣 Newest":
-        # TODO: This only works for components that have a Github link because we pull
-        # the created_at date from Github. Make this work with the release date on PyPI.
-        return sorted(
-            components,
-            key=lambda c: (
-                c.created_at if c.created_at is not None else datetime(1970, 1, 1),
-                c.image_url is not None,  # items with image first
-            ),
-            reverse=True,
-        )
-    elif by == "⬇️ Downloads last month":
-        return sorted(
-            components,
-            key=lambda c: (
-                c.downloads if c.downloads is not None else 0,
-                c.image_url is not None,  # items with image first
-            ),
-            reverse=True,
-        )
-    else:
-        raise ValueError("`by` must be either 'Stars' or 'Newest'")
-
-
-@st.experimental_memo(show_spinner=False)
-def filter_components(components, search=None, category=None, newer_than=None):
-    if search:
-        components = list(filter(lambda c: search.lower() in c.search_text, components))
-    if category:
-        components = list(filter(lambda c: category in c.categories, components))
-    if newer_than:
-        components = list(
-            filter(lambda c: c.created_at and c.created_at >= newer_than, components)
-        )
-    return components
 
+@st.experimental_singleton
+def get_volatile_stats():
+    return stats.VolatileStats()
+
+
+def load_catalog(cache, partial_catalog=None):
+    """return (version, crawled_at, components) of the latest catalog.
+
+    Uses the catalog file written by `python pipeline.py` (e.g. on a scheduled job)
+    or published by another replica if there's a recent one. Otherwise, crawls
+    right here (unless another replica is crawling already) and publishes it. If it
+    crawls (or waits for another replica), `partial_catalog` is started and the
+    components are added to it while they're crawled.
+    """
+    on_component = partial_catalog.add if partial_catalog is not None else None
+    on_crawl = partial_catalog.start if partial_catalog is not None else None
+    return shared.load_catalog(
+        cache,
+        lambda path: pipeline.crawl_catalog(
+            path, st.secrets.gh_token, on_component=on_component
+        ),
+        max_age=MAX_AGE,
+        on_crawl=on_crawl,
+    )
 
-def shorten(text, length=100):
-    if len(text) > length:
-        short_text = text[:length]
 
-        # Cut last word if short_text doesn't end on a word.
-        if short_text[-1] != " " and text[length] != " ":
-            short_text = short_text[: short_text.rfind(" ")]
+def catalog_mtime():
+    path = catalog.CATALOG_PATH
+    return path.stat().st_mtime if path.exists() else None
 
-        # Remove whitespace at the end.
-        short_text = short_text.rstrip()
 
-        # Deal with sentence end markers.
-        if short_text[-1] in [".", "!", "?"]:
-            return short_text
-        elif short_text[-1] in [",", ";", ":", "-"]:
-            return short_text[:-1] + "..."
-        else:
-            return short_text + "..."
-    else:
-        return text
-
-
-# Can't memo-ize this right now because st.image doesn't work.
-# @st.experimental_memo
-def show_components(components, limit=None):
-    if limit is not None:
-        components = components[:limit]
-
-    for i, components_chunk in enumerate(chunks(components, NUM_COLS)):
-        cols = st.columns(NUM_COLS, gap="medium")
-        for c, col in zip(components_chunk, cols):
-            with col:
-                if c.image_url is not None:
-                    img_path = c.image_url
-                # TODO: This doesn't work on Cloud, disabling for now.
-                # elif c.demo is not None:
-                #     screenshot_dir = Path("screenshots")
-                #     screenshot_dir.mkdir(exist_ok=True, parents=True)
-                #     escaped_screenshot_url = (
-                #         c.demo.replace("https://", "")
-                #         .replace("/", "_")
-                #         .replace(".", "_")
-                #     )
-                #     img_path = screenshot_dir / f"{escaped_screenshot_url}.png"
-                #     if not img_path.exists():
-                #         save_screenshot(c.demo, img_path, sleep=15)
-                else:
-                    img_path = "default_image.png"
-
-                st.image(str(img_path), use_column_width=True)
-                title = f"#### {c.name}"
-                if c.stars:
-                    title += f" ({c.stars} ⭐️)"
-                # print(title)
-                st.write(title)
-                if c.avatar:
-                    avatar_path = c.avatar
-                else:
-                    # TODO: Need to use web URL because we can't expose image through static folder.
-                    avatar_path = "https://icon-library.com/images/default-profile-icon/default-profile-icon-16.jpg"
-                if c.github_author and c.avatar:
-                    st.caption(
-                        f'<a href="https://github.com/{c.github_author}"><img src="{avatar_path}" style="border: 1px solid #D6D6D9; width: 20px; height: 20px; border-radius: 50%"></a> &nbsp; <a href="https://github.com/{c.github_author}" style="color: inherit; text-decoration: inherit">{c.github_author}</a>',
-                        unsafe_allow_html=True,
-                    )
-                # elif c.github_author:
-                #     # TODO: Some of the Github pages extracted above return 404, so
-                #     # we can't get the avatar image from them. We could get them by
-                #     # querying with the author name directly but for now I'm just hiding the avatar images.
-                #     st.caption(
-                #         f'<a href="https://github.com/{c.github_author}" style="color: inherit; text-decoration: inherit">{c.github_author}</a>',
-                #         unsafe_allow_html=True,
-                #     )
-                elif c.pypi_author:
-                    st.caption(
-                        f'<a href="https://pypi.org/user/{c.pypi_author}"><img src="{avatar_path}" style="border: 1px solid #D6D6D9; width: 20px; height: 20px; border-radius: 50%"></a> &nbsp; <a href="https://pypi.org/user/{c.pypi_author}" style="color: inherit; text-decoration: inherit">{c.pypi_author}</a>',
-                        unsafe_allow_html=True,
-                    )
-
-                if c.github_description:
-                    st.write(shorten(c.github_description))
-                elif c.pypi_description:
-                    st.write(c.pypi_description)
-                if c.package:
-                    st.code(f"{install_command} {c.package}", None)
-                formatted_links = []
-                if c.github:
-                    # formatted_links.append(mention("Github", c.github, icon="github", write=False))
-                    # formatted_links.append(f"[GitHub]({c.github})")
-                    formatted_links.append(f"@(GitHub)({c.github})")
-                if c.demo:
-                    # formatted_links.append(mention("Demo", c.demo, icon="🎈", write=False))
-                    # formatted_links.append(f"[Demo]({c.demo})")
-                    formatted_links.append(f"@(🎈)(Demo)({c.demo})")
-                if c.forum_post:
-                    # formatted_links.append(f"[Forum]({c.forum_post})")
-                    # formatted_links.append(mention("Forum", c.forum_post, icon="streamlit", write=False))
-                    formatted_links.append(f"@(Forum)({c.forum_post})")
-                if c.pypi:
-                    # formatted_links.append(f"[PyPI]({c.pypi})")
-                    # formatted_links.append(mention("PyPI", c.pypi, icon="📦", write=False))
-                    formatted_links.append(f"@(📦)(PyPI)({c.pypi})")
-
-                # st.write(" • ".join(formatted_links), unsafe_allow_html=True)
-                mdlit(" &nbsp;•&nbsp; ".join(formatted_links))
-                # st.caption(", ".join(c.categories))
-                st.write("")
-                st.write("")
-                st.write("")
-
-        # if i < (min(limit, len(components)) // NUM_COLS) - 1:
-        # st.write("---")
+@st.experimental_singleton
+def get_shared_cache():
+    # Set $SHARED_CACHE_URL to share the catalog between replicas.
+    return shared.from_url()
 
 
-if "limit" not in st.session_state:
-    st.session_state["limit"] = 60
+@st.experimental_singleton
+def get_partial_catalog():
+    return PartialCatalog(CATEGORY_NAMES)
 
 
-def show_more():
-    st.session_state["limit"] += 40
+@st.experimental_singleton
+def get_snapshot_store():
+    cache = get_shared_cache()
+    partial_catalog = get_partial_catalog()
+
+    def load():
+        # Only the first crawl is shown while it runs, later ones in the background
+        # just replace the snapshot when they're done.
+        first = "version" not in store.status()
+        return load_catalog(cache, partial_catalog if first else None)
 
+    # Picks up new catalog files as soon as they're written or published.
+    store = SnapshotStore(
+        load,
+        CATEGORY_NAMES,
+        poll=lambda: (catalog_mtime(), shared.published_version(cache)),
+    )
+    return store
 
-components = get_components()
-description.write(description_text.format(len(components)))
 
-# It's more performant to do the sorting first. It's cached, so even though it's running
-# on more elements when done first, we almost always have a cache hit since the list of
-# components doesn't change.
-components = sort_components(components, sorting)
+def show_rows(snapshot, rows):
+    if BATCHED_RENDERING:
+        renderer = snapshot.extra("cards", lambda s: CardRenderer(s.table.row))
+        show_components_batched(renderer, rows)
+    else:
+        show_components(snapshot.table.take(rows))
+
+
+def format_age(seconds):
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min"
+    elif seconds < 2 * 24 * 3600:
+        return f"{int(seconds // 3600)} hours"
+    return f"{int(seconds // (24 * 3600))} days"
+
+
+def show_snapshot_status():
+    status = snapshot_store.status()
+    text = f"Last updated {format_age(status['age'])} ago"
+    if status["running"]:
+        started = format_age(time.time() - status["started_at"])
+        text += f" – refreshing in the background (started {started} ago)"
+    elif status["error"]:
+        text += " – last refresh failed, trying again later"
+    st.caption(text)
+
+
+def show_partial_catalog():
+    """show what the first crawl found so far and rerun in a few seconds."""
+    status = snapshot_store.status()
+    if status["error"] and not status["running"]:
+        st.error(
+            f"Couldn't crawl the components, trying again later: {status['error']}"
+        )
+        st.stop()
+    snapshot = partial_catalog.snapshot()
+    if snapshot is None:
+        st.info("🏗 Crawling the components for the first time, just a moment...")
+    else:
+        description.write(description_text.format(len(snapshot)))
+        started = format_age(time.time() - partial_catalog.started_at)
+        st.info(
+            f"🏗 Crawling the components for the first time (started {started} ago). "
+            f"Here are the {len(snapshot)} found so far, more show up as the crawl "
+            "goes on."
+        )
+        st.write("")
+        if search or category:
+            rows = get_rows(snapshot, sorting, search, category)
+        else:
+            # In the order they were crawled: the ones from the forum first, then by
+            # stars (see `pipeline.enrich`).
+            rows = np.arange(len(snapshot))
+        show_rows(snapshot, rows[: st.session_state["limit"]])
+        if len(rows) > st.session_state["limit"]:
+            st.button("Show more components", on_click=show_more, type="primary")
+    time.sleep(PARTIAL_RERUN_INTERVAL)
+    st.experimental_rerun()
+
+
+# All sessions share the same snapshot of the catalog, nothing in here hashes or
+# copies the list of components.
+snapshot_store = get_snapshot_store()
+partial_catalog = get_partial_catalog()
+# Waits for the first snapshot if there's a catalog to load (that's quick), but not
+# if it has to be crawled.
+if snapshot_store.current(block=False, until=partial_catalog.crawling) is None:
+    # No catalog yet, it's crawled in the background. Show what's there already.
+    show_partial_catalog()
+elif len(partial_catalog):
+    partial_catalog.clear()  # not needed anymore
+# Stars and downloads are refreshed much more often than the rest of the data, so
+# merge in the latest numbers (once per update, not on every rerun).
+volatile_stats = get_volatile_stats()
+snapshot = snapshot_store.with_stats(volatile_stats)
+volatile_stats.maybe_refresh(snapshot.components, st.secrets.gh_token)
+description.write(description_text.format(len(snapshot)))
+show_snapshot_status()
 
 if not search and not category and sorting != "🐣 Newest":
     "## 🚀 Newcomers"
     st.write("")
-    new_components = filter_components(
-        components, search, category, newer_than=datetime.now() - timedelta(days=60)
+    # Rounded to the day, so it's one of the precomputed views of the snapshot.
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    new_rows = get_rows(
+        snapshot, sorting, newer_than=today - timedelta(days=NEWCOMER_DAYS)
     )
-    show_components(new_components, limit=4)
+    show_rows(snapshot, new_rows[:4])
 
     "## 🌟 All-time favorites"
 
 st.write("")
 st.write("")
 
-components = filter_components(components, search, category)
-show_components(components, st.session_state["limit"])
+rows = get_rows(snapshot, sorting, search, category)
+show_rows(snapshot, rows[: st.session_state["limit"]])
 
-if len(components) > st.session_state["limit"]:
+if len(rows) > st.session_state["limit"]:
     st.button("Show more components", on_click=show_more, type="primary")
 
 # if st.button("write additional data file"):
@@ -0,0 +1,55 @@
+import io
+
+from PIL import Image
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+from benchmarks.table import make_components
+from cards import CardRenderer
+from thumbnails import AVATAR_SIZE, CARD_SIZE, ThumbnailStore
+
+
+class MediaFiles(MediaFileManager):
+    def __init__(self):
+        super().__init__(MemoryMediaFileStorage("/media"))
+        self.added = []
+
+    def add(self, path_or_data, mimetype, coordinates, *args, **kwargs):
+        self.added.append(coordinates)
+        return super().add(path_or_data, mimetype, coordinates, *args, **kwargs)
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (120, 80), "orange").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_card_images_are_served_avatars_inlined(tmp_path):
+    store = ThumbnailStore(tmp_path)
+    c = make_components(1)[0]
+    c.github_author = "someone"
+    c.image_thumbnail = store.add(png(), CARD_SIZE)
+    c.avatar_thumbnail = store.add(png(), AVATAR_SIZE)
+    media_files = MediaFiles()
+    renderer = CardRenderer(lambda row: c, media_files)
+
+    html = renderer.card(0)
+    assert 'class="card-image" src="media/' in html
+    assert ".webp?v=1" in html
+    assert html.count("data:image/webp;base64,") == 1  # the avatar
+    assert media_files.added == [f"card-image-{c.image_thumbnail}"]
+
+    # Streamlit forgets the files at every rerun, so a cached card adds it again.
+    assert renderer.card(0) == html
+    assert len(media_files.added) == 2
+
+
+def test_original_url_without_thumbnail():
+    c = make_components(1)[0]
+    c.image_url = "https://example.com/image.gif"
+    c.image_thumbnail = None
+    media_files = MediaFiles()
+    html = CardRenderer(lambda row: c, media_files).card(0)
+    assert 'src="https://example.com/image.gif"' in html
+    assert media_files.added == []
@@ -0,0 +1,74 @@
+import time
+
+import checkpoint
+from checkpoint import MAX_ATTEMPTS, Checkpoint
+
+
+def open_checkpoint(tmp_path, **kwargs):
+    return Checkpoint(
+        tmp_path / "checkpoint.pickle",
+        failures_path=tmp_path / "failures.json",
+        **kwargs,
+    )
+
+
+def test_resume(tmp_path):
+    first = open_checkpoint(tmp_path)
+    first.save("pypi", "a", (200, "metadata"))
+    first.fail("pypi", "b", "timeout")
+    started_at = first.started_at
+
+    resumed = open_checkpoint(tmp_path)
+    assert resumed.resumed == 1
+    assert resumed.started_at == started_at
+    assert resumed.get("pypi", "a") == (200, "metadata")
+    assert not resumed.should_try("pypi", "a")
+    assert resumed.should_try("pypi", "b")
+    assert resumed.should_try("pypi", "c")
+
+    fresh = open_checkpoint(tmp_path, resume=False)
+    assert not fresh.done("pypi", "a")
+
+
+def test_cut_off_last_record(tmp_path):
+    first = open_checkpoint(tmp_path)
+    first.save("pypi", "a", 1)
+    first.save("pypi", "b", "x" * 100)
+    first._file.close()
+    path = tmp_path / "checkpoint.pickle"
+    path.write_bytes(path.read_bytes()[:-20])
+
+    resumed = open_checkpoint(tmp_path)
+    assert resumed.get("pypi", "a") == 1
+    assert not resumed.done("pypi", "b")
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    for attempt in range(MAX_ATTEMPTS):
+        c = open_checkpoint(tmp_path)
+        assert c.should_try("github_repo", "a")
+        c.fail("github_repo", "a", "forbidden")
+    c = open_checkpoint(tmp_path)
+    assert not c.should_try("github_repo", "a")
+    assert c.failures["github_repo", "a"]["attempts"] == MAX_ATTEMPTS
+
+    # Done after all, e.g. in an earlier attempt's run.
+    c.save("github_repo", "a", None)
+    assert ("github_repo", "a") not in c.failures
+
+
+def test_expires_after_max_age(tmp_path, monkeypatch):
+    open_checkpoint(tmp_path).save("pypi", "a", 1)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + checkpoint.MAX_AGE + 1)
+    expired = open_checkpoint(tmp_path)
+    assert expired.resumed == 0
+    assert not expired.done("pypi", "a")
+
+
+def test_finish(tmp_path):
+    c = open_checkpoint(tmp_path)
+    c.fail("pypi", "a", "status code 500")
+    c.finish()
+    assert not (tmp_path / "checkpoint.pickle").exists()
+    assert "status code 500" in (tmp_path / "failures.json").read_text()
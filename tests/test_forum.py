@@ -0,0 +1,40 @@
+import forum
+
+
+def test_parse_cooked_reads_the_longest_list():
+    cooked = """
+    <p>Rules:</p>
+    <ul><li>Be nice</li></ul>
+    <ul>
+      <li><a href="https://github.com/u/foo">Foo</a>: does foo</li>
+      <li>Bar - <a href="https://pypi.org/project/bar/">pypi</a> <a href="https://github.com/u/bar">github</a></li>
+      <li>Baz, no links</li>
+    </ul>
+    """
+    assert forum.parse_cooked(cooked) == [
+        ("Foo: does foo", ["https://github.com/u/foo"]),
+        (
+            "Bar - pypi github",
+            ["https://pypi.org/project/bar/", "https://github.com/u/bar"],
+        ),
+        ("Baz, no links", []),
+    ]
+    assert forum.parse_cooked("<p>Nothing here</p>") == []
+
+
+def test_parse_raw():
+    raw = (
+        "Components so far:\n"
+        "\n"
+        "* [Foo](https://github.com/u/foo): does foo\n"
+        "- Bar https://pypi.org/project/bar/ ([github](<https://github.com/u/bar>))\n"
+        "1. Baz, no links\n"
+    )
+    assert forum.parse_raw(raw) == [
+        ("Foo: does foo", ["https://github.com/u/foo"]),
+        (
+            "Bar  (github)",
+            ["https://github.com/u/bar", "https://pypi.org/project/bar/"],
+        ),
+        ("Baz, no links", []),
+    ]
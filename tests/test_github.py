@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+import github
+from benchmarks.standin import serve
+
+REPO = {
+    "stargazerCount": 12,
+    "description": "A component",
+    "createdAt": "2022-05-01T10:00:00Z",
+    "owner": {"avatarUrl": "https://avatars.example.com/u/1"},
+}
+
+
+def respond_with(response):
+    def handle(method, path, headers, body):
+        return 200, {"Content-Type": "application/json"}, json.dumps(response).encode()
+
+    return serve(handle)
+
+
+def test_unreadable_repos_are_none():
+    response = {
+        "data": {"r0": None, "r1": REPO, "r2": None},
+        "errors": [
+            {"type": "FORBIDDEN", "path": ["r0"], "message": "blocked"},
+            {"type": "NOT_FOUND", "path": ["r2"], "message": "not found"},
+        ],
+    }
+    with respond_with(response) as url:
+        repos = github.fetch_repos(
+            [("a", "x"), ("b", "y"), ("c", "z")], "token", url=url
+        )
+    assert repos[("a", "x")] is None
+    assert repos[("b", "y")][:3] == (12, "A component", REPO["owner"]["avatarUrl"])
+    assert repos[("c", "z")] is None
+
+
+def test_request_without_data_fails():
+    response = {"data": None, "errors": [{"message": "Bad credentials"}]}
+    with respond_with(response) as url, pytest.raises(RuntimeError):
+        github.fetch_repos([("a", "x")], "token", url=url)
@@ -0,0 +1,27 @@
+import names
+
+
+def test_normalize():
+    assert names.normalize("Streamlit_AgGrid") == "streamlit-aggrid"
+    assert names.normalize("st.foo--_bar") == "st-foo-bar"
+    assert names.title_to_name("  Streamlit  AgGrid ") == "streamlit-aggrid"
+
+
+def test_variants():
+    assert names.variants("streamlit-foo") == ["streamlit-foo", "streamlit_foo"]
+    assert names.variants("st_foo-bar") == ["st_foo-bar", "st_foo_bar", "st-foo-bar"]
+    assert names.variants("foo") == ["foo"]
+
+
+def test_name_index():
+    index = names.NameIndex(["streamlit-aggrid", "Streamlit_Foo", "streamlit.foo"])
+    assert len(index) == 2
+    assert "STREAMLIT_AGGRID" in index
+    assert "streamlit-bar" not in index
+    # The first spelling that was added is the one on PyPI.
+    assert index.resolve("streamlit-foo") == "Streamlit_Foo"
+    assert index.resolve("streamlit-bar") is None
+    assert (
+        index.resolve_any(["streamlit-bar", "Streamlit.AgGrid"]) == "streamlit-aggrid"
+    )
+    assert index.resolve_any([]) is None
@@ -0,0 +1,62 @@
+import json
+import sys
+import threading
+import types
+
+import pytest
+
+import parsing
+
+
+@pytest.fixture
+def streamlit_main(tmp_path, monkeypatch):
+    """make `__main__` look like it does when Streamlit runs a script: a module
+    with the script's `__file__` and no spec. Returns the file the script writes
+    when it's executed."""
+    marker = tmp_path / "executed"
+    script = tmp_path / "streamlit_app.py"
+    script.write_text(
+        f"open({str(marker)!r}, 'w').write('app script ran')\n"
+        "raise SystemExit('app script ran in a worker')\n"
+    )
+    main = types.ModuleType("__main__")
+    main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, "__main__", main)
+    yield marker
+    parsing.set_workers(parsing.WORKERS)
+
+
+def test_workers_dont_run_the_app_script(streamlit_main):
+    parsing.set_workers(2)
+    for i in range(4):
+        assert parsing.parse(json.loads, json.dumps({"i": i}).encode()) == {"i": i}
+    parsing.shutdown()
+    assert not streamlit_main.exists()
+
+
+def test_starting_workers_leaves_main_alone(streamlit_main):
+    # Streamlit script threads keep running while the workers start.
+    main = sys.modules["__main__"]
+    seen = set()
+    done = threading.Event()
+
+    def watch():
+        while not done.is_set():
+            seen.add(id(sys.modules["__main__"]))
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    try:
+        parsing.set_workers(2)
+        assert parsing.parse(json.loads, b"[1]") == [1]
+        parsing.shutdown()
+    finally:
+        done.set()
+        watcher.join()
+    assert seen == {id(main)}
+
+
+def test_parse_in_process():
+    parsing.set_workers(0)
+    assert parsing.parse(json.loads, b'{"a": 1}') == {"a": 1}
+    assert parsing.parse(parsing.text, "ä".encode("latin-1"), "latin-1") == "ä"
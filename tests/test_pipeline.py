@@ -0,0 +1,130 @@
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+import requests
+
+import catalog
+import github
+import pipeline
+import pypi
+import thumbnails
+from catalog import Component
+from checkpoint import Checkpoint
+
+ROOT = Path(__file__).parent.parent
+CREATED = datetime(2022, 1, 1)
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FakePyPI:
+    """stands in for the validator cache, with the JSON API of some packages."""
+
+    def __init__(self):
+        self.stats = {}
+        self.failing = set()
+        self.fetched = []
+
+    def fetch(self, url, extract):
+        package = url.split("/")[-2]
+        self.fetched.append(package)
+        if package in self.failing:
+            raise requests.ConnectionError("connection reset")
+        repo = f"https://github.com/someone/{package}"
+        return 200, ("someone", repo, f"{package} does things", CREATED)
+
+    def sync(self):
+        pass
+
+    def summary(self):
+        return ""
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """run the pipeline in `tmp_path`, without any requests."""
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(ROOT / "additional_data.yaml", tmp_path)
+    fake = FakePyPI()
+    monkeypatch.setattr(pipeline, "validators", fake)
+    fake.repo_requests = []
+
+    def fetch_repos(repos, token):
+        fake.repo_requests.append(list(repos))
+        return {repo: (len(repo[1]), None, None, CREATED) for repo in repos}
+
+    def fetch_images(self, urls, size, concurrency=16, on_result=None):
+        for url in urls:
+            on_result(url, None)
+        return {}
+
+    monkeypatch.setattr(github, "fetch_repos", fetch_repos)
+    monkeypatch.setattr(pipeline, "parse_github_readme", lambda url, token: (None,) * 3)
+    monkeypatch.setattr(pipeline, "get_downloads", lambda package: 7)
+    monkeypatch.setattr(thumbnails.ThumbnailStore, "fetch", fetch_images)
+    return fake
+
+
+def enrich(packages, checkpoint):
+    return pipeline.enrich({}, packages, "token", concurrency=1, checkpoint=checkpoint)
+
+
+def test_resumed_enrich_fetches_the_repos_it_doesnt_have(offline, monkeypatch):
+    packages = ["streamlit-a", "streamlit-bb"]
+    offline.failing = {"streamlit-bb"}
+
+    def interrupt(url, token):
+        raise Interrupted()
+
+    monkeypatch.setattr(pipeline, "parse_github_readme", interrupt)
+    with pytest.raises(Interrupted):
+        enrich(packages, Checkpoint())
+    assert offline.repo_requests == [[("someone", "streamlit-a")]]
+
+    # The next run retries the failed package, which has a new repo.
+    offline.failing = set()
+    monkeypatch.setattr(pipeline, "parse_github_readme", lambda url, token: (None,) * 3)
+    components = enrich(packages, Checkpoint())
+    assert offline.fetched == ["streamlit-a", "streamlit-bb", "streamlit-bb"]
+    assert offline.repo_requests[1:] == [[("someone", "streamlit-bb")]]
+    assert {c.package: c.stars for c in components} == {
+        "streamlit-a": len("streamlit-a"),
+        "streamlit-bb": len("streamlit-bb"),
+    }
+    assert all(c.downloads == 7 for c in components)
+
+
+def test_update_catalog(offline, monkeypatch):
+    old = Component(
+        name="Old",
+        package="streamlit-old",
+        pypi=pypi.project_url("streamlit-old"),
+        stars=1,
+        categories=[],
+    )
+    same = Component(name="Same", package="streamlit-same", stars=5, categories=[])
+    catalog.write_catalog("catalog.jsonl", [old, same], 1000.0, pypi_serial=10)
+    Path(".cache").mkdir(exist_ok=True)
+    Path(".cache/crawl-failures.json").write_text("[]")
+
+    changes = ["streamlit-old", "streamlit-new", "not-a-component"]
+    monkeypatch.setattr(pypi, "changed_since", lambda serial: (set(changes), 12))
+    pipeline.update_catalog("catalog.jsonl", "token", concurrency=1, workers=0)
+
+    header = catalog.read_header("catalog.jsonl")
+    assert header["pypi_serial"] == 12
+    assert header["crawled_at"] == 1000.0
+    _, _, components = catalog.read_catalog("catalog.jsonl")
+    components = {c.package: c for c in components}
+    assert sorted(components) == ["streamlit-new", "streamlit-old", "streamlit-same"]
+    assert components["streamlit-old"].stars == len("streamlit-old")
+    assert components["streamlit-same"].stars == 5
+    assert components["streamlit-new"].github.endswith("/streamlit-new")
+    assert sorted(offline.fetched) == ["streamlit-new", "streamlit-old"]
+    # The failures of the last full crawl are still there.
+    assert Path(".cache/crawl-failures.json").read_text() == "[]"
+    assert Path(pipeline.UPDATE_FAILURES_PATH).exists()
@@ -0,0 +1,101 @@
+import json
+from datetime import datetime
+
+import pypi
+
+
+def make_json(**info):
+    data = {
+        "info": {
+            "home_page": None,
+            "project_urls": {
+                "Docs": "https://foo.io",
+                "Source": "https://github.com/u/foo",
+            },
+            "summary": "A fancy component",
+            "description": "",
+            **info,
+        },
+        "ownership": {"roles": [{"role": "Owner", "user": "jane"}]},
+        "releases": {
+            "0.2.0": [{"upload_time_iso_8601": "2022-03-01T10:00:00.000000Z"}],
+            "0.1.0": [{"upload_time_iso_8601": "2021-06-05T08:30:15.123456Z"}],
+            "0.0.1": [],
+        },
+    }
+    return json.dumps(data)
+
+
+def test_parse_json():
+    assert pypi.parse_json(make_json()) == (
+        "jane",
+        "https://github.com/u/foo",
+        "A fancy component",
+        datetime(2021, 6, 5, 8, 30, 15),
+    )
+
+
+def test_parse_json_falls_back_to_the_readme():
+    text = make_json(
+        summary=pypi.NO_DESCRIPTION,
+        home_page="https://github.com/u/home",
+        description="# foo\n\nThe first paragraph.\n",
+    )
+    _, github, description, _ = pypi.parse_json(text)
+    assert github == "https://github.com/u/home"
+    assert description == "The first paragraph."
+
+
+def test_parse_json_broken():
+    assert pypi.parse_json("<html>") is None
+    assert pypi.parse_json('{"message": "Not Found"}') is None
+
+
+def test_parse_html():
+    page = """
+    <span class="sidebar-section__user-gravatar-text"> jane </span>
+    <a class="vertical-tabs__tab vertical-tabs__tab--with-icon vertical-tabs__tab--condensed"
+       href="https://foo.io"><i class="fas fa-book"></i>Docs</a>
+    <a class="vertical-tabs__tab vertical-tabs__tab--with-icon vertical-tabs__tab--condensed"
+       href="https://github.com/u/foo"><i class="fab fa-github"></i>Source</a>
+    <p class="package-description__summary">No project description provided</p>
+    <div class="project-description"><p> </p><p>The first paragraph.
+</p></div>
+    """
+    assert pypi.parse_html(page) == (
+        "jane",
+        "https://github.com/u/foo",
+        "The first paragraph.",
+        None,
+    )
+
+
+def split(body, size):
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+def test_iter_index_names_html():
+    body = (
+        "<!DOCTYPE html><html><body>\n"
+        '<a href="/simple/streamlit/">streamlit</a>\n'
+        '<a href="/simple/st-foo/">st-foo</a>\n'
+        '<a href="/simple/caf%C3%A9/">café</a>\n'
+        '<a href="/simple/a-b/">a&amp;b</a>\n'
+        "</body></html>"
+    ).encode()
+    expected = ["streamlit", "st-foo", "café", "a&b"]
+    # Names (and the two bytes of "é") split across chunks at every position.
+    for size in [1, 2, 3, 7, len(body)]:
+        assert list(pypi.iter_index_names(split(body, size))) == expected
+
+
+def test_iter_index_names_json():
+    body = json.dumps(
+        {
+            "meta": {"api-version": "1.0"},
+            "projects": [{"name": "streamlit"}, {"name": 'st-"quoted"'}],
+        }
+    ).encode()
+    for size in [1, 5, len(body)]:
+        names = pypi.iter_index_names(split(body, size), pypi.SIMPLE_JSON)
+        assert list(names) == ["streamlit", 'st-"quoted"']
@@ -0,0 +1,63 @@
+import time
+
+import requests
+
+from benchmarks.standin import serve
+from ratelimit import Scheduler
+
+
+def serve_responses(responses):
+    """serve `responses` ((status code, headers) pairs) one after the other, the last
+    one for all further requests."""
+    calls = []
+
+    def handle(method, path, headers, body):
+        calls.append(path)
+        status_code, headers = responses[min(len(calls), len(responses)) - 1]
+        return status_code, headers, b"{}"
+
+    return serve(handle), calls
+
+
+def request(scheduler, url):
+    return scheduler.request(lambda: requests.get(url, timeout=5), url)
+
+
+def test_429_is_retried_after_retry_after():
+    server, calls = serve_responses([(429, {"Retry-After": "0.2"}), (200, {})])
+    with server as url:
+        start = time.perf_counter()
+        response = request(Scheduler(limits={}), url)
+        assert time.perf_counter() - start >= 0.2
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+def test_200_that_used_up_the_rate_limit_is_kept():
+    headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 60)}
+    server, calls = serve_responses([(200, headers)])
+    scheduler = Scheduler(limits={})
+    with server as url:
+        start = time.perf_counter()
+        response = request(scheduler, url)
+        assert time.perf_counter() - start < 0.5
+    assert response.status_code == 200
+    assert len(calls) == 1
+    # The next request to the host waits for the reset.
+    assert scheduler._wait_time("127.0.0.1") > 30
+
+
+def test_403_without_rate_limit_headers_isnt_retried():
+    server, calls = serve_responses([(403, {})])
+    with server as url:
+        response = request(Scheduler(limits={}), url)
+    assert response.status_code == 403
+    assert len(calls) == 1
+
+
+def test_5xx_is_retried_with_backoff():
+    server, calls = serve_responses([(503, {}), (200, {})])
+    with server as url:
+        response = request(Scheduler(limits={}), url)
+    assert response.status_code == 200
+    assert len(calls) == 2
@@ -0,0 +1,78 @@
+import readme
+
+RAW = "https://github.com/user/repo/raw/HEAD"
+
+
+def test_badges_are_skipped():
+    source = (
+        "[![PyPI](https://img.shields.io/pypi/v/streamlit-foo)](https://pypi.org)\n"
+        "![CI](https://github.com/user/repo/actions/workflows/ci.yml/badge.svg)\n"
+        "![demo](https://example.com/demo.gif)\n"
+    )
+    assert readme.find_image(source, RAW) == "https://example.com/demo.gif"
+
+
+def test_reference_images():
+    source = "![Screenshot][shot]\n\n![][logo]\n\n[shot]: docs/screenshot.png\n"
+    assert readme.find_image(source, RAW) == f"{RAW}/docs/screenshot.png"
+    # Collapsed form, the alt text is the reference.
+    assert readme.find_image("![Demo][]\n\n[demo]: <./demo.png>\n", RAW) == (
+        f"{RAW}/demo.png"
+    )
+    assert readme.find_image("![Demo][missing]\n", RAW) is None
+
+
+def test_relative_and_html_images():
+    assert readme.find_image('<img src="./img/app.png" width="500">', RAW) == (
+        f"{RAW}/img/app.png"
+    )
+    assert readme.find_image(".. image:: /docs/app.png\n", RAW) == (
+        f"{RAW}/docs/app.png"
+    )
+
+
+def test_resolve():
+    assert readme._resolve("//example.com/a.png", RAW) == "https://example.com/a.png"
+    assert readme._resolve("https://github.com/user/repo/blob/main/a.png", RAW) == (
+        "https://github.com/user/repo/raw/main/a.png"
+    )
+    assert readme._resolve("a.png?x=1&amp;y=2", RAW + "/") == f"{RAW}/a.png?x=1&y=2"
+
+
+def test_first_paragraph():
+    source = (
+        "# streamlit-foo\n"
+        "\n"
+        "[![PyPI](https://img.shields.io/pypi/v/streamlit-foo)](https://pypi.org)\n"
+        "\n"
+        "```python\n"
+        "import foo\n"
+        "```\n"
+        "\n"
+        "A **fancy** component for [Streamlit](https://streamlit.io).\n"
+        "It does `things`.\n"
+    )
+    assert readme.first_paragraph(source) == (
+        "A fancy component for Streamlit. It does things."
+    )
+    rst = "streamlit-foo\n=============\n\nSee `the docs <https://foo.io>`_.\n"
+    assert readme.first_paragraph(rst) == "See the docs."
+    assert readme.first_paragraph("# Only a heading\n") is None
+    assert readme.first_paragraph(None) is None
+
+
+def test_find_demo():
+    assert readme.find_demo("Try it: https://foo-demo.streamlit.app/).") == (
+        "https://foo-demo.streamlit.app/"
+    )
+    # share.streamlit.io links win, whatever comes first in the text.
+    source = (
+        "[app](https://user-repo-app-abc123.streamlitapp.com) or "
+        "https://share.streamlit.io/user/repo/main/app.py"
+    )
+    assert (
+        readme.find_demo(source) == "https://share.streamlit.io/user/repo/main/app.py"
+    )
+    assert (
+        readme.find_demo("https://streamlit.io and https://docs.streamlit.io") is None
+    )
@@ -0,0 +1,82 @@
+import pytest
+
+import parsing
+from benchmarks.standin import serve
+from revalidate import ValidatorCache
+
+ETAG = '"v1"'
+
+
+@pytest.fixture(autouse=True)
+def in_process():
+    parsing.set_workers(0)
+    yield
+    parsing.set_workers(parsing.WORKERS)
+
+
+@pytest.fixture
+def server():
+    requests = []
+
+    def handle(method, path, headers, body):
+        requests.append((path, headers.get("If-None-Match")))
+        if path == "/missing":
+            return 404, {}, b"not found"
+        if headers.get("If-None-Match") == ETAG:
+            return 304, {"ETag": ETAG}, b""
+        return 200, {"ETag": ETAG, "Content-Type": "text/plain"}, b"hello"
+
+    with serve(handle) as base_url:
+        yield base_url, requests
+
+
+def upper(text):
+    return text.upper()
+
+
+def test_miss_downloads_and_stores(tmp_path, server):
+    base_url, requests = server
+    cache = ValidatorCache(tmp_path / "cache.sqlite")
+    assert cache.fetch(f"{base_url}/page", upper) == (200, "HELLO")
+    assert requests == [("/page", None)]
+    assert cache.stats["misses"] == 1
+    assert cache.stats["bytes_downloaded"] == len("hello")
+    cache.close()
+
+
+def test_revalidates_with_304(tmp_path, server):
+    base_url, requests = server
+    cache = ValidatorCache(tmp_path / "cache.sqlite", max_age=0)
+    cache.fetch(f"{base_url}/page", upper)
+    # Not parsed again, the stored value comes back.
+    assert cache.fetch(f"{base_url}/page", lambda text: "parsed again") == (
+        200,
+        "HELLO",
+    )
+    assert requests == [("/page", None), ("/page", ETAG)]
+    assert cache.stats["not_modified"] == 1
+    assert cache.stats["misses"] == 1
+    cache.close()
+
+
+def test_fresh_entry_is_a_hit_without_request(tmp_path, server):
+    base_url, requests = server
+    cache = ValidatorCache(tmp_path / "cache.sqlite")
+    cache.fetch(f"{base_url}/page", upper)
+    cache.close()
+
+    # Also after reopening the file.
+    cache = ValidatorCache(tmp_path / "cache.sqlite")
+    assert cache.fetch(f"{base_url}/page", upper) == (200, "HELLO")
+    assert len(requests) == 1
+    assert cache.stats["hits"] == 1
+    cache.close()
+
+
+def test_error_status_is_not_stored(tmp_path, server):
+    base_url, requests = server
+    cache = ValidatorCache(tmp_path / "cache.sqlite")
+    assert cache.fetch(f"{base_url}/missing", upper) == (404, None)
+    assert cache.fetch(f"{base_url}/missing", upper) == (404, None)
+    assert len(requests) == 2
+    cache.close()
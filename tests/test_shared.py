@@ -0,0 +1,77 @@
+import shutil
+import threading
+import time
+
+import catalog
+import shared
+from benchmarks.standin import serve_redis
+from benchmarks.table import make_components
+from thumbnails import ThumbnailStore
+
+
+def test_catalog_is_published_with_its_thumbnails(tmp_path):
+    backend = shared.SQLiteBackend(tmp_path / "shared.sqlite")
+    store = ThumbnailStore(tmp_path / "thumbnails")
+    components = make_components(3)
+    for i, c in enumerate(components):
+        c.image_thumbnail = store.put(b"image %d" % i)
+        c.avatar_thumbnail = store.put(b"avatar")
+    crawled = tmp_path / "crawled.jsonl.gz"
+    catalog.write_catalog(crawled, components, time.time())
+    shared.publish_catalog(backend, crawled)
+
+    # Another replica, which doesn't have the thumbnail files.
+    shutil.rmtree(tmp_path / "thumbnails")
+    replica = tmp_path / "replica.jsonl.gz"
+    assert shared.fetch_catalog(backend, replica)
+    _, _, fetched = catalog.read_catalog(replica)
+    assert [open(c.image_thumbnail, "rb").read() for c in fetched] == [
+        b"image 0",
+        b"image 1",
+        b"image 2",
+    ]
+    assert open(fetched[0].avatar_thumbnail, "rb").read() == b"avatar"
+
+    # Already published thumbnails aren't uploaded again.
+    assert shared.publish_thumbnails(backend, fetched) == 0
+
+
+def test_redis_backend_exists():
+    with serve_redis() as url:
+        backend = shared.from_url(url)
+        assert not backend.exists("key")
+        backend.set("key", b"value")
+        assert backend.exists("key")
+
+
+def test_wait_for_catalog_while_the_lease_is_held(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared, "WAIT_INTERVAL", 0.05)
+    backend = shared.SQLiteBackend(tmp_path / "shared.sqlite")
+    crawled = tmp_path / "crawled.jsonl"
+    catalog.write_catalog(crawled, make_components(2), time.time())
+    assert backend.acquire(shared.LEASE_NAME, "crawler", ttl=60)
+
+    def crawl():
+        time.sleep(0.3)
+        shared.publish_catalog(backend, crawled)
+        backend.release(shared.LEASE_NAME, "crawler")
+
+    thread = threading.Thread(target=crawl)
+    thread.start()
+    assert shared.wait_for_catalog(backend, tmp_path / "waiting.jsonl")
+    thread.join()
+
+
+def test_wait_for_catalog_gives_up_without_lease(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared, "WAIT_INTERVAL", 0.05)
+    backend = shared.SQLiteBackend(tmp_path / "shared.sqlite")
+    assert not shared.wait_for_catalog(backend, tmp_path / "waiting.jsonl")
+
+
+def test_redis_lease_held():
+    with serve_redis() as url:
+        backend = shared.from_url(url)
+        assert not backend.held(shared.LEASE_NAME)
+        with shared.lease(backend) as acquired:
+            assert acquired and backend.held(shared.LEASE_NAME)
+        assert not backend.held(shared.LEASE_NAME)
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.table import CATEGORIES, make_components
+from snapshot import Snapshot, SnapshotStore
+
+
+def test_search_ranks_matches_then_sort_order():
+    components = make_components(50)
+    snapshot = Snapshot(components, CATEGORIES)
+    table = snapshot.table
+    for sort_by in ["stars", "downloads", "date"]:
+        matches = snapshot.search_index.search("component 1")
+        rows = snapshot.query(sort_by, "component 1")
+        assert sorted(rows) == sorted(row for row, _ in matches)
+
+        # Same as sorting the whole table and then ranking by score (stable).
+        scores = dict(matches)
+        order = [row for row in table.sort(sort_by) if row in scores]
+        expected = sorted(order, key=lambda row: -scores[row])
+        assert list(rows) == expected
+
+
+def test_search_without_matches():
+    snapshot = Snapshot(make_components(5), CATEGORIES)
+    rows = snapshot.query("stars", "nothing like this")
+    assert len(rows) == 0 and rows.dtype == np.int64
+
+
+def test_first_snapshot_waits_for_a_load_but_not_a_crawl():
+    crawling = threading.Event()
+    components = make_components(5)
+
+    def load():
+        time.sleep(0.2)  # reading the catalog file
+        return None, time.time(), components
+
+    store = SnapshotStore(load, CATEGORIES)
+    snapshot = store.current(block=False, until=crawling)
+    assert snapshot is not None and len(snapshot) == 5
+
+    def crawl():
+        crawling.set()
+        time.sleep(1)
+        return None, time.time(), components
+
+    store = SnapshotStore(crawl, CATEGORIES)
+    start = time.perf_counter()
+    assert store.current(block=False, until=crawling) is None
+    assert time.perf_counter() - start < 0.5
+
+
+def test_first_snapshot_failed():
+    def load():
+        raise RuntimeError("no catalog")
+
+    store = SnapshotStore(load, CATEGORIES)
+    assert store.current(block=False, until=threading.Event()) is None
+    assert store.status()["error"] == "no catalog"
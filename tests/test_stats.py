@@ -0,0 +1,39 @@
+import requests
+
+import pypi
+from benchmarks.table import make_components
+from stats import VolatileStats
+
+
+def test_failed_download_counts_dont_replace_crawled_ones(monkeypatch):
+    counts = {"a": 100, "b": None}
+    monkeypatch.setattr(pypi, "fetch_downloads", counts.get)
+    stats = VolatileStats()
+    stats.refresh_downloads(["a", "b"])
+    assert stats.downloads == {"a": 100}
+
+    a, b = make_components(2)
+    a.package, a.downloads = "a", 5
+    b.package, b.downloads = "b", 7
+    merged = stats.apply([a, b])
+    assert [c.downloads for c in merged] == [100, 7]
+
+    # A later failure keeps the last number.
+    counts["a"] = None
+    stats.refresh_downloads(["a", "b"])
+    assert stats.downloads == {"a": 100}
+
+
+def test_one_failing_package_doesnt_lose_the_others(monkeypatch):
+    def fetch_downloads(package):
+        if package == "flaky":
+            raise requests.Timeout("read timed out")
+        if package == "odd":
+            raise KeyError("data")
+        return 3
+
+    monkeypatch.setattr(pypi, "fetch_downloads", fetch_downloads)
+    stats = VolatileStats()
+    stats.refresh_downloads(["a", "flaky", "odd", "b"])
+    assert stats.downloads == {"a": 3, "b": 3}
+    assert stats.downloads_updated > 0
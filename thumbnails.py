@@ -0,0 +1,140 @@
+"""Small local thumbnails for the card images and avatars.
+
+Images linked from READMEs are often multi-megabyte GIFs or full-size screenshots,
+but cards only show them 200px tall (and avatars 20px). So every image is fetched
+once per crawl, scaled down to a fixed size (first frame for animations) and stored
+as WebP in a content-addressed cache: the file name is the hash of the thumbnail,
+so the same image linked by several components is only stored once. The grid shows
+these files instead of the originals.
+"""
+
+import base64
+import hashlib
+import io
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+import crawler
+
+THUMBNAIL_DIR = Path(".cache") / "thumbnails"
+# 2x the size they're shown at, so they're still sharp on high-dpi screens.
+CARD_SIZE = (600, 400)
+AVATAR_SIZE = (40, 40)
+QUALITY = 80
+# Shown for components without a Github avatar.
+DEFAULT_AVATAR = (
+    "https://icon-library.com/images/default-profile-icon/default-profile-icon-16.jpg"
+)
+# Don't even try to decode anything bigger than this.
+MAX_IMAGE_BYTES = 50_000_000
+
+
+def make_thumbnail(data, size):
+    """return WebP bytes of `data` cropped and scaled to `size`, or None.
+
+    Animations are reduced to their first frame. Returns None for anything Pillow
+    can't read (e.g. SVGs or HTML error pages).
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.seek(0)
+            image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    thumbnail = ImageOps.fit(image, size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, "WEBP", quality=QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+
+
+class ThumbnailStore:
+    def __init__(self, directory=THUMBNAIL_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.stats = {
+            "images": 0,
+            "failed": 0,
+            "original_bytes": 0,
+            "thumbnail_bytes": 0,
+        }
+
+    def put(self, data):
+        """store thumbnail bytes under their hash and return the path."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.directory / digest[:2] / f"{digest}.webp"
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        return str(path)
+
+    def add(self, data, size):
+        """make a thumbnail of image bytes, store it and return its path (or None)."""
+        thumbnail = None
+        if data and len(data) <= MAX_IMAGE_BYTES:
+            thumbnail = make_thumbnail(data, size)
+        if thumbnail is None:
+            self.stats["failed"] += 1
+            return None
+        self.stats["images"] += 1
+        self.stats["original_bytes"] += len(data)
+        self.stats["thumbnail_bytes"] += len(thumbnail)
+        return self.put(thumbnail)
+
+    def fetch(self, urls, size, concurrency=16, on_result=None):
+        """fetch all image urls and return {url: thumbnail path}.
+
+        Urls that can't be fetched or decoded are left out, so callers can fall back
+        to the original url. `on_result(url, path)` is called for every url as soon as
+        it's done (path is None if it failed).
+        """
+        paths = {}
+
+        def on_response(url, status_code, data):
+            path = None
+            if status_code == 200:
+                path = self.add(data, size)
+                if path is not None:
+                    paths[url] = path
+            else:
+                self.stats["failed"] += 1
+            if on_result is not None:
+                on_result(url, path)
+
+        crawler.fetch_all(
+            sorted(set(urls)),
+            concurrency=concurrency,
+            on_response=on_response,
+            binary=True,
+            ignore_errors=True,
+        )
+        return paths
+
+    def summary(self):
+        s = self.stats
+        return (
+            f"{s['images']} thumbnails ({s['failed']} failed), "
+            f"{s['original_bytes'] / 1e6:.1f} MB -> {s['thumbnail_bytes'] / 1e6:.1f} MB"
+        )
+
+
+def exists(path):
+    """whether a thumbnail is still there (the cache dir might have been cleared)."""
+    return path is not None and Path(path).exists()
+
+
+def to_data_uri(data):
+    return "data:image/webp;base64," + base64.b64encode(data).decode()
+
+
+def data_uri(path):
+    """inline a (tiny) thumbnail, for images that are shown inside html."""
+    return to_data_uri(Path(path).read_bytes())